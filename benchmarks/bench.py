@@ -0,0 +1,366 @@
+"""This module provides the PCRMC benchmark suite
+
+Every case runs against a fresh copy of a generated database, through
+the CLI (typer's CliRunner) or the Contacter directly. Wall time is the
+best of several runs. Peak memory, and the memory still held once the
+case is done, come from a separate tracemalloc run. Parse and write
+counts come from the database handlers involved.
+
+    python -m benchmarks.bench --size small
+    python -m benchmarks.bench --size small --update-baseline
+    python -m benchmarks.bench --size medium --case search
+"""
+# benchmarks/bench.py
+
+import gc
+import json
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (Callable, Dict, Iterator, List, NamedTuple, Optional,
+                    Sequence)
+import typer
+from typer.testing import CliRunner
+from pcrmc import SUCCESS, cli, config, pcrmc
+from pcrmc.index import date_ordinal
+from benchmarks.generate import (SIZES, generate_contacts, generate_database,
+                                 generate_meetings)
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+# Differences below this many seconds are noise, not regressions.
+NOISE_SECONDS = 0.005
+
+runner = CliRunner()
+app = typer.Typer()
+
+
+class Measurement(NamedTuple):
+    seconds: float
+    peak_kib: int
+    parses: int
+    writes: int
+    retained_kib: int = 0
+
+
+class Case(NamedTuple):
+    name: str
+    # runs against a database, returns the contacters it used
+    run: Callable[[Path, str], List[pcrmc.Contacter]]
+    # runs before the clock starts, e.g. to write an input file
+    prepare: Optional[Callable[[Path], None]] = None
+
+
+@contextmanager
+def _recording_contacters() -> Iterator[List[pcrmc.Contacter]]:
+    """Collect the contacters the CLI creates while the block runs."""
+    created: List[pcrmc.Contacter] = []
+    get_contacter = cli.get_contacter
+
+    def recording() -> pcrmc.Contacter:
+        contacter = get_contacter()
+        created.append(contacter)
+        return contacter
+
+    cli.get_contacter = recording
+    try:
+        yield created
+    finally:
+        cli.get_contacter = get_contacter
+
+
+def cli_case(name: str, *args: str,
+             exit_codes: Sequence[int] = (0,),
+             prepare: Optional[Callable[[Path], None]] = None) -> Case:
+    def run(db_path: Path, backend: str) -> List[pcrmc.Contacter]:
+        arguments = [a.format(dir=db_path.parent) for a in args]
+        with _recording_contacters() as created:
+            result = runner.invoke(cli.app, arguments)
+        if result.exit_code not in exit_codes:
+            raise RuntimeError(f"{name} failed:\n{result.stdout}")
+        return created
+    return Case(f"cli {name}", run, prepare)
+
+
+def contacter_case(name: str,
+                   call: Callable[[pcrmc.Contacter], object]) -> Case:
+    def run(db_path: Path, backend: str) -> List[pcrmc.Contacter]:
+        contacter = pcrmc.Contacter(db_path, backend)
+        response = call(contacter)
+        error = getattr(response, "error", SUCCESS)
+        if error != SUCCESS:
+            raise RuntimeError(f"{name} failed with error {error}")
+        data = getattr(response, "data", None)
+        if isinstance(data, Iterator):
+            for _ in data:
+                pass
+        return [contacter]
+    return Case(f"Contacter.{name}", run)
+
+
+def _write_import(db_path: Path) -> None:
+    """Write 1000 contacts without IDs to import next to db_path."""
+    with open(db_path.parent / "import.jsonl", "w") as file:
+        for contact in generate_contacts(1000, seed=7):
+            del contact["ID"]
+            file.write(json.dumps(contact) + "\n")
+
+
+# a fixed day keeps the due and stats cases comparable between runs
+TODAY = date_ordinal("20250101")
+
+CASES = [
+    cli_case("list-contacts", "list-contacts"),
+    cli_case("list-contacts --sort", "list-contacts", "-s", "last-meeting",
+             "-n", "20"),
+    cli_case("list-meetings", "list-meetings"),
+    cli_case("list-meetings --location", "list-meetings", "-l", "Wien",
+             "--since", "20200101"),
+    cli_case("search", "search", "hiking", "wien"),
+    cli_case("due", "due", "-n", "20"),
+    cli_case("graph ties", "graph", "ties", "0"),
+    cli_case("stats", "stats", "-n", "20"),
+    cli_case("detail-contact", "detail-contact", "0"),
+    # generated names repeat, so the lookup may end up ambiguous
+    cli_case("detail-contact by name", "detail-contact", "Daniel Waldr",
+             exit_codes=(0, 1)),
+    cli_case("add-contact", "add-contact", "Eva", "Gruber", "-c", "Austria"),
+    cli_case("add-meeting", "add-meeting", "0", "1", "-l", "Wien",
+             "-d", "20240101"),
+    cli_case("modify-contact", "modify-contact", "0", "-f", "Country",
+             "-v", "Italy"),
+    cli_case("modify-meeting", "modify-meeting", "0", "-f", "Loc",
+             "-v", "Graz"),
+    cli_case("rm-contact", "rm-contact", "1"),
+    cli_case("export", "export", "-o", "{dir}/export.jsonl"),
+    cli_case("import", "import", "{dir}/import.jsonl",
+             prepare=_write_import),
+    cli_case("migrate", "migrate", "-db", "{dir}/migrated.db"),
+    cli_case("init", "init", "-db", "{dir}/new.json"),
+    # SQLite databases cannot be converted, only migrated
+    cli_case("convert", "convert", "-b", "binary", exit_codes=(0, 1)),
+    # the generated contacts need not be connected
+    cli_case("graph path", "graph", "path", "0", "1", exit_codes=(0, 1)),
+    cli_case("graph clusters", "graph", "clusters"),
+    cli_case("graph export", "graph", "export", "-o", "{dir}/graph.graphml"),
+    contacter_case("get_contacts", lambda c: c.get_contacts()),
+    contacter_case("get_meetings", lambda c: c.get_meetings()),
+    contacter_case("iter_meetings", lambda c: c.iter_meetings(
+        since="20200101")),
+    contacter_case("find_meetings", lambda c: c.find_meetings(
+        loc="Wien", topics=["hiking"])),
+    contacter_case("get_last_meetings", lambda c: c.get_last_meetings()),
+    contacter_case("find_contacts", lambda c: c.find_contacts(
+        "Daniel Waldr")),
+    contacter_case("search", lambda c: c.search("hiking wien")),
+    # few hits spread over the whole database
+    contacter_case("search rare", lambda c: c.search("tennis bratislava")),
+    contacter_case("add", lambda c: c.add(["Eva", "Gruber"], "Austria",
+                                          "Law")),
+    contacter_case("add_meetings", lambda c: c.add_meetings(
+        list(generate_meetings(1000, 100, seed=7)))),
+    contacter_case("modify_contact", lambda c: c.modify_contact(
+        0, "Country", "Italy")),
+    contacter_case("modify_meeting", lambda c: c.modify_meeting(
+        0, "Loc", "Graz")),
+    contacter_case("delete_contact", lambda c: c.delete_contact(1)),
+    contacter_case("overdue_contacts", lambda c: c.overdue_contacts(
+        config.CadenceConfig(interval=30), 20, TODAY)),
+    contacter_case("get_graph", lambda c: c.get_graph()),
+    contacter_case("meeting_stats", lambda c: c.meeting_stats(6, TODAY)),
+    contacter_case("modify_contacts", lambda c: c.modify_contacts(
+        {id: {"Country": "Italy"} for id in range(0, 100, 10)})),
+    contacter_case("delete_contacts", lambda c: c.delete_contacts(
+        range(1, 100, 10))),
+    contacter_case("select_contacts", lambda c: c.select_contacts(
+        {"Country": "Austria"})),
+    contacter_case("get_contact", lambda c: c.get_contact(0)),
+    contacter_case("iter_contacts", lambda c: c.iter_contacts()),
+    contacter_case("rebuild_search_index",
+                   lambda c: c.rebuild_search_index()),
+]
+
+
+@contextmanager
+def _config_for(db_path: Path, backend: str) -> Iterator[None]:
+    """Point the CLI config at db_path while the block runs."""
+    saved = config.CONFIG_DIR_PATH
+    config.CONFIG_DIR_PATH = db_path.parent / "config"
+    try:
+        if config.init_app(str(db_path), backend) != SUCCESS:
+            raise RuntimeError("could not write the benchmark config")
+        yield
+    finally:
+        config.CONFIG_DIR_PATH = saved
+
+
+def _copy_database(source: Path, target_dir: Path) -> Path:
+    """Copy a database with its journal, search index and partitions."""
+    if target_dir.exists():
+        shutil.rmtree(target_dir)
+    target_dir.mkdir(parents=True)
+    for path in source.parent.glob(source.name + "*"):
+        if path.is_dir():
+            shutil.copytree(path, target_dir / path.name)
+        else:
+            shutil.copy(path, target_dir / path.name)
+    return target_dir / source.name
+
+
+def measure(case: Case, source: Path, backend: str, work_dir: Path,
+            repeat: int = 3) -> Measurement:
+    """Run a case repeat times plus once under tracemalloc."""
+    best = float("inf")
+    parses = writes = 0
+    for _ in range(repeat):
+        db_path = _copy_database(source, work_dir)
+        with _config_for(db_path, backend):
+            if case.prepare is not None:
+                case.prepare(db_path)
+            gc.collect()
+            started = time.perf_counter()
+            contacters = case.run(db_path, backend)
+            best = min(best, time.perf_counter() - started)
+        parses = sum(c._db_handler.parse_count for c in contacters)
+        writes = sum(c._db_handler.write_count for c in contacters)
+
+    db_path = _copy_database(source, work_dir)
+    with _config_for(db_path, backend):
+        if case.prepare is not None:
+            case.prepare(db_path)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            # the contacters stay alive, so their caches count as retained
+            contacters = case.run(db_path, backend)
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return Measurement(best, peak // 1024, parses, writes, retained // 1024)
+
+
+def run_suite(size: str, backend: str = "json", seed: int = 0,
+              repeat: int = 3, cases: Sequence[Case] = CASES
+              ) -> Dict[str, Measurement]:
+    """Generate a database and measure every case against it."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        source = root / "source" / "contacts.db"
+        source.parent.mkdir(parents=True, exist_ok=True)
+        error = generate_database(source, SIZES[size], seed, backend)
+        if error != SUCCESS:
+            raise RuntimeError(f"generating the database failed ({error})")
+        # searches should measure queries, not the first index build
+        pcrmc.Contacter(source, backend).rebuild_search_index()
+        return {case.name: measure(case, source, backend, root / "run",
+                                   repeat)
+                for case in cases}
+
+
+def compare(results: Dict[str, Measurement],
+            baseline: Dict[str, Dict[str, float]],
+            tolerance: float = 0.5) -> List[str]:
+    """Return a line for every measurement worse than the baseline.
+
+    Time and memory may exceed the baseline by the tolerance fraction,
+    parse and write counts may not grow at all.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result.seconds > base["seconds"] * (1 + tolerance) \
+                and result.seconds - base["seconds"] > NOISE_SECONDS:
+            regressions.append(
+                f"{name}: {result.seconds * 1000:.1f} ms, baseline "
+                f"{base['seconds'] * 1000:.1f} ms")
+        for memory in ("peak_kib", "retained_kib"):
+            if memory in base and \
+                    getattr(result, memory) > base[memory] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {memory} {getattr(result, memory)}, "
+                    f"baseline {base[memory]}")
+        for counter in ("parses", "writes"):
+            if getattr(result, counter) > base[counter]:
+                regressions.append(
+                    f"{name}: {getattr(result, counter)} {counter}, "
+                    f"baseline {base[counter]}")
+    return regressions
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict[str, Dict]:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+@app.command()
+def main(
+        size: str = typer.Option("small", "--size", "-s",
+                                 help=f"One of {', '.join(SIZES)}."),
+        backend: str = typer.Option("json", "--backend", "-b"),
+        seed: int = typer.Option(0, "--seed"),
+        repeat: int = typer.Option(3, "--repeat", "-r", min=1),
+        tolerance: float = typer.Option(0.5, "--tolerance"),
+        update_baseline: bool = typer.Option(False, "--update-baseline"),
+        case: List[str] = typer.Option(
+            [], "--case", "-k",
+            help="Only run cases whose name contains this, repeatable."),
+) -> None:
+    """Benchmark the CLI and the Contacter on a generated database."""
+    if size not in SIZES:
+        typer.secho(f'Unknown size "{size}"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    cases = [c for c in CASES
+             if not case or any(part in c.name for part in case)]
+    if not cases:
+        typer.secho("No case matches --case", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    contacts, meetings = SIZES[size]
+    typer.secho(f"{contacts} contacts, {meetings} meetings, {backend}",
+                fg=typer.colors.BLUE)
+    results = run_suite(size, backend, seed, repeat, cases)
+
+    columns = (f"{'Case':<34}| {'ms':>9} | {'peak KiB':>9} "
+               f"| {'kept KiB':>9} | {'parses':>6} | {'writes':>6}")
+    typer.secho(columns, fg=typer.colors.BLUE, bold=True)
+    typer.secho("-" * len(columns), fg=typer.colors.BLUE)
+    for name, result in results.items():
+        typer.secho(
+            f"{name:<34}| {result.seconds * 1000:>9.1f} "
+            f"| {result.peak_kib:>9} | {result.retained_kib:>9} "
+            f"| {result.parses:>6} "
+            f"| {result.writes:>6}")
+
+    key = f"{backend}/{size}"
+    baselines = load_baseline()
+    if update_baseline:
+        measured = {name: result._asdict()
+                    for name, result in results.items()}
+        if case:
+            # the cases that did not run keep their baseline
+            baselines.setdefault(key, {}).update(measured)
+        else:
+            baselines[key] = measured
+        BASELINE_PATH.write_text(json.dumps(baselines, indent=4) + "\n")
+        typer.secho(f"Baseline {key} updated", fg=typer.colors.GREEN)
+        return
+    if key not in baselines:
+        typer.secho(f"No baseline for {key}, run with --update-baseline",
+                    fg=typer.colors.YELLOW)
+        return
+    regressions = compare(results, baselines[key], tolerance)
+    for regression in regressions:
+        typer.secho(regression, fg=typer.colors.RED)
+    if regressions:
+        raise typer.Exit(1)
+    typer.secho(f"No regressions against baseline {key}",
+                fg=typer.colors.GREEN)
+
+
+if __name__ == "__main__":
+    app()
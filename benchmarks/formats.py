@@ -0,0 +1,103 @@
+"""This module provides the PCRMC snapshot format benchmark
+
+Compares load time, save time and file size of the JSON snapshot and
+the binary one with every compression on a generated database.
+
+    python -m benchmarks.formats --size medium
+"""
+# benchmarks/formats.py
+
+import gc
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional
+import typer
+from pcrmc import COMPRESSIONS, SUCCESS, database
+from pcrmc.metrics import format_bytes
+from benchmarks.generate import SIZES, generate_database
+
+app = typer.Typer()
+
+
+class FormatMeasurement(NamedTuple):
+    load_seconds: float
+    save_seconds: float
+    size: int
+
+
+def _best(run: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure_format(source: Path, db_path: Path, backend: str,
+                   compression: Optional[str] = None,
+                   repeat: int = 3) -> FormatMeasurement:
+    """Convert source into db_path, then time loading and saving it."""
+    error = database.migrate_database(
+        database.get_database_handler(source), db_path, backend,
+        compression or "zlib")
+    if error != SUCCESS:
+        raise RuntimeError(f"converting to {backend} failed ({error})")
+    # a fresh handler per load, so every run parses the file
+    load = _best(lambda: database.get_database_handler(
+        db_path, backend)._load(), repeat)
+    handler = database.get_database_handler(db_path, backend)
+    document = handler._load()
+    save = _best(lambda: handler._dump(document), repeat)
+    return FormatMeasurement(load, save, db_path.stat().st_size)
+
+
+def run_formats(size: str, seed: int = 0,
+                repeat: int = 3) -> Dict[str, FormatMeasurement]:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        source = root / "source.json"
+        error = generate_database(source, SIZES[size], seed)
+        if error != SUCCESS:
+            raise RuntimeError(f"generating the database failed ({error})")
+        results = {"json": measure_format(source, root / "db.json", "json",
+                                          repeat=repeat)}
+        for compression in COMPRESSIONS:
+            results[f"binary {compression}"] = measure_format(
+                source, root / f"db.{compression}", "binary", compression,
+                repeat)
+        return results
+
+
+@app.command()
+def main(
+        size: str = typer.Option("small", "--size", "-s",
+                                 help=f"One of {', '.join(SIZES)}."),
+        seed: int = typer.Option(0, "--seed"),
+        repeat: int = typer.Option(3, "--repeat", "-r", min=1),
+) -> None:
+    """Compare load time, save time and size of the snapshot formats."""
+    if size not in SIZES:
+        typer.secho(f'Unknown size "{size}"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    contacts, meetings = SIZES[size]
+    typer.secho(f"{contacts} contacts, {meetings} meetings",
+                fg=typer.colors.BLUE)
+    results = run_formats(size, seed, repeat)
+    columns = (f"{'Format':<14}| {'load ms':>9} | {'save ms':>9} "
+               f"| {'size':>10} | {'of JSON':>7}")
+    typer.secho(columns, fg=typer.colors.BLUE, bold=True)
+    typer.secho("-" * len(columns), fg=typer.colors.BLUE)
+    json_size = results["json"].size
+    for name, result in results.items():
+        typer.secho(
+            f"{name:<14}| {result.load_seconds * 1000:>9.1f} "
+            f"| {result.save_seconds * 1000:>9.1f} "
+            f"| {format_bytes(result.size):>10} "
+            f"| {result.size / json_size:>7.1%}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,111 @@
+"""This module provides the PCRMC synthetic database generator"""
+# benchmarks/generate.py
+
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple
+from pcrmc import SUCCESS
+from pcrmc.database import get_database_handler, init_database
+from pcrmc.index import DATE_FORMAT
+
+FIRST_NAMES = (
+    "Anna", "Daniel", "Eva", "Felix", "Hannah", "Jakob", "Julia", "Lena",
+    "Lukas", "Maria", "Maximilian", "Paul", "Roman", "Sarah", "Sophie",
+    "Tobias", "Valentina", "Elias", "Katharina", "Moritz",
+)
+LAST_NAMES = (
+    "Bauer", "Berger", "Brock", "Fischer", "Gruber", "Hofer", "Huber",
+    "Leitner", "Mayer", "Moser", "Pichler", "Schmid", "Steiner", "Wagner",
+    "Walder", "Weber", "Wimmer", "Winkler", "Wolf", "Eder",
+)
+COUNTRIES = ("Austria", "Germany", "Switzerland", "Italy", "France",
+             "Netherlands", "Spain", "Sweden", "USA", "Japan")
+INDUSTRIES = ("Software Engineering", "Medicine", "Law", "Finance",
+              "Education", "Architecture", "Retail", "Research", "Music",
+              "Logistics", "Journalism", "Energy")
+LOCATIONS = ("Wien", "Graz", "Linz", "Salzburg", "Innsbruck", "Klagenfurt",
+             "Munich", "Berlin", "Zurich", "Milan", "Paris", "Prague",
+             "Budapest", "Bratislava", "Online", "Phone")
+TOPICS = ("work", "hiking", "family", "travel", "music", "startup", "ski",
+          "books", "politics", "sports", "cooking", "movies", "investing",
+          "research", "health", "cars", "games", "art", "climate", "tennis")
+FIRST_DAY = date(2015, 1, 1)
+DAYS = 10 * 365
+
+
+class Size(NamedTuple):
+    contacts: int
+    meetings: int
+
+
+SIZES = {
+    "tiny": Size(100, 1_000),
+    "small": Size(1_000, 10_000),
+    "medium": Size(10_000, 100_000),
+    "large": Size(100_000, 1_000_000),
+}
+
+
+def _zipf_weights(count: int, exponent: float = 1.0) -> List[float]:
+    """Cumulative weights where rank r is picked in proportion to 1/r^s."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+def generate_contacts(count: int, seed: int = 0
+                      ) -> Iterator[Dict[str, Any]]:
+    """Yield contacts with IDs 0..count-1, the same ones for a seed."""
+    rng = random.Random(seed)
+    countries = _zipf_weights(len(COUNTRIES))
+    industries = _zipf_weights(len(INDUSTRIES), 0.5)
+    for id in range(count):
+        yield {
+            "Name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "Country": rng.choices(COUNTRIES, cum_weights=countries)[0],
+            "Industry": rng.choices(INDUSTRIES, cum_weights=industries)[0],
+            "ID": id,
+        }
+
+
+def generate_meetings(count: int, contacts: int, seed: int = 0
+                      ) -> Iterator[Dict[str, Any]]:
+    """Yield meetings with IDs 0..count-1, the same ones for a seed.
+
+    A few contacts, locations and topics are much more popular than the
+    rest, as they are in a real address book.
+    """
+    rng = random.Random(seed + 1)
+    contact_ids = range(contacts)
+    popularity = _zipf_weights(contacts, 0.8)
+    locations = _zipf_weights(len(LOCATIONS))
+    topics = _zipf_weights(len(TOPICS))
+    for id in range(count):
+        participants = set(rng.choices(
+            contact_ids, cum_weights=popularity,
+            k=rng.choice((1, 1, 1, 2, 2, 3, 4))))
+        day = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+        yield {
+            "ID": id,
+            "Participants": sorted(participants),
+            "Date": day.strftime(DATE_FORMAT),
+            "Loc": rng.choices(LOCATIONS, cum_weights=locations)[0],
+            "Topics": sorted(set(rng.choices(
+                TOPICS, cum_weights=topics, k=rng.randrange(4)))),
+        }
+
+
+def generate_database(db_path: Path, size: Size, seed: int = 0,
+                      backend: str = "json") -> int:
+    """Create a database at db_path filled with synthetic records."""
+    error = init_database(db_path, backend)
+    if error != SUCCESS:
+        return error
+    handler = get_database_handler(db_path, backend)
+    error = handler.write_contacts(
+        list(generate_contacts(size.contacts, seed))).error
+    if error != SUCCESS:
+        return error
+    return handler.write_meetings(
+        list(generate_meetings(size.meetings, size.contacts, seed))).error
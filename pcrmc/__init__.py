@@ -4,6 +4,12 @@
 __app_name__ = "pcrmc"
 __version__ = "0.1.0"
 
+BACKENDS = ("json", "sqlite", "binary", "partitioned")
+# Snapshot compression of the binary backend.
+COMPRESSIONS = ("zlib", "lzma", "none")
+# Meeting files of the partitioned backend, one per year or month.
+PARTITION_BY = ("year", "month")
+
 (
         SUCCESS,
         DIR_ERROR,
@@ -12,7 +18,8 @@ __version__ = "0.1.0"
         DB_WRITE_ERROR,
         JSON_ERROR,
         ID_ERROR,
-) = range(7)
+        DATE_ERROR,
+) = range(8)
 
 ERRORS = {
         DIR_ERROR: "config directory error",
@@ -20,5 +27,6 @@ ERRORS = {
         DB_READ_ERROR: "database read error",
         DB_WRITE_ERROR: "database write error",
         ID_ERROR: "to-do id error",
-        JSON_ERROR: "json parsing error"
+        JSON_ERROR: "json parsing error",
+        DATE_ERROR: "date format error, expected YYYYMMDD"
 }
@@ -1,10 +1,20 @@
 """Pcrmc entry point script."""
 # pcrmc/__main__.py
 
-from pcrmc import cli, __app_name__
+import sys
+from pcrmc import __app_name__, __version__
 
 
 def main():
+    if sys.argv[1:] in (["--version"], ["-v"]):
+        # answer without loading typer or the database layer
+        print(f"{__app_name__} v{__version__}")
+        return
+    from pcrmc import daemon
+    exit_code = daemon.forward(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+    from pcrmc import cli
     cli.app(prog_name=__app_name__)
 
 
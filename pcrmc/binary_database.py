@@ -0,0 +1,347 @@
+"""This module provides the PCRMC binary snapshot storage backend
+
+A binary database works like a JSON one, with the same journal, ID
+counters and document cache, but its snapshot is stored column by
+column instead of as indented JSON:
+
+    b"PCRMC", version byte, compression byte, then (compressed)
+    meta length (uint32), meta JSON, the column arrays back to back
+
+The meta JSON holds the header keys, the row counts, the string
+dictionaries and the layout of the arrays. IDs are int64 columns,
+strings are dictionary codes, participants a flat int32 column with a
+count per meeting. Values that do not fit their column, and fields the
+schema does not know, are kept as JSON per record, so every document
+of the JSON schema round-trips.
+"""
+# pcrmc/binary_database.py
+
+import json
+import lzma
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from pathlib import Path
+from typing import AbstractSet, Any, Dict, Iterator, List, Optional, Tuple
+from pcrmc import DB_WRITE_ERROR, SUCCESS
+from pcrmc.database import (DEFAULT_JOURNAL_LIMIT, DatabaseHandler,
+                            journal_path)
+from pcrmc.locking import atomic_write
+from pcrmc.metrics import METRICS
+from pcrmc.records import (PARTICIPANT_TYPECODE, RECORDS, Contact, Meeting,
+                           Record, to_json)
+from pcrmc.search import search_path
+
+MAGIC = b"PCRMC"
+VERSION = 1
+DEFAULT_COMPRESSION = "zlib"
+COMPRESSION_CODES = {"none": 0, "zlib": 1, "lzma": 2}
+# Column kind of every schema field, in the order of the BUILDERS.
+COLUMNS = {
+    "Contacts": {"ID": "int", "Name": "str", "Country": "str",
+                 "Industry": "str"},
+    "Meetings": {"ID": "int", "Participants": "ints", "Date": "str",
+                 "Loc": "str", "Topics": "strs"},
+}
+# Markers for a missing ID and missing participants.
+MISSING_INT = -(1 << 63)
+MISSING_COUNT = 0xFFFFFFFF
+_HEADER = struct.Struct("<5sBB")
+_LENGTH = struct.Struct("<I")
+_new = object.__new__
+
+
+class SnapshotError(json.JSONDecodeError):
+    """A binary snapshot that cannot be read.
+
+    A JSONDecodeError, so the handlers report it as JSON_ERROR like any
+    other unreadable database.
+    """
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message, "", 0)
+
+
+def _compress(payload: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(payload, 6)
+    if compression == "lzma":
+        return lzma.compress(payload)
+    return payload
+
+
+def _decompress(body: bytes, code: int) -> bytes:
+    try:
+        if code == COMPRESSION_CODES["zlib"]:
+            return zlib.decompress(body)
+        if code == COMPRESSION_CODES["lzma"]:
+            return lzma.decompress(body)
+    except (zlib.error, lzma.LZMAError) as error:
+        raise SnapshotError(f"corrupt snapshot: {error}") from error
+    if code != COMPRESSION_CODES["none"]:
+        raise SnapshotError(f"unknown compression {code}")
+    return body
+
+
+class _Column:
+    """Collects the values of one field, see encode_document."""
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.values: Dict[Any, int] = {}
+        if kind == "int":
+            self.data = array("q")
+        else:
+            # dictionary codes, or participant counts, 0 means missing
+            self.data = array("I")
+        self.flat = array(PARTICIPANT_TYPECODE)
+
+    def add(self, value: Any) -> bool:
+        """Add a value, False if it does not fit the column."""
+        kind = self.kind
+        if kind == "int":
+            if value is None:
+                self.data.append(MISSING_INT)
+                return True
+            if type(value) is int and MISSING_INT < value < 1 << 63:
+                self.data.append(value)
+                return True
+            self.data.append(MISSING_INT)
+            return False
+        if kind == "ints":
+            if type(value) is array and value.typecode == \
+                    PARTICIPANT_TYPECODE:
+                self.data.append(len(value))
+                self.flat.extend(value)
+                return True
+            self.data.append(MISSING_COUNT)
+            return value is None
+        if value is None:
+            self.data.append(0)
+            return True
+        if kind == "str" and type(value) is not str \
+                or kind == "strs" and (type(value) is not tuple or any(
+                    type(item) is not str for item in value)):
+            self.data.append(0)
+            return False
+        code = self.values.get(value)
+        if code is None:
+            code = self.values[value] = len(self.values) + 1
+        self.data.append(code)
+        return True
+
+
+def encode_document(document: Dict[str, Any],
+                    compression: str = DEFAULT_COMPRESSION) -> bytes:
+    """Return a document of the JSON schema as a binary snapshot."""
+    arrays: List[array] = []
+    meta: Dict[str, Any] = {
+        "header": {key: value for key, value in document.items()
+                   if key not in RECORDS},
+        "tables": {},
+        "byteorder": sys.byteorder,
+        "arrays": [],
+    }
+    for table, record_type in RECORDS.items():
+        if table not in document:
+            continue
+        kinds = COLUMNS[table]
+        columns = {key: _Column(kind) for key, kind in kinds.items()}
+        slots = [(record_type.FIELDS[key], columns[key]) for key in kinds]
+        irregular = []
+        for row, record in enumerate(document[table]):
+            record = record_type.from_json(record)
+            misfits = None
+            for slot, column in slots:
+                if not column.add(getattr(record, slot)):
+                    misfits = misfits or {}
+                    misfits[slot] = True
+            if misfits or record.extra:
+                fields = {key: record[key] for key, slot in
+                          record_type.FIELDS.items() if slot in
+                          (misfits or ())}
+                fields.update(record.extra or {})
+                irregular.append([row, fields])
+        strings = {}
+        for key, column in columns.items():
+            arrays.append(column.data)
+            if column.kind == "ints":
+                arrays.append(column.flat)
+            elif column.kind != "int":
+                strings[key] = list(column.values)
+        meta["tables"][table] = {"rows": len(document[table]),
+                                 "strings": strings,
+                                 "irregular": irregular}
+    meta["arrays"] = [[data.typecode, len(data)] for data in arrays]
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(",", ":"),
+                            default=to_json).encode("utf-8", "surrogatepass")
+    payload = b"".join([_LENGTH.pack(len(meta_bytes)), meta_bytes]
+                       + [data.tobytes() for data in arrays])
+    header = _HEADER.pack(MAGIC, VERSION, COMPRESSION_CODES[compression])
+    return header + _compress(payload, compression)
+
+
+def _arrays(meta: Dict[str, Any], payload: memoryview,
+            offset: int) -> Iterator[array]:
+    swap = meta["byteorder"] != sys.byteorder
+    for typecode, count in meta["arrays"]:
+        data = array(typecode)
+        end = offset + count * data.itemsize
+        if end > len(payload):
+            raise SnapshotError("snapshot cut short")
+        data.frombytes(payload[offset:end])
+        if swap:
+            data.byteswap()
+        offset = end
+        yield data
+
+
+def _decode_column(kind: str, data: array, arrays: Iterator[array],
+                   strings: Optional[List[Any]], intern: bool) -> List[Any]:
+    if kind == "int":
+        return [None if value == MISSING_INT else value for value in data]
+    if kind == "ints":
+        flat = next(arrays)
+        ends = list(accumulate(0 if count == MISSING_COUNT else count
+                               for count in data))
+        return [None if count == MISSING_COUNT else flat[end - count:end]
+                for count, end in zip(data, ends)]
+    if kind == "strs":
+        values = [None] + [tuple(map(sys.intern, topics))
+                           for topics in strings or ()]
+    else:
+        values = [None] + [sys.intern(value) if intern else value
+                           for value in strings or ()]
+    return list(map(values.__getitem__, data))
+
+
+# Spelled out per table, these run for every record of the database.
+def _build_contacts(columns: List[List[Any]]) -> List[Record]:
+    contacts: List[Record] = []
+    append = contacts.append
+    for id, name, country, industry in zip(*columns):
+        contact = _new(Contact)
+        contact.id = id
+        contact.name = name
+        contact.country = country
+        contact.industry = industry
+        contact.extra = None
+        append(contact)
+    return contacts
+
+
+def _build_meetings(columns: List[List[Any]]) -> List[Record]:
+    meetings: List[Record] = []
+    append = meetings.append
+    for id, participants, date, loc, topics in zip(*columns):
+        meeting = _new(Meeting)
+        meeting.id = id
+        meeting.participants = participants
+        meeting.date = date
+        meeting.loc = loc
+        meeting.topics = topics
+        meeting.extra = None
+        append(meeting)
+    return meetings
+
+
+BUILDERS = {"Contacts": _build_contacts, "Meetings": _build_meetings}
+
+
+def decode_document(snapshot: bytes) -> Tuple[Dict[str, Any], str]:
+    """Return the document of a binary snapshot and its compression.
+
+    Raises SnapshotError if it is no snapshot or a damaged one.
+    """
+    if len(snapshot) < _HEADER.size:
+        raise SnapshotError("not a pcrmc snapshot")
+    magic, version, code = _HEADER.unpack_from(snapshot)
+    if magic != MAGIC:
+        raise SnapshotError("not a pcrmc snapshot")
+    if version > VERSION:
+        raise SnapshotError(f"snapshot version {version} is too new")
+    compression = {code: name for name, code
+                   in COMPRESSION_CODES.items()}.get(code, "")
+    payload = memoryview(_decompress(snapshot[_HEADER.size:], code))
+    try:
+        meta_length, = _LENGTH.unpack_from(payload)
+        meta = json.loads(bytes(payload[4:4 + meta_length])
+                          .decode("utf-8", "surrogatepass"))
+        arrays = _arrays(meta, payload, 4 + meta_length)
+        document = dict(meta["header"])
+        for table, layout in meta["tables"].items():
+            record_type = RECORDS[table]
+            columns = [_decode_column(kind, next(arrays), arrays,
+                                      layout["strings"].get(key),
+                                      key in record_type.CONVERT)
+                       for key, kind in COLUMNS[table].items()]
+            if any(len(column) != layout["rows"] for column in columns):
+                raise SnapshotError(f"{table} columns differ in length")
+            records = BUILDERS[table](columns)
+            for row, fields in layout["irregular"]:
+                records[row].update(fields)
+            document[table] = records
+    except (KeyError, IndexError, TypeError, ValueError, StopIteration,
+            struct.error) as error:
+        if isinstance(error, json.JSONDecodeError):
+            raise
+        raise SnapshotError(f"corrupt snapshot: {error!r}") from error
+    return document, compression
+
+
+def init_binary_database(db_path: Path,
+                         compression: str = DEFAULT_COMPRESSION) -> int:
+    """Create an empty binary pcrmc database."""
+    try:
+        empty = {"Generation": 0, "Contacts": [], "Meetings": []}
+        atomic_write(db_path, encode_document(empty, compression))
+        for stale in (journal_path(db_path), search_path(db_path)):
+            if stale.exists():
+                stale.unlink()
+        return SUCCESS
+    except OSError:
+        return DB_WRITE_ERROR
+
+
+class BinaryDatabaseHandler(DatabaseHandler):
+    """A DatabaseHandler with binary snapshots.
+
+    Snapshots are written with the given compression, or with the one
+    the database was written with when it is None.
+    """
+
+    def __init__(self, db_path: Path,
+                 journal_limit: int = DEFAULT_JOURNAL_LIMIT,
+                 compression: Optional[str] = None) -> None:
+        super().__init__(db_path, journal_limit)
+        self.compression = compression
+
+    def _read_snapshot(self, meetings: bool = True) -> Dict[str, Any]:
+        with METRICS.timer("io"):
+            snapshot = self._db_path.read_bytes()
+        METRICS.read(len(snapshot))
+        with METRICS.timer("parse"):
+            document, compression = decode_document(snapshot)
+        for table in RECORDS:
+            document.setdefault(table, [])
+        if self.compression is None:
+            self.compression = compression
+        return document
+
+    def _write_snapshot(self, data: Dict[str, Any]) -> bytes:
+        with METRICS.timer("serialize"):
+            snapshot = encode_document(
+                data, self.compression or DEFAULT_COMPRESSION)
+        with METRICS.timer("io"):
+            atomic_write(self._db_path, snapshot)
+        METRICS.written(len(snapshot))
+        return snapshot
+
+    def _stream(self, table: str, ids: Optional[AbstractSet[int]] = None
+                ) -> Iterator[Record]:
+        # a compressed snapshot cannot be read record by record, but
+        # a loaded one is served from the document cache
+        self._load()
+        return super()._stream(table, ids)
@@ -2,60 +2,474 @@
 # pcrmc/cli.py
 
 from pathlib import Path
-from typing import List, Optional
+from typing import (TYPE_CHECKING, Any, Callable, Dict, List, Optional,
+                    Sequence)
+import sys
+import time
 import typer
-import json
-from pcrmc import ERRORS, __app_name__, __version__, config, database,\
-    pcrmc, SUCCESS
-from datetime import datetime, date
-app = typer.Typer()
+from pcrmc import BACKENDS, COMPRESSIONS, ERRORS, PARTITION_BY, \
+    __app_name__, __version__, SUCCESS, ID_ERROR
+from pcrmc.metrics import LAYERS, METRICS, format_bytes
+
+if TYPE_CHECKING:
+    from pcrmc import config, database, graph, pcrmc
+
+# The database layer and the other pcrmc modules are imported by the
+# commands that need them, so --help and completion never load them.
+# plain click help, rich would cost more to import than pcrmc itself
+app = typer.Typer(rich_markup_mode=None)
+
+
+def secho(*args: Any, **kwargs: Any) -> None:
+    with METRICS.timer("render"):
+        typer.secho(*args, **kwargs)
+
+
+def echo(*args: Any, **kwargs: Any) -> None:
+    with METRICS.timer("render"):
+        typer.echo(*args, **kwargs)
+
+
+def _check_choice(option: str, value: str, choices: Sequence[str]) -> None:
+    if value not in choices:
+        secho(
+                f'Unknown {option} "{value}", choose one of '
+                f'{", ".join(choices)}',
+                fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
 
 
 @app.command()
 def init(
-        db_path: str = typer.Option(
-            str(database.DEFAULT_DB_FILE_PATH),
+        db_path: Optional[str] = typer.Option(
+            None,
             "--db-path",
             "-db",
-            prompt="pcrmc database location?",
+            show_default="~/.<user>_pcrmc.json",
+        ),
+        backend: str = typer.Option(
+            "json",
+            "--backend",
+            "-b",
+            help=f"Storage backend, one of {', '.join(BACKENDS)}.",
+        ),
+        compression: str = typer.Option(
+            "zlib", "--compression", "-c",
+            help=f"Binary snapshots only, one of {', '.join(COMPRESSIONS)}.",
+        ),
+        partition_by: str = typer.Option(
+            "year", "--partition-by",
+            help="Partitioned meetings only, one file per year or month.",
         ),
 ) -> None:
     """Initialize the pcrmc database."""
-    app_init_error = config.init_app(db_path)
+    from pcrmc import config, database
+    _check_choice("backend", backend, BACKENDS)
+    _check_choice("compression", compression, COMPRESSIONS)
+    _check_choice("partition-by", partition_by, PARTITION_BY)
+    if db_path is None:
+        # the default needs the home directory, so only look it up here
+        db_path = typer.prompt("pcrmc database location?",
+                               default=str(database.default_db_path()))
+    app_init_error = config.init_app(db_path, backend)
     if app_init_error:
-        typer.secho(
+        secho(
                 f'Creating config file failed with "{ERRORS[app_init_error]}"',
                 fg=typer.colors.RED,
         )
         raise typer.Exit(1)
-    db_init_error = database.init_database(Path(db_path))
+    db_init_error = database.init_database(Path(db_path), backend,
+                                           compression, partition_by)
     if db_init_error:
-        typer.secho(
+        secho(
                 f'Creating database failed with "{ERRORS[db_init_error]}"',
                 typer.colors.RED,
         )
         raise typer.Exit(1)
     else:
-        typer.secho(f"The pcrmc database is {db_path}", fg=typer.colors.GREEN)
+        secho(f"The pcrmc database is {db_path}", fg=typer.colors.GREEN)
 
 
-def get_contacter() -> pcrmc.Contacter:
-    if config.CONFIG_FILE_PATH.exists():
-        db_path = database.get_database_path(config.CONFIG_FILE_PATH)
-    else:
-        typer.secho(
+def get_database_config() -> "database.DatabaseConfig":
+    from pcrmc import config, database
+    db_config = database.get_database_config(config.config_file_path())
+    if db_config is None:
+        secho(
                 'Config file not found. Please run "pcrmc init"',
                 fg=typer.colors.RED,
         )
         raise typer.Exit(1)
-    if db_path.exists():
-        return pcrmc.Contacter(db_path)
-    else:
-        typer.secho(
+    if not db_config.path.exists():
+        secho(
                 'Database not found. Please run "pcrmc init"',
                 fg=typer.colors.RED,
         )
         raise typer.Exit(1)
+    migrate_error = config.migrate_id_counters(db_config)
+    if migrate_error:
+        secho(
+                f'Moving the ID counters into the database failed with '
+                f'"{ERRORS[migrate_error]}"',
+                fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    return db_config
+
+
+def get_cadence_config() -> "config.CadenceConfig":
+    from pcrmc import config
+    try:
+        return config.get_cadence_config(config.config_file_path())
+    except ValueError as error:
+        secho(f"Invalid cadence in the config file: {error}",
+              fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+
+# `pcrmc serve` sets this to hand out its warm Contacter instead
+contacter_factory: Optional[
+    Callable[["database.DatabaseConfig"], "pcrmc.Contacter"]] = None
+
+
+def get_contacter() -> "pcrmc.Contacter":
+    from pcrmc import pcrmc
+    db_config = get_database_config()
+    if contacter_factory is not None:
+        return contacter_factory(db_config)
+    return pcrmc.Contacter(
+        db_config.path, db_config.backend, db_config.journal_limit)
+
+
+@app.command()
+def migrate(
+        db_path: str = typer.Option(
+            ...,
+            "--db-path",
+            "-db",
+            prompt="new pcrmc database location?",
+        ),
+        backend: str = typer.Option("sqlite", "--backend", "-b"),
+        compression: str = typer.Option(
+            "zlib", "--compression", "-c",
+            help=f"Binary snapshots only, one of {', '.join(COMPRESSIONS)}.",
+        ),
+) -> None:
+    """Copy the database into another backend and switch to it."""
+    from pcrmc import config, database
+    _check_choice("backend", backend, BACKENDS)
+    _check_choice("compression", compression, COMPRESSIONS)
+    db_config = get_database_config()
+    if Path(db_path).resolve() == db_config.path.resolve():
+        secho(
+                "The new database must not replace the current one",
+                fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    source = database.get_database_handler(
+        db_config.path, db_config.backend, db_config.journal_limit)
+    migrate_error = database.migrate_database(source, Path(db_path), backend,
+                                              compression)
+    if migrate_error:
+        secho(
+                f'Migrating database failed with "{ERRORS[migrate_error]}"',
+                fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    config_error = config.set_database(db_path, backend)
+    if config_error:
+        secho(
+                f'Updating config file failed with "{ERRORS[config_error]}"',
+                fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    secho(
+        f"The pcrmc database is {db_path} ({backend})",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command()
+def convert(
+        backend: str = typer.Option(
+            "binary", "--backend", "-b",
+            help="json, binary or partitioned."),
+        compression: str = typer.Option(
+            "zlib", "--compression", "-c",
+            help=f"Binary snapshots only, one of {', '.join(COMPRESSIONS)}.",
+        ),
+        partition_by: str = typer.Option(
+            "year", "--partition-by",
+            help="Partitioned meetings only, one file per year or month.",
+        ),
+) -> None:
+    """Rewrite the database in place as JSON, as a binary snapshot or
+    with meetings partitioned by date.
+
+    Use migrate to move to or from SQLite.
+    """
+    from pcrmc import config, database
+    snapshot_backends = ("json", "binary", "partitioned")
+    _check_choice("backend", backend, snapshot_backends)
+    _check_choice("compression", compression, COMPRESSIONS)
+    _check_choice("partition-by", partition_by, PARTITION_BY)
+    db_config = get_database_config()
+    if db_config.backend not in snapshot_backends:
+        secho(
+                f"Cannot convert a {db_config.backend} database, "
+                "use pcrmc migrate",
+                fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    source = database.get_database_handler(
+        db_config.path, db_config.backend, db_config.journal_limit)
+    size = db_config.path.stat().st_size
+    convert_error = database.convert_database(source, backend, compression,
+                                              partition_by)
+    if convert_error:
+        secho(
+                f'Converting database failed with "{ERRORS[convert_error]}"',
+                fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    config_error = config.set_database(str(db_config.path), backend)
+    if config_error:
+        secho(
+                f'Updating config file failed with "{ERRORS[config_error]}"',
+                fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    secho(
+        f"The pcrmc database is {db_config.path} ({backend}), "
+        f"{format_bytes(size)} before, "
+        f"{format_bytes(db_config.path.stat().st_size)} now",
+        fg=typer.colors.GREEN,
+    )
+
+
+# A fuzzy name match must beat the runner-up by this much to be used.
+AMBIGUITY_MARGIN = 0.1
+
+
+def _resolve_contacts(contacter: "pcrmc.Contacter",
+                      refs: Sequence[str]) -> List[int]:
+    """Turn contact IDs or (misspelt) names into contact IDs."""
+    ids = []
+    for ref in refs:
+        if ref.isdigit():
+            ids.append(int(ref))
+            continue
+        matches, error = contacter.find_contacts(ref)
+        if error:
+            secho(
+                f'Looking up "{ref}" failed with "{ERRORS[error]}"',
+                fg=typer.colors.RED
+            )
+            raise typer.Exit(1)
+        if not matches:
+            secho(f'No contact matches "{ref}"', fg=typer.colors.RED)
+            raise typer.Exit(1)
+        best = matches[0]
+        exact = best.name.casefold() == ref.casefold()
+        if not exact and len(matches) > 1 and \
+                best.similarity - matches[1].similarity < AMBIGUITY_MARGIN:
+            secho(f'"{ref}" is ambiguous, use one of these IDs:',
+                  fg=typer.colors.RED)
+            for match in matches:
+                secho(f"  {match.id}: {match.name}")
+            raise typer.Exit(1)
+        if not exact:
+            secho(f'Using {best.name} ({best.id}) for "{ref}"',
+                  fg=typer.colors.YELLOW)
+        ids.append(best.id)
+    return ids
+
+
+def _since(since: str, last_days: Optional[int]) -> str:
+    """Combine --since and --last-days into one YYYYMMDD lower bound.
+
+    --since is checked here, a malformed one must not quietly lose to
+    the --last-days date.
+    """
+    from datetime import date, datetime, timedelta
+    if last_days is None:
+        return since
+    first_day = date.today() - timedelta(days=last_days)
+    if since:
+        try:
+            first_day = max(first_day,
+                            datetime.strptime(since, "%Y%m%d").date())
+        except ValueError:
+            secho(
+                f'Invalid --since date "{since}", use YYYYMMDD',
+                fg=typer.colors.RED, err=True
+            )
+            raise typer.Exit(1)
+    return first_day.strftime("%Y%m%d")
+
+
+@app.command("import")
+def import_(
+        file: str = typer.Argument(
+            ..., help='CSV or JSONL file to import, "-" reads stdin.'),
+        kind: str = typer.Option("contacts", "--kind", "-k"),
+        format: str = typer.Option(str(), "--format", "-f"),
+        batch_size: int = typer.Option(1000, "--batch-size", "-b", min=1),
+) -> None:
+    """Import contacts or meetings from a CSV or JSONL file.
+
+    Contacts keep the IDs of an export, so import contacts before their
+    meetings. Contacts whose ID is taken are skipped.
+    """
+    from pcrmc import transfer
+    format = format or transfer.guess_format(file)
+    _check_choice("kind", kind, transfer.KINDS)
+    _check_choice("format", format, transfer.FORMATS)
+    contacter = get_contacter()
+
+    def on_batch(done: int, seconds: float) -> None:
+        secho(
+            f"pcrmc: {done} {kind} imported"
+            f" ({done / max(seconds, 1e-9):.0f} records/s)",
+            fg=typer.colors.BLUE, err=True,
+        )
+
+    def on_reject(rejected: transfer.Rejected) -> None:
+        secho(
+            f"pcrmc: line {rejected.line} skipped, {rejected.reason}",
+            fg=typer.colors.YELLOW, err=True,
+        )
+
+    try:
+        with transfer.open_input(file) as input_file:
+            report = transfer.import_records(
+                contacter,
+                transfer.read_rows(input_file, format),
+                kind,
+                batch_size,
+                on_batch,
+                on_reject,
+            )
+    except OSError as error:
+        secho(f"Reading {file} failed: {error}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    if report.error:
+        secho(
+            f'Import failed after {report.imported} {kind} with '
+            f'"{ERRORS[report.error]}"',
+            fg=typer.colors.RED
+        )
+        raise typer.Exit(1)
+    secho(
+        f"pcrmc: {report.imported} {kind} imported, {report.rejected} skipped"
+        f" in {report.seconds:.2f}s"
+        f" ({report.imported / max(report.seconds, 1e-9):.0f} records/s)",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command()
+def export(
+        kind: str = typer.Option("meetings", "--kind", "-k"),
+        format: str = typer.Option("jsonl", "--format", "-f"),
+        output: str = typer.Option(
+            "-", "--output", "-o", help='Output file, "-" writes stdout.'),
+        participants: List[int] = typer.Option([], "--participants", "-p"),
+        date: str = typer.Option(str(), "--date", "-d"),
+        loc: str = typer.Option(str(), "--location", "-l"),
+        topics: List[str] = typer.Option([], "--topics", "-t"),
+        since: str = typer.Option(str(), "--since", help="YYYYMMDD"),
+        until: str = typer.Option(str(), "--until", help="YYYYMMDD"),
+        last_days: Optional[int] = typer.Option(
+            None, "--last-days", min=0, help="Only the last N days."),
+) -> None:
+    """Export contacts or meetings as JSONL or CSV."""
+    from pcrmc import transfer
+    _check_choice("kind", kind, transfer.KINDS)
+    _check_choice("format", format, transfer.FORMATS)
+    since = _since(since, last_days)
+    has_filters = participants or date or loc or topics or since or until
+    if kind == "contacts" and has_filters:
+        secho(
+            "Filters only apply to meetings", fg=typer.colors.RED, err=True)
+        raise typer.Exit(1)
+    contacter = get_contacter()
+    if kind == "contacts":
+        records, error = contacter.iter_contacts()
+    else:
+        records, error = contacter.iter_meetings(
+            participants, date, loc, topics, since, until)
+    if error:
+        secho(
+            f'Export failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED, err=True
+        )
+        raise typer.Exit(1)
+
+    try:
+        if output == "-":
+            with METRICS.timer("serialize"):
+                transfer.write_records(records, sys.stdout, format, kind)
+            sys.stdout.flush()
+        else:
+            with open(output, "w", newline="", encoding="utf-8") as file, \
+                    METRICS.timer("serialize"):
+                count = transfer.write_records(records, file, format, kind)
+            secho(
+                f"pcrmc: {count} {kind} exported to {output}",
+                fg=typer.colors.GREEN, err=True,
+            )
+    except BrokenPipeError:
+        # the reading end of a pipe went away, e.g. "pcrmc export | head"
+        sys.stderr.close()
+        raise typer.Exit()
+
+
+@app.command()
+def search(
+        query: List[str] = typer.Argument(...),
+        limit: int = typer.Option(20, "--limit", "-n", min=1),
+        rebuild: bool = typer.Option(
+            False, "--rebuild", help="Rebuild the search index first."),
+) -> None:
+    """Search contacts and meetings, prefixes match too."""
+    contacter = get_contacter()
+    if rebuild:
+        response = contacter.rebuild_search_index()
+        if response.error:
+            secho(
+                f'Rebuilding search index failed with '
+                f'"{ERRORS[response.error]}"',
+                fg=typer.colors.RED
+            )
+            raise typer.Exit(1)
+    started = time.perf_counter()
+    results, error = contacter.search(" ".join(query), limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    if error:
+        secho(
+            f'Search failed with "{ERRORS[error]}"', fg=typer.colors.RED
+        )
+        raise typer.Exit(1)
+    if not results:
+        secho("Nothing found.", fg=typer.colors.RED)
+        raise typer.Exit()
+    for hit, record in results:
+        if hit.kind == "contact":
+            secho(
+                f"Contact {hit.id}: {record['Name']} ({record['Country']}"
+                f" / {record['Industry']})",
+                fg=typer.colors.GREEN,
+            )
+        else:
+            secho(
+                f"Meeting {hit.id}: {record['Date']} at {record['Loc']}"
+                f" with {list(record['Participants'])}"
+                f" {list(record['Topics'])}",
+                fg=typer.colors.BLUE,
+            )
+    secho(f"{len(results)} results in {elapsed:.1f} ms")
 
 
 @app.command()
@@ -68,62 +482,122 @@ def add_contact(name: List[str] = typer.Argument(...),
     contact, error = contacter.add(name, country, industry)
 
     if error:
-        typer.secho(
+        secho(
             f'Adding Contact failed with "{ERRORS[error]}"',
             fg=typer.colors.RED
         )
         raise typer.Exit(1)
     else:
-        typer.secho(
+        secho(
             f"pcrmc: {contact['Name']} ({contact['Country']}"
             f" / {contact['Industry']}) was added",
             fg=typer.colors.GREEN,
         )
 
 
+def _pairs(option: str, items: Sequence[str]) -> Dict[str, str]:
+    """Parse FIELD=VALUE options."""
+    pairs = {}
+    for item in items:
+        field, equals, value = item.partition("=")
+        if not equals or not field:
+            secho(f'--{option} expects FIELD=VALUE, got "{item}"',
+                  fg=typer.colors.RED)
+            raise typer.Exit(1)
+        pairs[field] = value
+    return pairs
+
+
+def _selected_contacts(contacter: "pcrmc.Contacter",
+                       contact: Optional[str],
+                       where: Sequence[str]) -> List[int]:
+    """Return the ID of contact, or the IDs of the contacts matching
+    every --where FIELD=VALUE."""
+    if (contact is None) == (not where):
+        secho("Give either a contact or --where", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if contact is not None:
+        return _resolve_contacts(contacter, [contact])
+    contacts, error = contacter.select_contacts(_pairs("where", where))
+    if error:
+        secho(
+            f'Getting contacts failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED
+        )
+        raise typer.Exit(1)
+    if not contacts:
+        secho("No contacts match", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    return [c["ID"] for c in contacts]
+
+
+def _done(ids: List[int], action: str) -> str:
+    if len(ids) == 1:
+        return f"pcrmc: Contact {ids[0]} {action}"
+    return f"pcrmc: {len(ids)} contacts {action}"
+
+
 @app.command()
-def modify_contact(id: int = typer.Argument(...),
-                   field: str = typer.Option(str(), "--field", "-f"),
-                   value: str = typer.Option(str(), "--value", "-v")
-                   ) -> None:
-    """Modify contact by id."""
+def modify_contact(
+        contact: Optional[str] = typer.Argument(None, help="ID or name."),
+        field: str = typer.Option(str(), "--field", "-f"),
+        value: str = typer.Option(str(), "--value", "-v"),
+        where: List[str] = typer.Option(
+            [], "--where", "-w",
+            help="FIELD=VALUE, modify all contacts matching every one."),
+        set_fields: List[str] = typer.Option(
+            [], "--set", "-s", help="FIELD=VALUE to change, may repeat."),
+) -> None:
+    """Modify a contact by id or name, or all contacts --where.
+
+    All changes are written at once.
+    """
+    fields = _pairs("set", set_fields)
+    if field:
+        fields[field] = value
+    if not fields or "ID" in fields:
+        secho("Give the fields to change with --set or --field and "
+              "--value, IDs cannot be changed", fg=typer.colors.RED)
+        raise typer.Exit(1)
     contacter = get_contacter()
-    response = contacter.modify_contact(id, field, value)
+    ids = _selected_contacts(contacter, contact, where)
+    response = contacter.modify_contacts({id: dict(fields) for id in ids})
 
     if response.error:
-        typer.secho(
+        secho(
             f'modify_contact failed with "{ERRORS[response.error]}\n"',
             # f'Debug: response \n"{json.dumps(response, indent=4)}"',
             fg=typer.colors.RED
         )
         raise typer.Exit(1)
     else:
-        typer.secho(
-            f"pcrmc: Contact {id} modified",
+        secho(
+            _done(ids, "modified"),
             fg=typer.colors.GREEN,
         )
 
 
 @app.command()
-def detail_contact(id: int = typer.Argument(...)) -> None:
-    """Modify contact by id."""
+def detail_contact(
+        contact: str = typer.Argument(..., help="ID or name.")) -> None:
+    """Show contact by id or name."""
+    import json
+    from pcrmc.records import to_json
     contacter = get_contacter()
-    contact_list, error = contacter.get_contacts()
-    contact = []
-
-    for c in contact_list:
-        if c["ID"] == id:
-            contact = c
+    id, = _resolve_contacts(contacter, [contact])
+    details, error = contacter.get_contact(id)
+    if error == ID_ERROR:
+        details, error = {}, SUCCESS
 
-    contact_string = json.dumps(contact, indent=4)
+    contact_string = json.dumps(details, indent=4, default=to_json)
     if error:
-        typer.secho(
+        secho(
             f'detail_contact failed with "{ERRORS[error]}"',
             fg=typer.colors.RED
         )
         raise typer.Exit(1)
     else:
-        typer.secho(
+        secho(
             f"Contact Details\n"
             f"{contact_string}",
             fg=typer.colors.GREEN,
@@ -131,37 +605,55 @@ def detail_contact(id: int = typer.Argument(...)) -> None:
 
 
 @app.command()
-def rm_contact(id: int = typer.Argument(...)) -> None:
-    """Delete contact by id."""
+def rm_contact(
+        contact: Optional[str] = typer.Argument(None, help="ID or name."),
+        where: List[str] = typer.Option(
+            [], "--where", "-w",
+            help="FIELD=VALUE, delete all contacts matching every one."),
+) -> None:
+    """Delete a contact by id or name, or all contacts --where.
+
+    Deleted contacts are also taken out of their meetings.
+    """
     contacter = get_contacter()
-    response = contacter.delete_contact(id)
+    ids = _selected_contacts(contacter, contact, where)
+    response = contacter.delete_contacts(ids)
 
     if response.error:
-        typer.secho(
+        secho(
             f'Dm_contact failed with "{ERRORS[response.error]}"',
             fg=typer.colors.RED
         )
         raise typer.Exit(1)
     else:
-        typer.secho(
-            f"pcrmc: Contact {id} removed",
+        secho(
+            _done(ids, "removed"),
             fg=typer.colors.GREEN,
         )
 
 
 @app.command()
 def add_meeting(
-        participants: List[int] = typer.Argument(...),
+        participant_refs: List[str] = typer.Argument(
+            ..., metavar="PARTICIPANTS...", help="Contact IDs or names."),
         date: str = typer.Option(str(), "--date", "-d"),
         loc: str = typer.Option(str(), "--location", "-l"),
         topics: List[str] = typer.Option([], "--topics", "-t")) -> None:
-    """Add a new to-do with a DESCRIPTION."""
+    """Add a new meeting with PARTICIPANTS given by ID or name."""
+    from pcrmc import pcrmc
     contacter = get_contacter()
-    meeting = pcrmc.generateMeeting(participants, date, loc, topics)
+    participants = _resolve_contacts(contacter, participant_refs)
+    meeting, error = pcrmc.generateMeeting(participants, date, loc, topics)
+    if error:
+        secho(
+            f'Adding Meeting failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED
+        )
+        raise typer.Exit(1)
 
     contacts = contacter.get_contacts()
     if contacts.error:
-        typer.secho(
+        secho(
             f'Adding Meeting failed with "{ERRORS[contacts.error]}"',
             fg=typer.colors.RED
         )
@@ -174,83 +666,308 @@ def add_meeting(
     error = contacter.addMeeting(meeting)
 
     if error:
-        typer.secho(
+        secho(
             f'Adding Meeting failed with "{ERRORS[error]}"',
             fg=typer.colors.RED
         )
         raise typer.Exit(1)
     else:
-        typer.secho(
+        secho(
             f'pcrmc: Meeting between {" and ".join(part_names)} '
-            f'at {loc} ({date}) was added',
+            f'at {loc} ({meeting["Date"]}) was added',
             fg=typer.colors.GREEN,
         )
 
 
 @app.command()
-def list_contacts() -> None:
-    """List all contacts."""
+def modify_meeting(id: int = typer.Argument(...),
+                   field: str = typer.Option(str(), "--field", "-f"),
+                   value: str = typer.Option(str(), "--value", "-v")
+                   ) -> None:
+    """Modify meeting by id."""
+    if not field or field == "ID":
+        secho("Give the field to change with --field, IDs cannot be "
+              "changed", fg=typer.colors.RED)
+        raise typer.Exit(1)
     contacter = get_contacter()
-    contact_list, error = contacter.get_contacts()
+    new_value: Any = value
+    if field == "Participants":
+        try:
+            new_value = [int(p) for p in value.split(",") if p]
+        except ValueError:
+            secho(
+                f'modify_meeting failed, "{value}" is not a list of '
+                'contact IDs',
+                fg=typer.colors.RED
+            )
+            raise typer.Exit(1)
+    elif field == "Topics":
+        new_value = [t for t in value.split(",") if t]
+    response = contacter.modify_meeting(id, field, new_value)
+
+    if response.error:
+        secho(
+            f'modify_meeting failed with "{ERRORS[response.error]}"',
+            fg=typer.colors.RED
+        )
+        raise typer.Exit(1)
+    else:
+        secho(
+            f"pcrmc: Meeting {id} modified",
+            fg=typer.colors.GREEN,
+        )
+
+
+@app.command()
+def serve() -> None:
+    """Keep the database loaded in a daemon that answers other pcrmc calls."""
+    from pcrmc import daemon
+    if not daemon.supported():
+        secho("serve needs Unix domain sockets", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    db_config = get_database_config()
+    path = daemon.socket_path()
+    if daemon.is_running(path):
+        secho(f"pcrmc is already served on {path}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    secho(f"Serving {db_config.path} on {path}, stop with Ctrl+C",
+          fg=typer.colors.GREEN)
+    daemon.serve(path)
+
+
+CONTACT_SORTS = ("id", "name", "last-meeting")
+MEETING_SORTS = ("id", "date")
+STATS_SORTS = ("meetings", "gap", "trend")
+
+
+def _styled(format: str) -> bool:
+    """Only color tables that end up on a terminal."""
+    return format == "table" and sys.stdout.isatty()
+
+
+@app.command()
+def list_contacts(
+        limit: Optional[int] = typer.Option(
+            None, "--limit", "-n", min=1, help="Show at most N contacts."),
+        offset: int = typer.Option(
+            0, "--offset", min=0, help="Skip the first N contacts."),
+        sort: str = typer.Option(
+            "id", "--sort", "-s", help=f"One of {', '.join(CONTACT_SORTS)}."),
+        reverse: bool = typer.Option(False, "--reverse", "-r"),
+        format: str = typer.Option(
+            "table", "--format", "-f",
+            help="One of table, plain, json, tsv."),
+) -> None:
+    """List all contacts, longest unmet first with --sort last-meeting."""
+    from datetime import date
+    from pcrmc import table
+    _check_choice("sort", sort, CONTACT_SORTS)
+    _check_choice("format", format, table.FORMATS)
+    styled = _styled(format)
+    # colors and this sort need the meetings, the rest streams contacts
+    needs_meetings = styled or sort == "last-meeting"
+    contacter = get_contacter()
+    # unless colors come from the recent meetings alone
+    if sort == "last-meeting" or styled and not contacter.prunes_dates:
+        contacts, error = contacter.get_contacts()
+    else:
+        contacts, error = contacter.iter_contacts()
     if error:
-        typer.secho(
+        secho(
             f'Listing contacts failed with "{ERRORS[error]}"',
             fg=typer.colors.RED
         )
         raise typer.Exit(1)
-    if len(contact_list) == 0:
-        typer.secho(
+    last_meetings = None
+    if needs_meetings:
+        since = ""
+        if sort != "last-meeting":
+            # colors only need the meetings of the longest threshold
+            days = max(get_cadence_config().colors, default=0)
+            since = date.fromordinal(
+                date.today().toordinal() - days + 1).strftime("%Y%m%d")
+        last_meetings, error = contacter.get_last_meetings(since)
+        if error != SUCCESS:
+            secho(
+                "Error reading meetings", fg=typer.colors.RED
+            )
+            raise typer.Exit(1)
+
+    def last_meeting(contact: Any) -> int:
+        stats = last_meetings.get(contact["ID"])
+        return -1 if stats is None else stats.last_ordinal
+
+    keys = {"id": None, "name": lambda c: c["Name"].casefold(),
+            "last-meeting": last_meeting}
+    contact_page = table.page(contacts, keys[sort], reverse, offset, limit)
+    if format == "json":
+        echo(table.render_json(contact_page), nl=False)
+        return
+    if not contact_page and offset == 0 and format != "tsv":
+        secho(
             "There are no contacts in the db", fg=typer.colors.RED
         )
         raise typer.Exit()
 
-    # TODO: Darstellung
-    typer.secho("\nContacts:\n", fg=typer.colors.BLUE, bold=True)
-    max_name_length = max([len(c["Name"]) for c in contact_list])
-    columns = (
-        "ID.  ",
-        f"| Name  {(max_name_length-4) * ' '}",
-        "| Country  ",
-        "| Industry  "
-    )
-    headers = "".join(columns)
-    typer.secho(headers, fg=typer.colors.BLUE, bold=True)
-    typer.secho("-" * len(headers), fg=typer.colors.BLUE)
-    for contact in contact_list:
-        id = contact["ID"]
-        name = contact["Name"]
-        country = contact["Country"]
-        industry = contact["Industry"]
-
-        color = typer.colors.BLUE
-        meetings, error = contacter.get_meetings()
-        if error != SUCCESS:
-            typer.secho(
-                "Error reading meetings", fg=typer.colors.RED
-            )
-            raise typer.Exit()
+    titles = ("ID", "Name", "Country", "Industry")
+    separator = ";" if format == "tsv" else None
+    rows = [[table.cell(contact.get(field), separator) for field in titles]
+            for contact in contact_page]
+    if format == "tsv":
+        echo(table.render_tsv(titles, rows), nl=False)
+        return
+    colors = []
+    if styled:
+        today = date.today().toordinal()
+        thresholds = list(zip(get_cadence_config().colors, (
+            typer.colors.GREEN, typer.colors.YELLOW, typer.colors.RED)))
+        for contact in contact_page:
+            color = None
+            stats = last_meetings.get(contact["ID"])
+            if stats is not None:
+                days_since_meeting = abs(today - stats.last_ordinal)
+                for days, threshold_color in thresholds:
+                    if days_since_meeting < days:
+                        color = threshold_color
+                        break
+            colors.append(color)
+    echo(table.render_table("Contacts", titles, rows, colors, styled,
+                            decorated=format == "table"), nl=False)
 
-        meetings = [m for m in meetings if id in m["Participants"]]
-        if len(meetings) > 0:
-            last_meeting = (max([m["Date"] for m in meetings]))
-            days_since_meeting = abs((date.today()-datetime.strptime(
-                last_meeting, "%Y%m%d").date()).days)
 
-            if days_since_meeting < 10:
-                color = typer.colors.GREEN
-            elif days_since_meeting < 20:
-                color = typer.colors.YELLOW
-            elif days_since_meeting < 30:
-                color = typer.colors.RED
+@app.command()
+def due(
+        limit: int = typer.Option(
+            10, "--limit", "-n", min=1, help="Show at most N contacts."),
+        format: str = typer.Option(
+            "table", "--format", "-f",
+            help="One of table, plain, json, tsv."),
+) -> None:
+    """List the contacts most overdue for a meeting.
 
-        typer.secho(
-            f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-            f"| {name}{(len(columns[1]) - len(str(name))-2) * ' '}"
-            f"| {country}{(len(columns[2]) - len(str(country))-2) * ' '}"
-            f"| {industry}{(len(columns[3]) - len(str(industry))-1) * ' '}",
-            fg=color,
+    Target intervals come from the Cadence sections of config.ini.
+    Contacts never met are not listed.
+    """
+    from datetime import date
+    from pcrmc import table
+    _check_choice("format", format, table.FORMATS)
+    cadence = get_cadence_config()
+    contacter = get_contacter()
+    overdue, error = contacter.overdue_contacts(cadence, limit)
+    if error:
+        secho(
+            f'Finding overdue contacts failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED
         )
-    typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE)
+        raise typer.Exit(1)
+    wanted = {entry.id for entry in overdue}
+    names = {}
+    if wanted:
+        contacts, error = contacter.iter_contacts()
+        names = {c["ID"]: c.get("Name", "") for c in contacts
+                 if c["ID"] in wanted}
+    today = date.today().toordinal()
+    records = [{"ID": entry.id, "Name": names.get(entry.id, ""),
+                "LastMeeting": date.fromordinal(entry.last_ordinal)
+                .strftime("%Y%m%d"),
+                "Interval": entry.interval,
+                "Overdue": today - entry.due_ordinal}
+               for entry in overdue]
+    if format == "json":
+        echo(table.render_json(records), nl=False)
+        return
+    if not records and format != "tsv":
+        secho("Nobody is overdue.", fg=typer.colors.GREEN)
+        return
+    titles = ("ID", "Name", "LastMeeting", "Interval", "Overdue")
+    rows = [[table.cell(record[field]) for field in titles]
+            for record in records]
+    if format == "tsv":
+        echo(table.render_tsv(titles, rows), nl=False)
+        return
+    echo(table.render_table("Overdue", titles, rows, None, _styled(format),
+                            decorated=format == "table"), nl=False)
+
+
+@app.command()
+def stats(
+        months: int = typer.Option(
+            6, "--months", "-m", min=1,
+            help="Compare the last N months with the N before."),
+        limit: int = typer.Option(
+            20, "--limit", "-n", min=1, help="Show at most N contacts."),
+        sort: str = typer.Option(
+            "meetings", "--sort", "-s",
+            help=f"One of {', '.join(STATS_SORTS)}."),
+        format: str = typer.Option(
+            "table", "--format", "-f",
+            help="One of table, plain, json, tsv."),
+) -> None:
+    """Show meeting counts, gaps, trends and busiest places per contact.
+
+    Needs NumPy. Gaps are in days, Trend is the change in meetings
+    between the last months and the months before.
+    """
+    import json
+    from pcrmc import table
+    _check_choice("sort", sort, STATS_SORTS)
+    _check_choice("format", format, table.FORMATS)
+    contacter = get_contacter()
+    try:
+        report, error = contacter.meeting_stats(months)
+    except ImportError as error:
+        secho(str(error), fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if error:
+        secho(
+            f'Computing stats failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED
+        )
+        raise typer.Exit(1)
+    records = [report.contact(position)
+               for position in report.ranking(sort, limit)]
+    wanted = {record["ID"] for record in records}
+    names: Dict[int, str] = {}
+    if wanted:
+        contacts, error = contacter.iter_contacts()
+        names = {c["ID"]: c.get("Name", "") for c in contacts
+                 if c["ID"] in wanted}
+    for record in records:
+        record["Name"] = names.get(record["ID"], "")
+    summary = report.summary
+    if format == "json":
+        echo(json.dumps({"summary": summary, "contacts": records},
+                        indent=4))
+        return
+    titles = ("ID", "Name", "Meetings", "MeanGap", "MedianGap",
+              "LastMeeting", "Recent", "Trend", "TopLocation", "TopTopic")
+    for record in records:
+        record["Trend"] = f"{record['Trend']:+d}"
+    rows = [[table.cell(record[field]) for field in titles]
+            for record in records]
+    if format == "tsv":
+        echo(table.render_tsv(titles, rows), nl=False)
+        return
+    if not summary["meetings"]:
+        secho("There are no meetings in the db", fg=typer.colors.RED)
+        raise typer.Exit()
+
+    def ranked(counts: List[Any]) -> str:
+        return ", ".join(f"{name or '-'} ({count})" for name, count in counts)
+
+    lines = [
+        f"Meetings: {summary['meetings']} with {summary['contacts']} "
+        f"contacts from {summary['first']} to {summary['last']}",
+        f"Days between meetings with a contact: mean "
+        f"{summary['mean_gap']}, median {summary['median_gap']}",
+        f"Busiest locations: {ranked(summary['locations'])}",
+        f"Busiest topics: {ranked(summary['topics'])}",
+        "Per month: " + ", ".join(f"{month} {count}"
+                                  for month, count in summary["months"]),
+    ]
+    echo("\n".join(lines) + "\n"
+         + table.render_table("Stats", titles, rows, None, _styled(format),
+                              decorated=format == "table"), nl=False)
 
 
 @app.command()
@@ -258,89 +975,219 @@ def list_meetings(
         participants: List[int] = typer.Option([], "--participants", "-p"),
         date: str = typer.Option(str(), "--date", "-d"),
         loc: str = typer.Option(str(), "--location", "-l"),
-        topics: List[str] = typer.Option([], "--topics", "-t")) -> None:
-
+        topics: List[str] = typer.Option([], "--topics", "-t"),
+        since: str = typer.Option(str(), "--since", help="YYYYMMDD"),
+        until: str = typer.Option(str(), "--until", help="YYYYMMDD"),
+        last_days: Optional[int] = typer.Option(
+            None, "--last-days", min=0, help="Only the last N days."),
+        limit: Optional[int] = typer.Option(
+            None, "--limit", "-n", min=1, help="Show at most N meetings."),
+        offset: int = typer.Option(
+            0, "--offset", min=0, help="Skip the first N meetings."),
+        sort: str = typer.Option(
+            "id", "--sort", "-s", help=f"One of {', '.join(MEETING_SORTS)}."),
+        reverse: bool = typer.Option(False, "--reverse", "-r"),
+        format: str = typer.Option(
+            "table", "--format", "-f",
+            help="One of table, plain, json, tsv."),
+) -> None:
     """List meetings."""
+    from pcrmc import table
+    _check_choice("sort", sort, MEETING_SORTS)
+    _check_choice("format", format, table.FORMATS)
     contacter = get_contacter()
-    contact_list, error = contacter.get_contacts()
+    contacts, error = contacter.iter_contacts()
 
     if error:
-        typer.secho(
+        secho(
             f'Getting contacts failed with "{ERRORS[error]}"',
             fg=typer.colors.RED
         )
         raise typer.Exit(1)
-    if len(contact_list) == 0:
-        typer.secho(
+    if next(contacts, None) is None and format not in ("json", "tsv"):
+        secho(
             "There are no contacts in the db", fg=typer.colors.RED
         )
         raise typer.Exit()
 
-    meetings, error = contacter.get_meetings()
+    since = _since(since, last_days)
+    meetings, error = contacter.find_meetings(
+        participants, date, loc, topics, since, until)
     if error != SUCCESS:
-        typer.secho(
+        secho(
             f'Getting meetings failed with "{ERRORS[error]}"',
             fg=typer.colors.RED
         )
+        raise typer.Exit(1)
+
+    keys = {"id": None, "date": lambda m: str(m.get("Date", ""))}
+    meeting_page = table.page(meetings, keys[sort], reverse, offset, limit)
+    if format == "json":
+        echo(table.render_json(meeting_page), nl=False)
+        return
+    if len(meetings) == 0 and format != "tsv":
+        secho(
+            "No meetings found.", fg=typer.colors.RED
+        )
         raise typer.Exit()
 
-    if len(participants) > 0:
-        meetings = [m for m in meetings if
-                    all([p in m["Participants"] for p in participants])
-                    ]
+    fields = ("ID", "Participants", "Loc", "Date", "Topics")
+    separator = ";" if format == "tsv" else None
+    rows = [[table.cell(meeting.get(field), separator) for field in fields]
+            for meeting in meeting_page]
+    titles = ("ID", "Part.", "Loc", "Date", "Topics")
+    if format == "tsv":
+        echo(table.render_tsv(fields, rows), nl=False)
+        return
+    echo(table.render_table("Meetings", titles, rows, None,
+                            _styled(format), decorated=format == "table"),
+         nl=False)
 
-    if date:
-        meetings = [m for m in meetings if m["Date"] == date]
-    if loc:
-        meetings = [m for m in meetings if m["Loc"] == loc]
 
-    if len(meetings) == 0:
-        typer.secho(
-            "No meetings found.", fg=typer.colors.RED
+graph_app = typer.Typer(rich_markup_mode=None,
+                        help="Ties, clusters and introduction paths.")
+app.add_typer(graph_app, name="graph")
+
+
+def _get_graph(contacter: "pcrmc.Contacter") -> "graph.ContactGraph":
+    contact_graph, error = contacter.get_graph()
+    if error:
+        secho(
+            f'Building the contact graph failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED
         )
-        raise typer.Exit()
+        raise typer.Exit(1)
+    return contact_graph
 
-    if len(topics) > 0:
-        meetings = [m for m in meetings if
-                    all([t in m["Topics"] for t in topics])
-                    ]
-    typer.secho("Meetings:\n", fg=typer.colors.BLUE, bold=True)
-    max_name_length = max([len(c["Participants"]) for c in meetings])
-    columns = (
-        "ID.  ",
-        f"| Part.  {(max_name_length-5) * ' '}",
-        "| Loc  ",
-        "| Date     ",
-        "| Topics  "
-    )
-    headers = "".join(columns)
-    typer.secho(headers, fg=typer.colors.BLUE, bold=True)
-    typer.secho("-" * len(headers), fg=typer.colors.BLUE)
-    for meeting in meetings:
-        id = meeting["ID"]
-        part = meeting["Participants"]
-        loc = meeting["Loc"]
-        date = meeting["Date"]
-        topics = meeting["Topics"]
-        typer.secho(
-            f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-            f"| {part}{(len(columns[1]) - len(str(part))-2) * ' '}"
-            f"| {loc}{(len(columns[2]) - len(str(loc))-2) * ' '}"
-            f"| {date}{(len(columns[3]) - len(str(date))-2) * ' '}"
-            f"| {topics}{(len(columns[4]) - len(str(topics))-1) * ' '}",
-            fg=typer.colors.BLUE
+
+def _contact_names(contacter: "pcrmc.Contacter") -> Dict[int, str]:
+    contacts, error = contacter.iter_contacts()
+    if error:
+        secho(
+            f'Reading contacts failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED
         )
-    typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE)
+        raise typer.Exit(1)
+    return {c["ID"]: c.get("Name", "") for c in contacts}
+
+
+@graph_app.command("ties")
+def graph_ties(
+        contact: str = typer.Argument(..., help="ID or name."),
+        limit: int = typer.Option(10, "--limit", "-n", min=1),
+) -> None:
+    """Show the contacts CONTACT meets most often."""
+    contacter = get_contacter()
+    id, = _resolve_contacts(contacter, [contact])
+    ties = _get_graph(contacter).strongest_ties(id, limit)
+    if not ties:
+        secho(f"Contact {id} shares no meetings", fg=typer.colors.RED)
+        raise typer.Exit()
+    names = _contact_names(contacter)
+    lines = [f"{tie.weight:>5}  {names.get(tie.id, '')} ({tie.id})"
+             for tie in ties]
+    echo(f"Meetings with {names.get(id, id)}:\n" + "\n".join(lines))
+
+
+@graph_app.command("path")
+def graph_path(
+        source: str = typer.Argument(..., help="ID or name."),
+        target: str = typer.Argument(..., help="ID or name."),
+) -> None:
+    """Show the shortest chain of introductions from SOURCE to TARGET."""
+    contacter = get_contacter()
+    source_id, target_id = _resolve_contacts(contacter, [source, target])
+    path = _get_graph(contacter).introduction_path(source_id, target_id)
+    if path is None:
+        secho("No chain of shared meetings connects them",
+              fg=typer.colors.RED)
+        raise typer.Exit(1)
+    names = _contact_names(contacter)
+    echo(" -> ".join(f"{names.get(id, '')} ({id})" for id in path))
+
+
+@graph_app.command("clusters")
+def graph_clusters(
+        min_size: int = typer.Option(2, "--min-size", min=1),
+        limit: int = typer.Option(10, "--limit", "-n", min=1),
+) -> None:
+    """Show groups of contacts that mostly meet among themselves."""
+    contacter = get_contacter()
+    clusters = [cluster for cluster in _get_graph(contacter).clusters()
+                if len(cluster) >= min_size][:limit]
+    if not clusters:
+        secho("No clusters found.", fg=typer.colors.RED)
+        raise typer.Exit()
+    names = _contact_names(contacter)
+    lines = []
+    for number, cluster in enumerate(clusters, 1):
+        members = ", ".join(f"{names.get(id, '')} ({id})"
+                            for id in cluster[:10])
+        more = f" and {len(cluster) - 10} more" if len(cluster) > 10 else ""
+        lines.append(f"{number}. {len(cluster)} contacts: {members}{more}")
+    echo("\n".join(lines))
+
+
+@graph_app.command("export")
+def graph_export(
+        format: str = typer.Option("graphml", "--format", "-f"),
+        output: str = typer.Option(
+            "-", "--output", "-o", help='Output file, "-" writes stdout.'),
+) -> None:
+    """Export the contact graph as DOT or GraphML."""
+    from pcrmc import graph
+    _check_choice("format", format, graph.GRAPH_FORMATS)
+    contacter = get_contacter()
+    contact_graph = _get_graph(contacter)
+    names = _contact_names(contacter)
+    with METRICS.timer("serialize"):
+        if output == "-":
+            contact_graph.write(sys.stdout, format, names)
+            sys.stdout.flush()
+            return
+        with open(output, "w", encoding="utf-8") as file:
+            contact_graph.write(file, format, names)
+    secho(f"pcrmc: graph exported to {output}", fg=typer.colors.GREEN,
+          err=True)
 
 
 def _version_callback(value: bool) -> None:
     if value:
-        typer.echo(f'{__app_name__} v{__version__}')
+        echo(f'{__app_name__} v{__version__}')
         raise typer.Exit()
 
 
+def _report_metrics(ctx: typer.Context, show: bool,
+                    metrics_file: Optional[str]) -> None:
+    """Print the timing breakdown and/or append it as a JSON line."""
+    import json
+    snapshot = METRICS.snapshot()
+    METRICS.disable()
+    if show:
+        typer.secho(f"\nProfile of {ctx.invoked_subcommand}: "
+                    f"{snapshot['total_ms']:.1f} ms",
+                    fg=typer.colors.BLUE, bold=True, err=True)
+        for layer in LAYERS + ("logic",):
+            typer.secho(f"  {layer:<10}{snapshot[f'{layer}_ms']:>10.1f} ms",
+                        err=True)
+        typer.secho(
+            f"  {snapshot['parses']} parses, {snapshot['writes']} writes, "
+            f"{format_bytes(snapshot['bytes_read'])} read, "
+            f"{format_bytes(snapshot['bytes_written'])} written",
+            err=True)
+    if metrics_file:
+        line = json.dumps({"command": ctx.invoked_subcommand,
+                           "time": time.time(), **snapshot})
+        if metrics_file == "-":
+            typer.echo(line, err=True)
+        else:
+            with open(metrics_file, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+
 @app.callback()
 def main(
+        ctx: typer.Context,
         version: Optional[bool] = typer.Option(
             None,
             "--version",
@@ -348,6 +1195,29 @@ def main(
             help="Show the application's version and exit.",
             callback=_version_callback,
             is_eager=True,
-        )
+        ),
+        profile: bool = typer.Option(
+            False, "--profile",
+            help="Print time per layer (I/O, parse, serialize, render), "
+                 "parses, writes and bytes moved to stderr."),
+        metrics_file: Optional[str] = typer.Option(
+            None, "--metrics", metavar="FILE",
+            help='Append the profile as a JSON line to FILE, "-" for '
+                 'stderr.'),
+        cprofile_file: Optional[str] = typer.Option(
+            None, "--cprofile", metavar="FILE",
+            help="Dump cProfile statistics to FILE."),
 ) -> None:
-    return
+    if profile or metrics_file:
+        METRICS.enable()
+        ctx.call_on_close(
+            lambda: _report_metrics(ctx, profile, metrics_file))
+    if cprofile_file:
+        import cProfile
+        profiler = cProfile.Profile()
+
+        def dump() -> None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_file)
+        ctx.call_on_close(dump)
+        profiler.enable()
@@ -3,21 +3,59 @@
 
 import configparser
 from pathlib import Path
-import typer
+from typing import (TYPE_CHECKING, Any, Dict, Mapping, NamedTuple, Optional,
+                    Tuple)
 from pcrmc import (
         DB_WRITE_ERROR, FILE_ERROR, SUCCESS, __app_name__
 )
 
-CONFIG_DIR_PATH = Path(typer.get_app_dir(__app_name__))
-CONFIG_FILE_PATH = CONFIG_DIR_PATH / "config.ini"
+if TYPE_CHECKING:
+    from pcrmc import database
 
+# Set to use another config directory, None means pcrmc's app dir,
+# which is only looked up when a command needs the config.
+CONFIG_DIR_PATH: Optional[Path] = None
 
-def init_app(db_path: str) -> int:
+# Target days between meetings, and the list-contacts colors green,
+# yellow and red for contacts met within that many days.
+DEFAULT_INTERVAL = 30
+DEFAULT_COLORS = (10, 20, 30)
+
+
+class CadenceConfig(NamedTuple):
+    """How often contacts should be met, from the Cadence sections."""
+    interval: int = DEFAULT_INTERVAL
+    colors: Tuple[int, ...] = DEFAULT_COLORS
+    # industry (casefolded) and contact ID to target interval
+    industries: Mapping[str, int] = {}
+    contacts: Mapping[int, int] = {}
+
+    def interval_for(self, contact: Mapping[str, Any]) -> int:
+        """Return the target interval of a contact in days."""
+        interval = self.contacts.get(contact.get("ID"))  # type: ignore
+        if interval is not None:
+            return interval
+        industry = str(contact.get("Industry", "")).casefold()
+        return self.industries.get(industry, self.interval)
+
+
+def config_dir_path() -> Path:
+    if CONFIG_DIR_PATH is not None:
+        return CONFIG_DIR_PATH
+    import typer
+    return Path(typer.get_app_dir(__app_name__))
+
+
+def config_file_path() -> Path:
+    return config_dir_path() / "config.ini"
+
+
+def init_app(db_path: str, backend: str = "json") -> int:
     """Initialize the application."""
     config_code = _init_config_file()
     if config_code != SUCCESS:
         return config_code
-    database_code = _create_database(db_path)
+    database_code = _create_database(db_path, backend)
     if database_code != SUCCESS:
         return database_code
     return SUCCESS
@@ -25,22 +63,117 @@ def init_app(db_path: str) -> int:
 
 def _init_config_file() -> int:
     try:
-        CONFIG_DIR_PATH.mkdir(exist_ok=True)
+        config_dir_path().mkdir(exist_ok=True)
     except OSError:
         return FILE_ERROR
     try:
-        CONFIG_FILE_PATH.touch(exist_ok=True)
+        config_file_path().touch(exist_ok=True)
     except OSError:
         return FILE_ERROR
     return SUCCESS
 
 
-def _create_database(db_path: str) -> int:
+def _create_database(db_path: str, backend: str) -> int:
+    from pcrmc.database import DEFAULT_JOURNAL_LIMIT
     config_parser = configparser.ConfigParser()
-    config_parser["General"] = {"database": db_path, "NextCID": 0, "NextMID": 0}
+    config_parser["General"] = {
+        "database": db_path,
+        "backend": backend,
+        "journal_limit": DEFAULT_JOURNAL_LIMIT
+    }
+    config_parser["Cadence"] = {
+        "interval": DEFAULT_INTERVAL,
+        "colors": ", ".join(map(str, DEFAULT_COLORS)),
+    }
     try:
-        with CONFIG_FILE_PATH.open("w") as file:
+        with config_file_path().open("w") as file:
             config_parser.write(file)
     except OSError:
         return DB_WRITE_ERROR
     return SUCCESS
+
+
+def set_database(db_path: str, backend: str) -> int:
+    """Point the config file at another database, keeping other settings."""
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file_path())
+    config_parser["General"]["database"] = db_path
+    config_parser["General"]["backend"] = backend
+    try:
+        with config_file_path().open("w") as file:
+            config_parser.write(file)
+    except OSError:
+        return FILE_ERROR
+    return SUCCESS
+
+
+def migrate_id_counters(db_config: "database.DatabaseConfig") -> int:
+    """Move the NextCID/NextMID counters older versions kept in the
+    config file into the database, then drop them from the config.
+
+    A counter ahead of the highest stored ID means the top records were
+    deleted, their IDs must not be handed out again.
+    """
+    from pcrmc import database
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file_path())
+    if not config_parser.has_section("General"):
+        return SUCCESS
+    general = config_parser["General"]
+    try:
+        next_ids = {table: general.getint(key)
+                    for table, key in database.ID_COUNTERS.items()
+                    if key in general}
+    except ValueError:
+        return FILE_ERROR
+    if not next_ids:
+        return SUCCESS
+    handler = database.get_database_handler(
+        db_config.path, db_config.backend, db_config.journal_limit)
+    error = database.raise_id_counters(handler, next_ids)
+    if error != SUCCESS:
+        return error
+    for key in database.ID_COUNTERS.values():
+        config_parser.remove_option("General", key)
+    try:
+        with config_file_path().open("w") as file:
+            config_parser.write(file)
+    except OSError:
+        return FILE_ERROR
+    return SUCCESS
+
+
+def get_cadence_config(config_file: Path) -> CadenceConfig:
+    """Return the meeting cadence settings of the config file.
+
+        [Cadence]
+        interval = 30
+        colors = 10, 20, 30
+        [Cadence Industries]
+        Software Engineering = 14
+        [Cadence Contacts]
+        42 = 7
+
+    Raises ValueError if a setting is not a number of days.
+    """
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+    cadence = CadenceConfig()
+    if config_parser.has_section("Cadence"):
+        section = config_parser["Cadence"]
+        colors = section.get("colors")
+        cadence = cadence._replace(
+            interval=section.getint("interval", DEFAULT_INTERVAL),
+            colors=tuple(int(days) for days in colors.split(","))
+            if colors else DEFAULT_COLORS,
+        )
+    industries: Dict[str, int] = {}
+    if config_parser.has_section("Cadence Industries"):
+        # option names come back lowercased
+        industries = {industry.casefold(): int(days) for industry, days
+                      in config_parser["Cadence Industries"].items()}
+    contacts: Dict[int, int] = {}
+    if config_parser.has_section("Cadence Contacts"):
+        contacts = {int(id): int(days) for id, days
+                    in config_parser["Cadence Contacts"].items()}
+    return cadence._replace(industries=industries, contacts=contacts)
@@ -0,0 +1,240 @@
+"""This module provides the PCRMC daemon and its thin client
+
+`pcrmc serve` keeps one Contacter, with its parsed database and indexes,
+warm behind a Unix domain socket. The client sends the command line of a
+data command, the daemon runs it through the regular CLI and sends back
+what it printed and its exit code. Commands run one at a time on a
+single worker thread, so there is exactly one writer.
+"""
+# pcrmc/daemon.py
+
+# Imported by __main__ for every command, so json, socket and asyncio
+# are only imported once a daemon is actually involved.
+import io
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Tuple
+from pcrmc import __app_name__
+
+if TYPE_CHECKING:
+    import socket
+    from pcrmc import database, pcrmc
+
+# Commands that only touch the database. Everything else, like init or
+# commands reading files and stdin, always runs locally.
+FORWARDED_COMMANDS = frozenset((
+    "add-contact", "modify-contact", "detail-contact", "rm-contact",
+    "add-meeting", "modify-meeting", "list-contacts", "list-meetings",
+    "search", "due", "graph", "stats",
+))
+# Set this to anything to bypass a running daemon.
+DIRECT_ENV = "PCRMC_NO_DAEMON"
+
+
+def supported() -> bool:
+    import socket
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+
+def socket_path() -> Path:
+    """Return the per-user socket path, known without reading the config."""
+    import tempfile
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(runtime_dir) / f"{__app_name__}-{os.getuid()}.sock"
+
+
+def _connect(path: Path) -> Optional["socket.socket"]:
+    """Connect to a daemon, None if there is none or it is not ours."""
+    import socket
+    try:
+        if path.stat().st_uid != os.getuid():
+            return None
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except OSError:
+        return None
+    try:
+        client.connect(str(path))
+    except OSError:
+        client.close()
+        return None
+    return client
+
+
+def is_running(path: Path) -> bool:
+    client = _connect(path)
+    if client is None:
+        return False
+    client.close()
+    return True
+
+
+def forward(args: Sequence[str],
+            path: Optional[Path] = None) -> Optional[int]:
+    """Run a command in the daemon and print its output.
+
+    Returns the exit code, or None if the command has to run locally
+    because it is not forwarded or no daemon is running.
+    """
+    if not args or args[0] not in FORWARDED_COMMANDS \
+            or os.environ.get(DIRECT_ENV) or not supported():
+        return None
+    import json
+    import socket
+    client = _connect(path or socket_path())
+    if client is None:
+        return None
+    request = {"args": list(args), "cwd": os.getcwd(),
+               "stdout_tty": sys.stdout.isatty(),
+               "stderr_tty": sys.stderr.isatty()}
+    # once sent, a command must not run a second time locally
+    try:
+        with client:
+            client.sendall(json.dumps(request).encode() + b"\n")
+            client.shutdown(socket.SHUT_WR)
+            data = b"".join(iter(lambda: client.recv(65536), b""))
+        response = json.loads(data)
+    except (OSError, ValueError) as error:
+        print(f"pcrmc daemon failed: {error}", file=sys.stderr)
+        return 1
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["exit_code"]
+
+
+class _Terminal(io.BytesIO):
+    """Captured output that looks like a terminal if the client's is."""
+
+    def __init__(self, tty: bool) -> None:
+        super().__init__()
+        self._tty = tty
+
+    def isatty(self) -> bool:
+        return self._tty
+
+
+def _files_stamp(db_path: Path) -> Tuple[Tuple[str, int, int], ...]:
+    """mtime and size of the database and its journal, index or WAL."""
+    stamp = []
+    for path in sorted(db_path.parent.glob(db_path.name + "*")):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        stamp.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(stamp)
+
+
+class Daemon:
+    """Runs CLI commands against one warm Contacter.
+
+    The Contacter is replaced when the config points at another database
+    or the files were changed by someone else since the last command.
+    """
+
+    def __init__(self) -> None:
+        self._contacter: Optional["pcrmc.Contacter"] = None
+        self._db_config: Optional["database.DatabaseConfig"] = None
+        self._stamp: Optional[Tuple[Any, ...]] = None
+
+    def contacter(self,
+                  db_config: "database.DatabaseConfig") -> "pcrmc.Contacter":
+        from pcrmc import pcrmc
+        if self._contacter is None or db_config != self._db_config \
+                or _files_stamp(db_config.path) != self._stamp:
+            self._contacter = pcrmc.Contacter(
+                db_config.path, db_config.backend, db_config.journal_limit)
+            self._db_config = db_config
+        return self._contacter
+
+    def run(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one command line, return its output and exit code."""
+        import traceback
+        from contextlib import redirect_stderr, redirect_stdout
+        from pcrmc import cli
+        stdout = io.TextIOWrapper(_Terminal(request.get("stdout_tty", False)),
+                                  encoding="utf-8", write_through=True)
+        stderr = io.TextIOWrapper(_Terminal(request.get("stderr_tty", False)),
+                                  encoding="utf-8", write_through=True)
+        stdin, sys.stdin = sys.stdin, io.StringIO()
+        cwd = os.getcwd()
+        exit_code = 0
+        try:
+            try:
+                # relative paths mean the same as they would for the client
+                os.chdir(request.get("cwd", cwd))
+            except OSError:
+                pass
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    cli.app(args=request["args"], prog_name=__app_name__)
+                except SystemExit as exit:
+                    code = exit.code
+                    exit_code = code if isinstance(code, int) else 0 \
+                        if code is None else 1
+                except Exception:
+                    traceback.print_exc()
+                    exit_code = 1
+        finally:
+            os.chdir(cwd)
+            sys.stdin = stdin
+            if self._db_config is not None:
+                self._stamp = _files_stamp(self._db_config.path)
+        return {"stdout": stdout.buffer.getvalue().decode("utf-8"),
+                "stderr": stderr.buffer.getvalue().decode("utf-8"),
+                "exit_code": exit_code}
+
+
+async def serve_async(path: Path, daemon: Daemon, stop: Any) -> None:
+    """Answer requests on path until the stop event is set."""
+    import asyncio
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    loop = asyncio.get_running_loop()
+    # the single writer, reads queue up behind it as well
+    worker = ThreadPoolExecutor(max_workers=1)
+
+    async def handle(reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        try:
+            request = json.loads(await reader.readline())
+            response = await loop.run_in_executor(worker, daemon.run, request)
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except (ValueError, KeyError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    if path.exists():
+        path.unlink()
+    server = await asyncio.start_unix_server(handle, path=str(path))
+    os.chmod(path, 0o600)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        worker.shutdown()
+        if path.exists():
+            path.unlink()
+
+
+def serve(path: Path) -> None:
+    """Serve until SIGINT or SIGTERM."""
+    import asyncio
+    import signal
+    from pcrmc import cli
+
+    async def main() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        await serve_async(path, daemon, stop)
+
+    daemon = Daemon()
+    cli.contacter_factory = daemon.contacter
+    try:
+        asyncio.run(main())
+    finally:
+        cli.contacter_factory = None
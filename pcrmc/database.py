@@ -3,105 +3,875 @@
 
 import configparser
 import json
+from contextlib import contextmanager
+from functools import partial, wraps
 from pathlib import Path
-from typing import Any, Dict, List, NamedTuple
-from pcrmc import DB_READ_ERROR, DB_WRITE_ERROR, JSON_ERROR,\
-     SUCCESS, FILE_ERROR
+from typing import (AbstractSet, Any, Callable, Collection, Dict, Iterator,
+                    List, Mapping, NamedTuple, Optional, Tuple, TypeVar,
+                    Union)
+from pcrmc import DB_READ_ERROR, DB_WRITE_ERROR, JSON_ERROR, SUCCESS,\
+     ID_ERROR
+from pcrmc.journal import Journal
+from pcrmc.locking import FileLock, atomic_write, lock_path
+from pcrmc.metrics import METRICS
+from pcrmc.records import RECORDS, Record, to_json
+from pcrmc.search import search_path
+from pcrmc.stream import StreamReader
 
-DEFAULT_DB_FILE_PATH = Path.home().joinpath(
-        "." + Path.home().stem + "_pcrmc.json"
-)
+ID_COUNTERS = {"Contacts": "NextCID", "Meetings": "NextMID"}
+DEFAULT_JOURNAL_LIMIT = 1024 * 1024
+T = TypeVar("T")
 
 
-def get_database_path(config_file: Path) -> Path:
-    """Return the current path to the pcrmc database."""
+class DatabaseConfig(NamedTuple):
+    path: Path
+    backend: str
+    journal_limit: int = DEFAULT_JOURNAL_LIMIT
+
+
+def default_db_path() -> Path:
+    """Return the default database location in the home directory."""
+    home = Path.home()
+    return home.joinpath("." + home.stem + "_pcrmc.json")
+
+
+def get_database_config(config_file: Path) -> Optional[DatabaseConfig]:
+    """Return the database settings stored in the config file.
+
+    Returns None if there is no config file or it names no database.
+    """
     config_parser = configparser.ConfigParser()
     config_parser.read(config_file)
-    return Path(config_parser["General"]["database"])
+    if not config_parser.has_option("General", "database"):
+        return None
+    general = config_parser["General"]
+    return DatabaseConfig(
+        Path(general["database"]),
+        general.get("backend", "json"),
+        general.getint("journal_limit", DEFAULT_JOURNAL_LIMIT),
+    )
+
+
+def get_database_path(config_file: Path) -> Optional[Path]:
+    """Return the current path to the pcrmc database."""
+    db_config = get_database_config(config_file)
+    return db_config.path if db_config else None
 
 
-def init_database(db_path: Path) -> int:
-    """Create the pcrmc database."""
+def init_database(db_path: Path, backend: str = "json",
+                  compression: str = "zlib",
+                  partition_by: str = "year") -> int:
+    """Create the pcrmc database.
+
+    compression only applies to the binary backend, partition_by to
+    the partitioned one.
+    """
+    if backend == "sqlite":
+        from pcrmc.sqlite_database import init_sqlite_database
+        return init_sqlite_database(db_path)
+    if backend == "binary":
+        from pcrmc.binary_database import init_binary_database
+        return init_binary_database(db_path, compression)
+    if backend == "partitioned":
+        from pcrmc.partitioned_database import init_partitioned_database
+        return init_partitioned_database(db_path, partition_by)
     try:
-        empty = {'Contacts': [], 'Meetings': []}
-        db_path.write_text(json.dumps(empty, indent=4))
+        # the header in front, see DatabaseHandler._stream
+        empty = {'Generation': 0, 'Contacts': [], 'Meetings': []}
+        atomic_write(db_path, json.dumps(empty, indent=4))
+        for stale in (journal_path(db_path), search_path(db_path)):
+            if stale.exists():
+                stale.unlink()
         return SUCCESS
     except OSError:
         return DB_WRITE_ERROR
 
 
+def get_database_handler(
+        db_path: Path,
+        backend: str = "json",
+        journal_limit: int = DEFAULT_JOURNAL_LIMIT,
+        compression: Optional[str] = None,
+        partition_by: Optional[str] = None
+) -> "DatabaseHandler":
+    """Return the DatabaseHandler implementing the given backend.
+
+    A binary handler writes with compression, or, if it is None, with
+    the compression the database already uses. partition_by likewise
+    for a partitioned handler.
+    """
+    if backend == "sqlite":
+        from pcrmc.sqlite_database import SQLiteDatabaseHandler
+        return SQLiteDatabaseHandler(db_path)
+    if backend == "binary":
+        from pcrmc.binary_database import BinaryDatabaseHandler
+        return BinaryDatabaseHandler(db_path, journal_limit, compression)
+    if backend == "partitioned":
+        from pcrmc.partitioned_database import PartitionedDatabaseHandler
+        return PartitionedDatabaseHandler(db_path, journal_limit,
+                                          partition_by)
+    return DatabaseHandler(db_path, journal_limit)
+
+
+def migrate_database(source: "DatabaseHandler", db_path: Path,
+                     backend: str, compression: str = "zlib") -> int:
+    """Copy all contacts and meetings into a new database."""
+    init_error = init_database(db_path, backend, compression)
+    if init_error != SUCCESS:
+        return init_error
+    target = get_database_handler(db_path, backend)
+    contacts = source.read_contacts()
+    if contacts.error != SUCCESS:
+        return contacts.error
+    meetings = source.read_meetings()
+    if meetings.error != SUCCESS:
+        return meetings.error
+    write = target.write_contacts(contacts.data)
+    if write.error != SUCCESS:
+        return write.error
+    write = target.write_meetings(meetings.data)
+    if write.error != SUCCESS:
+        return write.error
+    # carry the ID counters over, so IDs of deleted records stay retired
+    next_ids = {}
+    for table, reserve in _reserve_methods(source).items():
+        next_id = reserve(0)
+        if next_id.error != SUCCESS:
+            return next_id.error
+        next_ids[table] = next_id.data.start
+    return raise_id_counters(target, next_ids)
+
+
+def _reserve_methods(handler: "DatabaseHandler"
+                     ) -> Dict[str, Callable[[int], "DBResponse"]]:
+    return {"Contacts": handler.reserve_contact_ids,
+            "Meetings": handler.reserve_meeting_ids}
+
+
+def raise_id_counters(handler: "DatabaseHandler",
+                      next_ids: Mapping[str, int]) -> int:
+    """Move the ID counters of the tables in next_ids up to at least
+    the given next ID. Counters never move down."""
+    reserve_methods = _reserve_methods(handler)
+    for table, next_id in next_ids.items():
+        reserve = reserve_methods[table]
+        current = reserve(0)
+        if current.error != SUCCESS:
+            return current.error
+        gap = next_id - current.data.start
+        if gap > 0:
+            error = reserve(gap).error
+            if error != SUCCESS:
+                return error
+    return SUCCESS
+
+
+def convert_database(source: "DatabaseHandler", backend: str,
+                     compression: str = "zlib",
+                     partition_by: str = "year") -> int:
+    """Rewrite a JSON, binary or partitioned database in place in
+    another of these formats.
+
+    All keep the same journal, so the new snapshot simply replaces the
+    old one and empties the journal like any compaction.
+    """
+    try:
+        document = source._load()
+        # the manifest of a partitioned source, the target writes its own
+        document.pop("PartitionBy", None)
+        document.pop("Partitions", None)
+        target = get_database_handler(source._db_path, backend,
+                                      source._journal_limit, compression,
+                                      partition_by)
+        target._dump(document)
+        if backend != "partitioned":
+            from pcrmc.partitioned_database import remove_partitions
+            remove_partitions(source._db_path)
+    except json.JSONDecodeError:
+        return JSON_ERROR
+    except OSError:
+        return DB_WRITE_ERROR
+    return SUCCESS
+
+
 class DBResponse(NamedTuple):
     data: Any
     error: int
 
 
+def journal_path(db_path: Path) -> Path:
+    """Return the path of the journal belonging to a JSON database."""
+    return db_path.with_name(db_path.name + ".journal")
+
+
+def _find(records: List[Dict[str, Any]], id: int) -> Optional[int]:
+    if type(id) is int:
+        # tables are in ID order unless edited by hand, try a bisection
+        low, high = 0, len(records)
+        while low < high:
+            middle = (low + high) // 2
+            middle_id = records[middle].get("ID")
+            if type(middle_id) is not int:
+                break
+            if middle_id < id:
+                low = middle + 1
+            else:
+                high = middle
+        else:
+            if low < len(records) and records[low].get("ID") == id:
+                return low
+    for position, record in enumerate(records):
+        if record.get("ID") == id:
+            return position
+    return None
+
+
+def _next_id(document: Dict[str, Any], table: str) -> int:
+    """Return the next free ID of a table, seeding the counter if needed."""
+    key = ID_COUNTERS[table]
+    if key not in document:
+        ids = [r["ID"] for r in document[table]
+               if isinstance(r.get("ID"), int)]
+        document[key] = max(ids) + 1 if ids else 0
+    return document[key]
+
+
+def _replace_records(document: Dict[str, Any], table: str,
+                     records: List[Dict[str, Any]]) -> None:
+    """Replace a whole table, never moving its ID counter backwards."""
+    next_id = _next_id(document, table)
+    document[table] = [RECORDS[table].from_json(r) for r in records]
+    del document[ID_COUNTERS[table]]
+    document[ID_COUNTERS[table]] = max(next_id, _next_id(document, table))
+
+
+def _compact(document: Dict[str, Any]) -> None:
+    """Turn the parsed record dicts into compact records, in place so
+    the dicts are freed one by one."""
+    for table, record_type in RECORDS.items():
+        records = document.setdefault(table, [])
+        for position, record in enumerate(records):
+            records[position] = record_type.from_json(record)
+
+
+def _apply(document: Dict[str, Any], op: Dict[str, Any]) -> None:
+    """Apply one journal operation to a parsed database."""
+    if op["op"] == "reserve":
+        document[ID_COUNTERS[op["table"]]] = max(
+            _next_id(document, op["table"]), op["start"] + op["count"])
+        return
+    records = document.get(op["table"])
+    if op["op"] == "add":
+        if records is not None:
+            records.append(RECORDS[op["table"]].from_json(op["record"]))
+        id = op["record"].get("ID")
+        if isinstance(id, int) and id >= _next_id(document, op["table"]):
+            document[ID_COUNTERS[op["table"]]] = id + 1
+        return
+    # a table a partial load left out is re-read with the journal
+    position = None if records is None else _find(records, op["id"])
+    if position is None:
+        return
+    if op["op"] == "modify":
+        records[position].update(op["fields"])
+    elif op["op"] == "delete":
+        del records[position]
+
+
+def _replay(records: Iterator[Dict[str, Any]], table: str,
+            ops: List[Dict[str, Any]],
+            ids: Optional[AbstractSet[int]] = None) -> Iterator[Record]:
+    """Yield streamed snapshot records with journal operations applied.
+
+    Does what _apply does to a whole table, but only keeps the records
+    the operations touch in memory. With ids, only those records are
+    converted and yielded.
+    """
+    record_type = RECORDS[table]
+    added: List[Record] = []
+    changed: Dict[Any, Dict[str, Any]] = {}
+    deleted = set()
+    for op in ops:
+        if op["op"] == "add":
+            added.append(record_type.from_json(op["record"]))
+            continue
+        position = _find(added, op["id"])
+        if position is not None:
+            if op["op"] == "modify":
+                added[position].update(op["fields"])
+            else:
+                del added[position]
+        elif op["id"] not in deleted:
+            if op["op"] == "modify":
+                changed.setdefault(op["id"], {}).update(op["fields"])
+            else:
+                deleted.add(op["id"])
+    if ids is not None:
+        records = (r for r in records if r.get("ID") in ids)
+        added = [r for r in added if r.get("ID") in ids]
+    for fields in records:
+        record = record_type.from_json(fields)
+        record_id = record.get("ID")
+        if record_id in deleted:
+            continue
+        if record_id in changed:
+            record.update(changed[record_id])
+        yield record
+    yield from added
+
+
+def _locked(method: Callable[..., T]) -> Callable[..., T]:
+    """Hold the exclusive lock from reading the database to writing it."""
+    @wraps(method)
+    def locked(self: "DatabaseHandler", *args: Any, **kwargs: Any) -> T:
+        with self._lock.hold():
+            return method(self, *args, **kwargs)
+    return locked
+
+
 class DatabaseHandler:
-    def __init__(self, db_path: Path) -> None:
+    """JSON database access with a parse-once document cache.
+
+    The parsed document is kept in memory and reused by all reads and
+    writes. It is revalidated against the mtime and size of the database
+    and its journal, so edits made by another process are still picked up.
+
+    Single-record mutations are appended to the journal instead of
+    rewriting the whole file. On load the journal is replayed on top of the
+    snapshot, and once it grows past journal_limit bytes it is compacted
+    into a new snapshot. Journal entries carry the snapshot generation they
+    apply to, so a crash during compaction never replays them twice.
+
+    Mutations hold an exclusive lock on the database from reading the
+    current state to writing, re-parses hold a shared one, see
+    pcrmc.locking. Snapshots are replaced atomically. transaction()
+    groups several mutations into one locked write.
+    """
+
+    # whether iter_meetings_between reads less than iter_meetings
+    prunes_dates = False
+
+    def __init__(self, db_path: Path,
+                 journal_limit: int = DEFAULT_JOURNAL_LIMIT) -> None:
         self._db_path = db_path
+        self._journal = Journal(journal_path(db_path))
+        self._journal_limit = journal_limit
+        self._document: Optional[Dict[str, Any]] = None
+        self._stamp: Optional[Tuple[int, ...]] = None
+        # the stamp after the last read or write, and how often the files
+        # turned out changed by someone else since
+        self._seen_stamp: Optional[Tuple[int, ...]] = None
+        self._outside_changes = 0
+        # how far the journal is applied to the document
+        self._journal_end = 0
+        self._lock = FileLock(lock_path(db_path))
+        self._transactions = 0
+        self._pending: List[Dict[str, Any]] = []
+        self.parse_count = 0
+        self.write_count = 0
+        METRICS.watch(self)
+
+    def _file_stamp(self) -> Tuple[int, ...]:
+        """Return inode, mtime and size of the snapshot, and the journal
+        size. Snapshots are replaced, never rewritten in place, and the
+        journal only grows until a compaction."""
+        stat = self._db_path.stat()
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size,
+                self._journal.size())
+
+    def _note_stamp(self, stamp: Tuple[int, ...]) -> None:
+        """Count a change by someone else if the files moved on since
+        this handler last read or wrote them."""
+        if self._seen_stamp is not None and stamp != self._seen_stamp:
+            self._outside_changes += 1
+        self._seen_stamp = stamp
+
+    def outside_version(self) -> int:
+        """Return a number that changes whenever another process has
+        changed the database, and only then."""
+        self._note_stamp(self._file_stamp())
+        return self._outside_changes
+
+    def _load(self, meetings: bool = True) -> Dict[str, Any]:
+        """Return the parsed database, re-parsing it only if it changed.
+
+        If only the journal grew, as after a write by another process,
+        just the new journal entries are applied. With meetings False a
+        backend storing the meetings apart may leave them out.
+        """
+        stamp = self._file_stamp()
+        document = self._document
+        if document is not None and stamp == self._stamp \
+                and (not meetings or "Meetings" in document):
+            return document
+        with self._lock.hold(exclusive=False):
+            stamp = self._file_stamp()
+            self._note_stamp(stamp)
+            document = self._document
+            if document is not None and self._stamp is not None \
+                    and stamp[:3] == self._stamp[:3] \
+                    and stamp[3] >= self._journal_end \
+                    and (not meetings or "Meetings" in document):
+                ops, end = self._journal.read_from(self._journal_end)
+            else:
+                self._document = None
+                document = self._read_snapshot(meetings)
+                self.parse_count += 1
+                ops, end = self._journal.read_from(0)
+            generation = document.get("Generation", 0)
+            for op in ops:
+                if op["gen"] == generation:
+                    _apply(document, op)
+            self._document, self._stamp = document, stamp
+            self._journal_end = end
+        return self._document
+
+    def _read_snapshot(self, meetings: bool = True) -> Dict[str, Any]:
+        """Read the snapshot into a document of records."""
+        with METRICS.timer("io"):
+            text = self._db_path.read_bytes()
+        METRICS.read(len(text))
+        with METRICS.timer("parse"):
+            document = json.loads(text)
+            del text
+            _compact(document)
+        return document
+
+    def _write_snapshot(self, data: Dict[str, Any]) -> Union[str, bytes]:
+        """Write a document as the new snapshot, return what was written."""
+        with METRICS.timer("serialize"):
+            new_data_str = json.dumps(data, indent=4, default=to_json)
+        with METRICS.timer("io"):
+            atomic_write(self._db_path, new_data_str)
+        METRICS.written(len(new_data_str))
+        return new_data_str
+
+    def _stream(self, table: str, ids: Optional[AbstractSet[int]] = None
+                ) -> Iterator[Record]:
+        """Return an iterator over a table, or the records of it with
+        these ids, that reads as little as needed.
+
+        The cached document is reused if it is current. Otherwise the
+        snapshot is read record by record, tables in front of this one are
+        skipped, and the journal is applied on the fly. Nothing is cached
+        and breaking off early stops reading the file.
+        """
+        if self._document is not None and self._file_stamp() == self._stamp:
+            records = self._document[table]
+            if ids is not None:
+                return (r for r in records if r.get("ID") in ids)
+            return iter(records)
+        # the open snapshot and the journal read under the lock match,
+        # even if a compaction replaces the file while streaming
+        with self._lock.hold(exclusive=False):
+            self._note_stamp(self._file_stamp())
+            reader = StreamReader(self._db_path)
+            try:
+                found = reader.seek(table)
+                ops = [op for op in self._journal.read()
+                       if op["table"] == table and op["op"] != "reserve"]
+            except BaseException:
+                reader.close()
+                raise
+        if ops and "Generation" not in reader.header:
+            # older snapshots keep their generation behind the tables
+            reader.close()
+            self._load()
+            return self._stream(table, ids)
+        generation = reader.header.get("Generation", 0)
+        ops = [op for op in ops if op["gen"] == generation]
+        if not found:
+            reader.close()
+        return _replay(reader.records() if found else iter(()), table, ops,
+                       ids)
+
+    def _stream_get(self, table: str, id: int) -> DBResponse:
+        """Look a record up, reading the file only up to that record."""
+        try:
+            for record in self._stream(table, {id}):
+                return DBResponse(record, SUCCESS)
+            return DBResponse(None, ID_ERROR)
+        except json.JSONDecodeError:
+            return DBResponse(None, JSON_ERROR)
+        except OSError:
+            return DBResponse(None, DB_READ_ERROR)
+
+    def _stream_get_many(self, table: str,
+                         ids: Collection[int]) -> DBResponse:
+        """Look records up in one pass, reading the file only until all
+        of them are found. IDs that do not exist are left out."""
+        ids = set(ids)
+        found: List[Record] = []
+        if not ids:
+            return DBResponse(found, SUCCESS)
+        try:
+            records = self._stream(table, ids)
+            for record in records:
+                found.append(record)
+                if len(found) == len(ids):
+                    break
+            close = getattr(records, "close", None)
+            if close is not None:
+                # stops reading the file
+                close()
+            return DBResponse(found, SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse([], JSON_ERROR)
+        except OSError:
+            return DBResponse([], DB_READ_ERROR)
+
+    def _stream_response(self, table: str) -> DBResponse:
+        try:
+            return DBResponse(self._stream(table), SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse(iter(()), JSON_ERROR)
+        except OSError:
+            return DBResponse(iter(()), DB_READ_ERROR)
+
+    @contextmanager
+    def transaction(self) -> Iterator["DatabaseHandler"]:
+        """Group mutations into one locked write.
+
+        The exclusive lock is held for the whole block, so no other
+        process writes in between, and the journal entries of all
+        mutations in it are appended at once when it ends. Reads in the
+        block see its changes. If the block raises, nothing is written.
+        Nested transactions join the outer one. Raises OSError if the
+        final write fails.
+        """
+        with self._lock.hold():
+            self._transactions += 1
+            try:
+                yield self
+            except BaseException:
+                self._transactions -= 1
+                if not self._transactions:
+                    # the document has the unwritten changes applied
+                    self._pending = []
+                    self._document = None
+                raise
+            self._transactions -= 1
+            if not self._transactions and self._pending:
+                ops, self._pending = self._pending, []
+                self._append(ops)
+
+    @_locked
+    def _dump(self, data: Dict[str, Any]) -> Union[str, bytes]:
+        """Write a new snapshot and empty the journal."""
+        try:
+            data["Generation"] = data.get("Generation", 0) + 1
+            # tables go last, so streaming reads meet the header first
+            for table in RECORDS:
+                if table in data:
+                    data[table] = data.pop(table)
+            new_data_str = self._write_snapshot(data)
+            # pending changes of a transaction are in the snapshot now
+            self._pending = []
+            with METRICS.timer("io"):
+                self._journal.clear()
+            self._stamp = self._seen_stamp = self._file_stamp()
+            self._journal_end = 0
+        except OSError:
+            # the in-memory document may be ahead of the file now
+            self._document = None
+            raise
+        self.write_count += 1
+        return new_data_str
+
+    def _append(self, ops: List[Dict[str, Any]]) -> None:
+        """Append applied operations to the journal, compact if it is full."""
+        try:
+            self._journal.append(ops)
+            self._stamp = self._seen_stamp = self._file_stamp()
+            self._journal_end = self._stamp[3]
+        except OSError:
+            self._document = None
+            raise
+        self.write_count += 1
+        if self._stamp[3] > self._journal_limit:
+            self._dump(self._load())
+
+    def _commit(self, ops: List[Dict[str, Any]]) -> None:
+        """Apply operations and append them to the journal, at the end
+        of the transaction if there is one."""
+        # reads in a transaction see its changes, in the whole document
+        document = self._load(meetings=self._transactions > 0)
+        for op in ops:
+            op["gen"] = document.get("Generation", 0)
+            _apply(document, op)
+        if self._transactions:
+            self._pending.extend(ops)
+        else:
+            self._append(ops)
+
+    def _get(self, table: str, id: int) -> DBResponse:
+        try:
+            records = self._load(meetings=table == "Meetings")[table]
+            position = _find(records, id)
+            if position is None:
+                return DBResponse(None, ID_ERROR)
+            return DBResponse(records[position], SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse(None, JSON_ERROR)
+        except OSError:
+            return DBResponse(None, DB_READ_ERROR)
+
+    @_locked
+    def _add(self, table: str, record: Dict[str, Any]) -> DBResponse:
+        try:
+            self._commit([{"op": "add", "table": table, "record": record}])
+            return DBResponse(record, SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse(record, JSON_ERROR)
+        except OSError:
+            return DBResponse(record, DB_WRITE_ERROR)
+
+    @_locked
+    def _reserve(self, table: str, count: int) -> DBResponse:
+        try:
+            start = _next_id(self._load(meetings=False), table)
+            if count > 0:
+                self._commit([{"op": "reserve", "table": table,
+                               "start": start, "count": count}])
+            return DBResponse(range(start, start + count), SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse(range(0), JSON_ERROR)
+        except OSError:
+            return DBResponse(range(0), DB_WRITE_ERROR)
+
+    @_locked
+    def _add_many(self, table: str, records: List[Dict[str, Any]],
+                  keep_ids: bool = False) -> DBResponse:
+        """Reserve IDs for and add records in a single journal write.
+
+        With keep_ids, records that have an ID keep it, the caller makes
+        sure it is free. The others are numbered above all of them.
+        """
+        try:
+            start = _next_id(self._load(meetings=False), table)
+            fresh = [r for r in records if not keep_ids or "ID" not in r]
+            if len(fresh) < len(records):
+                start = max([start] + [r["ID"] + 1 for r in records
+                                       if "ID" in r])
+            ops = [{"op": "reserve", "table": table,
+                    "start": start, "count": len(fresh)}]
+            for id, record in enumerate(fresh, start):
+                record["ID"] = id
+            ops.extend({"op": "add", "table": table, "record": record}
+                       for record in records)
+            self._commit(ops)
+            return DBResponse(records, SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse(records, JSON_ERROR)
+        except OSError:
+            return DBResponse(records, DB_WRITE_ERROR)
+
+    @_locked
+    def _modify(self, table: str, id: int,
+                fields: Dict[str, Any]) -> DBResponse:
+        current = self._get(table, id)
+        if current.error != SUCCESS:
+            return current
+        try:
+            self._commit([{"op": "modify", "table": table, "id": id,
+                           "fields": fields}])
+            return DBResponse(current.data, SUCCESS)
+        except OSError:
+            return DBResponse(current.data, DB_WRITE_ERROR)
+
+    @_locked
+    def _delete(self, table: str, id: int) -> DBResponse:
+        current = self._get(table, id)
+        if current.error != SUCCESS:
+            return current
+        try:
+            self._commit([{"op": "delete", "table": table, "id": id}])
+            return DBResponse(current.data, SUCCESS)
+        except OSError:
+            return DBResponse(current.data, DB_WRITE_ERROR)
 
     def read_contacts(self) -> DBResponse:
         try:
-            data = json.loads(self._db_path.read_text())
-            contacts_json = data["Contacts"]
+            contacts_json = self._load(meetings=False)["Contacts"]
             return DBResponse(contacts_json, SUCCESS)
         except json.JSONDecodeError:
             return DBResponse([], JSON_ERROR)
         except OSError:
             return DBResponse([], DB_READ_ERROR)
 
+    @_locked
     def write_contacts(self, contact_list: List[Dict[str, Any]]) -> DBResponse:
         try:
-            data = json.loads(self._db_path.read_text())
-            data["Contacts"] = contact_list
-            new_data_str = json.dumps(data, indent=4)
-            self._db_path.write_text(new_data_str)
+            data = self._load()
+            _replace_records(data, "Contacts", contact_list)
+            new_data_str = self._dump(data)
             return DBResponse(new_data_str, SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse(contact_list, JSON_ERROR)
         except OSError:
             return DBResponse(contact_list, DB_WRITE_ERROR)
 
+    def iter_contacts(self) -> DBResponse:
+        """Return an iterator over all contacts, streamed from the file
+        unless the database is already parsed.
+
+        A file cut short raises json.JSONDecodeError during iteration.
+        """
+        return self._stream_response("Contacts")
+
+    def get_contact(self, id: int) -> DBResponse:
+        return self._stream_get("Contacts", id)
+
+    def get_contacts_by_id(self, ids: Collection[int]) -> DBResponse:
+        """Return the contacts with these IDs, in no particular order."""
+        return self._stream_get_many("Contacts", ids)
+
+    def add_contact(self, contact: Dict[str, Any]) -> DBResponse:
+        return self._add("Contacts", contact)
+
+    def modify_contact(self, id: int, fields: Dict[str, Any]) -> DBResponse:
+        return self._modify("Contacts", id, fields)
+
+    def delete_contact(self, id: int) -> DBResponse:
+        return self._delete("Contacts", id)
+
+    @_locked
+    def modify_contacts(self,
+                        changes: Dict[int, Dict[str, Any]]) -> DBResponse:
+        """Change the fields of several contacts, by ID, in one write.
+
+        Nothing is written if one of them does not exist.
+        """
+        try:
+            contacts = self._load(meetings=False)["Contacts"]
+            positions = [_find(contacts, id) for id in changes]
+            if None in positions:
+                return DBResponse([], ID_ERROR)
+            self._commit([{"op": "modify", "table": "Contacts", "id": id,
+                           "fields": fields}
+                          for id, fields in changes.items()])
+            return DBResponse([contacts[p] for p in positions], SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse([], JSON_ERROR)
+        except OSError:
+            return DBResponse([], DB_WRITE_ERROR)
+
+    @_locked
+    def delete_contacts(self, ids: Collection[int],
+                        meeting_ids: Optional[Collection[int]] = None
+                        ) -> DBResponse:
+        """Delete several contacts and take them out of their meetings,
+        all in one write. Returns the deleted contacts.
+
+        meeting_ids are the meetings they took part in, if the caller
+        knows them from a participant index, otherwise, or if another
+        process wrote since, a single pass over the meetings finds them.
+        Nothing is written if one of the contacts does not exist.
+        """
+        ids = set(ids)
+        try:
+            outside_changes = self._outside_changes
+            document = self._load()
+            if self._outside_changes != outside_changes:
+                # the caller's index missed what someone else wrote
+                meeting_ids = None
+            contacts = document["Contacts"]
+            positions = [_find(contacts, id) for id in ids]
+            if None in positions:
+                return DBResponse([], ID_ERROR)
+            meetings = document["Meetings"]
+            if meeting_ids is None:
+                met = [meeting for meeting in meetings
+                       if not ids.isdisjoint(meeting.get("Participants")
+                                             or ())]
+            else:
+                met = [meetings[position] for position in
+                       map(partial(_find, meetings), sorted(meeting_ids))
+                       if position is not None]
+            ops = [{"op": "modify", "table": "Meetings", "id": meeting["ID"],
+                    "fields": {"Participants": [
+                        participant for participant in meeting["Participants"]
+                        if participant not in ids]}}
+                   for meeting in met]
+            deleted = [contacts[p] for p in positions]
+            ops.extend({"op": "delete", "table": "Contacts", "id": id}
+                       for id in ids)
+            self._commit(ops)
+            return DBResponse(deleted, SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse([], JSON_ERROR)
+        except OSError:
+            return DBResponse([], DB_WRITE_ERROR)
+
     def read_meetings(self) -> DBResponse:
         try:
-            data = json.loads(self._db_path.read_text())
-            meetings_json = data["Meetings"]
+            meetings_json = self._load()["Meetings"]
             return DBResponse(meetings_json, SUCCESS)
         except json.JSONDecodeError:
             return DBResponse([], JSON_ERROR)
         except OSError:
             return DBResponse([], DB_READ_ERROR)
 
+    @_locked
     def write_meetings(self, meeting_list: List[Dict[str, Any]]) -> DBResponse:
         try:
-            data = json.loads(self._db_path.read_text())
-            data["Meetings"] = meeting_list
-            new_data_str = json.dumps(data, indent=4)
-            self._db_path.write_text(new_data_str)
+            data = self._load()
+            _replace_records(data, "Meetings", meeting_list)
+            new_data_str = self._dump(data)
             return DBResponse(new_data_str, SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse(meeting_list, JSON_ERROR)
         except OSError:
             return DBResponse(meeting_list, DB_WRITE_ERROR)
 
-    def get_new_contact_id(self, config_file: Path) -> int:
-        config_parser = configparser.ConfigParser()
-        config_parser.read(config_file)
-        id = int(config_parser["General"]["NextCID"])
-        config_parser["General"]["NextCID"] = str(id + 1)
-        try:
-            with config_file.open("w") as file:
-                config_parser.write(file)
-        except OSError:
-            return FILE_ERROR
-        return id
+    def iter_meetings(self) -> DBResponse:
+        """Return an iterator over all meetings, like iter_contacts."""
+        return self._stream_response("Meetings")
+
+    def iter_meetings_between(self, since: Optional[str] = None,
+                              until: Optional[str] = None) -> DBResponse:
+        """Return an iterator over at least the meetings dated between
+        since and until, YYYYMMDD and inclusive.
+
+        Backends that cannot narrow the read down return all meetings,
+        so callers still filter by date.
+        """
+        return self.iter_meetings()
+
+    def get_meeting(self, id: int) -> DBResponse:
+        return self._stream_get("Meetings", id)
+
+    def get_meetings_by_id(self, ids: Collection[int]) -> DBResponse:
+        """Return the meetings with these IDs, in no particular order."""
+        return self._stream_get_many("Meetings", ids)
+
+    def add_meeting(self, meeting: Dict[str, Any]) -> DBResponse:
+        return self._add("Meetings", meeting)
+
+    def modify_meeting(self, id: int, fields: Dict[str, Any]) -> DBResponse:
+        return self._modify("Meetings", id, fields)
+
+    def delete_meeting(self, id: int) -> DBResponse:
+        return self._delete("Meetings", id)
+
+    def reserve_contact_ids(self, count: int) -> DBResponse:
+        """Reserve a contiguous block of contact IDs."""
+        return self._reserve("Contacts", count)
+
+    def reserve_meeting_ids(self, count: int) -> DBResponse:
+        """Reserve a contiguous block of meeting IDs."""
+        return self._reserve("Meetings", count)
+
+    def add_contacts(self, contacts: List[Dict[str, Any]],
+                     keep_ids: bool = False) -> DBResponse:
+        """Add contacts under a freshly reserved block of IDs, or under
+        their own IDs with keep_ids, see _add_many."""
+        return self._add_many("Contacts", contacts, keep_ids)
+
+    def add_meetings(self, meetings: List[Dict[str, Any]]) -> DBResponse:
+        """Add meetings under a freshly reserved block of IDs."""
+        return self._add_many("Meetings", meetings)
 
-    def get_new_meeting_id(self, config_file: Path) -> int:
-        config_parser = configparser.ConfigParser()
-        config_parser.read(config_file)
-        id = int(config_parser["General"]["NextMID"])
-        config_parser["General"]["NextMID"] = str(id + 1)
-        try:
-            with config_file.open("w") as file:
-                config_parser.write(file)
-        except OSError:
-            return FILE_ERROR
-        return id
     # see database_struct.json for database structure
     # TODO: read all contact names and IDs
     # TODO: read contact details given contact ID
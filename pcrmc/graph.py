@@ -0,0 +1,213 @@
+"""This module provides the PCRMC contact graph of meeting co-participation"""
+# pcrmc/graph.py
+
+import heapq
+from itertools import combinations
+from typing import (IO, Any, Dict, Iterable, List, Mapping, NamedTuple,
+                    Optional, Tuple)
+from xml.sax.saxutils import escape
+
+GRAPH_FORMATS = ("dot", "graphml")
+# Label propagation rounds before clusters are taken as they are.
+MAX_ROUNDS = 20
+
+
+class Tie(NamedTuple):
+    id: int
+    weight: int
+
+
+class ContactGraph:
+    """Contacts linked by the number of meetings they attended together.
+
+    The adjacency is a dict of dicts, so only existing ties take memory
+    and a meeting is added or removed by touching its participant pairs.
+    Clusters are computed on first use and kept until the graph changes.
+    """
+
+    def __init__(self, meetings: Iterable[Mapping[str, Any]] = ()) -> None:
+        self._ties: Dict[int, Dict[int, int]] = {}
+        self._clusters: Optional[List[List[int]]] = None
+        for meeting in meetings:
+            self.add(meeting)
+
+    def _change(self, meeting: Mapping[str, Any], delta: int) -> None:
+        participants = sorted(set(meeting.get("Participants", ())))
+        ties = self._ties
+        for contact_id in participants:
+            ties.setdefault(contact_id, {})
+        for first, second in combinations(participants, 2):
+            weight = ties[first].get(second, 0) + delta
+            if weight > 0:
+                ties[first][second] = ties[second][first] = weight
+            else:
+                ties[first].pop(second, None)
+                ties[second].pop(first, None)
+        self._clusters = None
+
+    def add(self, meeting: Mapping[str, Any]) -> None:
+        self._change(meeting, 1)
+
+    def remove(self, meeting: Mapping[str, Any]) -> None:
+        self._change(meeting, -1)
+
+    def drop_contact(self, contact_id: int) -> None:
+        for other in self._ties.pop(contact_id, {}):
+            self._ties[other].pop(contact_id, None)
+        self._clusters = None
+
+    def __contains__(self, contact_id: object) -> bool:
+        return contact_id in self._ties
+
+    def edges(self) -> Iterable[Tuple[int, int, int]]:
+        """Yield every tie once as (id, id, weight)."""
+        for contact_id, neighbours in self._ties.items():
+            for other, weight in neighbours.items():
+                if contact_id < other:
+                    yield contact_id, other, weight
+
+    def strongest_ties(self, contact_id: int, limit: int = 10) -> List[Tie]:
+        """Return the contacts met most often together with contact_id."""
+        neighbours = self._ties.get(contact_id, {})
+        return [Tie(other, weight) for other, weight in heapq.nlargest(
+            limit, neighbours.items(), key=lambda item: (item[1], -item[0]))]
+
+    def introduction_path(self, source: int, target: int
+                          ) -> Optional[List[int]]:
+        """Return a shortest chain of contacts from source to target.
+
+        A breadth-first search from both ends, always growing the smaller
+        frontier, so it only visits a fraction of a large graph.
+        """
+        if source not in self._ties or target not in self._ties:
+            return None
+        if source == target:
+            return [source]
+        parents: Tuple[Dict[int, Optional[int]], ...] = (
+            {source: None}, {target: None})
+        frontiers = ([source], [target])
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, other_seen = parents[side], parents[1 - side]
+            next_frontier = []
+            # neighbours in ID order keep the result deterministic
+            for contact_id in frontiers[side]:
+                for neighbour in sorted(self._ties[contact_id]):
+                    if neighbour in seen:
+                        continue
+                    seen[neighbour] = contact_id
+                    if neighbour in other_seen:
+                        return _join(parents, neighbour)
+                    next_frontier.append(neighbour)
+            frontiers = (next_frontier, frontiers[1]) if side == 0 \
+                else (frontiers[0], next_frontier)
+        return None
+
+    def clusters(self) -> List[List[int]]:
+        """Return groups of contacts that mostly meet among themselves.
+
+        Weighted label propagation: every contact takes the label with
+        the most meetings among its neighbours until nothing changes.
+        Largest clusters first, contacts without ties are left out.
+        """
+        if self._clusters is None:
+            labels = {id: id for id in self._ties}
+            order = sorted(id for id, ties in self._ties.items() if ties)
+            for _ in range(MAX_ROUNDS):
+                changed = False
+                for contact_id in order:
+                    scores: Dict[int, int] = {}
+                    for other, weight in self._ties[contact_id].items():
+                        label = labels[other]
+                        scores[label] = scores.get(label, 0) + weight
+                    best = min(scores, key=lambda label: (-scores[label],
+                                                          label))
+                    if best != labels[contact_id]:
+                        labels[contact_id] = best
+                        changed = True
+                if not changed:
+                    break
+            groups: Dict[int, List[int]] = {}
+            for contact_id in order:
+                groups.setdefault(labels[contact_id], []).append(contact_id)
+            self._clusters = sorted(groups.values(),
+                                    key=lambda group: (-len(group), group[0]))
+        return self._clusters
+
+    def to_scipy(self) -> Tuple[List[int], Any]:
+        """Return the contact IDs and the adjacency as a SciPy CSR matrix,
+        rows and columns in the order of the IDs."""
+        try:
+            import numpy
+            from scipy import sparse
+        except ImportError as error:
+            raise ImportError(
+                "to_scipy needs numpy and scipy, "
+                "run pip install numpy scipy") from error
+        ids = sorted(self._ties)
+        position = {id: index for index, id in enumerate(ids)}
+        rows, columns, weights = [], [], []
+        for contact_id, neighbours in self._ties.items():
+            for other, weight in neighbours.items():
+                rows.append(position[contact_id])
+                columns.append(position[other])
+                weights.append(weight)
+        matrix = sparse.csr_matrix(
+            (numpy.array(weights, dtype=numpy.int64), (rows, columns)),
+            shape=(len(ids), len(ids)))
+        return ids, matrix
+
+    def write(self, file: IO[str], format: str,
+              names: Mapping[int, str]) -> None:
+        """Write the graph as DOT or GraphML, labelled with names."""
+        if format == "dot":
+            self._write_dot(file, names)
+        else:
+            self._write_graphml(file, names)
+
+    def _write_dot(self, file: IO[str], names: Mapping[int, str]) -> None:
+        def quoted(text: str) -> str:
+            return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+        file.write("graph pcrmc {\n")
+        for contact_id in sorted(self._ties):
+            label = quoted(names.get(contact_id, str(contact_id)))
+            file.write(f"    {contact_id} [label={label}];\n")
+        for first, second, weight in self.edges():
+            file.write(f"    {first} -- {second} [weight={weight}];\n")
+        file.write("}\n")
+
+    def _write_graphml(self, file: IO[str],
+                       names: Mapping[int, str]) -> None:
+        file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+            '  <key id="name" for="node" attr.name="name"'
+            ' attr.type="string"/>\n'
+            '  <key id="weight" for="edge" attr.name="weight"'
+            ' attr.type="int"/>\n'
+            '  <graph id="pcrmc" edgedefault="undirected">\n')
+        for contact_id in sorted(self._ties):
+            name = escape(names.get(contact_id, str(contact_id)))
+            file.write(f'    <node id="n{contact_id}">'
+                       f'<data key="name">{name}</data></node>\n')
+        for first, second, weight in self.edges():
+            file.write(f'    <edge source="n{first}" target="n{second}">'
+                       f'<data key="weight">{weight}</data></edge>\n')
+        file.write("  </graph>\n</graphml>\n")
+
+
+def _join(parents: Tuple[Dict[int, Optional[int]], ...],
+          meeting_point: int) -> List[int]:
+    """Join the two half paths of a bidirectional search."""
+    path: List[int] = []
+    contact_id: Optional[int] = meeting_point
+    while contact_id is not None:
+        path.append(contact_id)
+        contact_id = parents[0][contact_id]
+    path.reverse()
+    contact_id = parents[1][meeting_point]
+    while contact_id is not None:
+        path.append(contact_id)
+        contact_id = parents[1][contact_id]
+    return path
@@ -0,0 +1,349 @@
+"""This module provides the PCRMC in-memory meeting and name indexes"""
+# pcrmc/index.py
+
+from bisect import bisect_left, insort
+from collections import Counter
+import heapq
+from datetime import datetime
+from typing import (Any, Dict, Iterable, Iterator, List, NamedTuple, Optional,
+                    Sequence, Set, Tuple)
+
+DATE_FORMAT = "%Y%m%d"
+# Names containing less of a query's trigrams are no candidates.
+MIN_SIMILARITY = 0.4
+
+
+def date_ordinal(date: str) -> int:
+    """Return the proleptic ordinal of a YYYYMMDD date string."""
+    return datetime.strptime(date, DATE_FORMAT).toordinal()
+
+
+def ordinal_or_none(date: str) -> Optional[int]:
+    """Return the date ordinal, or None if the date is malformed."""
+    try:
+        return date_ordinal(date)
+    except (TypeError, ValueError):
+        return None
+
+
+class MeetingStats(NamedTuple):
+    last_ordinal: int
+    count: int
+
+
+class LastMeetingIndex:
+    """Per-contact last meeting date and meeting count.
+
+    Built in a single pass over the meetings and kept up to date by the
+    Contacter, so listing contacts never has to rescan the meetings.
+    """
+
+    def __init__(self, meetings: Iterable[Dict[str, Any]] = ()) -> None:
+        self._dates: Dict[int, Dict[int, int]] = {}
+        self._last: Dict[int, int] = {}
+        self._count: Dict[int, int] = {}
+        for meeting in meetings:
+            self.add(meeting)
+
+    def add(self, meeting: Dict[str, Any]) -> None:
+        date = ordinal_or_none(meeting["Date"])
+        if date is None:
+            return
+        for contact_id in set(meeting["Participants"]):
+            dates = self._dates.setdefault(contact_id, {})
+            dates[date] = dates.get(date, 0) + 1
+            self._count[contact_id] = self._count.get(contact_id, 0) + 1
+            if contact_id not in self._last or date > self._last[contact_id]:
+                self._last[contact_id] = date
+
+    def remove(self, meeting: Dict[str, Any]) -> None:
+        date = ordinal_or_none(meeting["Date"])
+        if date is None:
+            return
+        for contact_id in set(meeting["Participants"]):
+            dates = self._dates.get(contact_id)
+            if not dates or date not in dates:
+                continue
+            dates[date] -= 1
+            self._count[contact_id] -= 1
+            if dates[date] == 0:
+                del dates[date]
+            if not dates:
+                del self._dates[contact_id]
+                del self._last[contact_id]
+                del self._count[contact_id]
+            elif self._last[contact_id] == date and date not in dates:
+                self._last[contact_id] = max(dates)
+
+    def drop_contact(self, contact_id: int) -> None:
+        self._dates.pop(contact_id, None)
+        self._last.pop(contact_id, None)
+        self._count.pop(contact_id, None)
+
+    def get(self, contact_id: int) -> Optional[MeetingStats]:
+        """Return last meeting ordinal and meeting count of a contact."""
+        if contact_id not in self._last:
+            return None
+        return MeetingStats(self._last[contact_id], self._count[contact_id])
+
+
+class DueContact(NamedTuple):
+    id: int
+    due_ordinal: int
+    last_ordinal: int
+    interval: int
+
+
+class DueIndex:
+    """Met contacts in a heap keyed by the day their next meeting is due,
+    that is the last meeting plus the contact's target interval.
+
+    Changes push a new entry and leave the old one in the heap, it is
+    dropped once it surfaces. Contacts never met are not due.
+    """
+
+    def __init__(self, last_meetings: LastMeetingIndex,
+                 intervals: Dict[int, int]) -> None:
+        self._last_meetings = last_meetings
+        self._intervals = dict(intervals)
+        self._due: Dict[int, int] = {}
+        for contact_id in self._intervals:
+            due = self._due_ordinal(contact_id)
+            if due is not None:
+                self._due[contact_id] = due
+        self._heap = [(due, id) for id, due in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def _due_ordinal(self, contact_id: int) -> Optional[int]:
+        stats = self._last_meetings.get(contact_id)
+        interval = self._intervals.get(contact_id)
+        if stats is None or interval is None:
+            return None
+        return stats.last_ordinal + interval
+
+    def update(self, contact_id: int) -> None:
+        """Requeue a contact after its meetings changed."""
+        due = self._due_ordinal(contact_id)
+        if due == self._due.get(contact_id):
+            return
+        if due is None:
+            del self._due[contact_id]
+            return
+        self._due[contact_id] = due
+        heapq.heappush(self._heap, (due, contact_id))
+
+    def set_interval(self, contact_id: int, interval: int) -> None:
+        self._intervals[contact_id] = interval
+        self.update(contact_id)
+
+    def drop_contact(self, contact_id: int) -> None:
+        self._intervals.pop(contact_id, None)
+        self._due.pop(contact_id, None)
+
+    def most_overdue(self, limit: int, today: int) -> List[DueContact]:
+        """Return up to limit contacts due before today, most overdue
+        first, popping only as many entries as it returns."""
+        found: List[Tuple[int, int]] = []
+        seen: Set[int] = set()
+        while self._heap and len(found) < limit:
+            due, contact_id = self._heap[0]
+            if due >= today:
+                break
+            heapq.heappop(self._heap)
+            if self._due.get(contact_id) != due or contact_id in seen:
+                continue
+            found.append((due, contact_id))
+            seen.add(contact_id)
+        for entry in found:
+            heapq.heappush(self._heap, entry)
+        return [DueContact(id, due, due - self._intervals[id],
+                           self._intervals[id])
+                for due, id in found]
+
+
+class MeetingIndex:
+    """Inverted indexes from participant, location and topic to meeting
+    IDs, plus (date ordinal, ID) pairs kept sorted for range queries.
+
+    Queries with several filters intersect the posting sets, starting
+    with the smallest one. A date range is a bisect and a slice.
+    """
+
+    def __init__(self, meetings: Iterable[Dict[str, Any]] = ()) -> None:
+        self._meetings: Dict[int, Dict[str, Any]] = {}
+        self._participants: Dict[int, Set[int]] = {}
+        self._by_date: List[Tuple[int, int]] = []
+        self._locations: Dict[str, Set[int]] = {}
+        self._topics: Dict[str, Set[int]] = {}
+        for meeting in meetings:
+            ordinal = self._add_postings(meeting)
+            if ordinal is not None:
+                self._by_date.append((ordinal, meeting["ID"]))
+        self._by_date.sort()
+
+    def _postings(self, meeting: Dict[str, Any]
+                  ) -> Iterator[Tuple[Dict[Any, Set[int]], Any]]:
+        for participant in meeting["Participants"]:
+            yield self._participants, participant
+        yield self._locations, meeting["Loc"]
+        for topic in meeting["Topics"]:
+            yield self._topics, topic
+
+    def _add_postings(self, meeting: Dict[str, Any]) -> Optional[int]:
+        """Index a meeting's keys and return its date ordinal."""
+        id = meeting["ID"]
+        self._meetings[id] = meeting
+        for index, key in self._postings(meeting):
+            index.setdefault(key, set()).add(id)
+        return ordinal_or_none(meeting["Date"])
+
+    def add(self, meeting: Dict[str, Any]) -> None:
+        ordinal = self._add_postings(meeting)
+        if ordinal is not None:
+            insort(self._by_date, (ordinal, meeting["ID"]))
+
+    def remove(self, meeting: Dict[str, Any]) -> None:
+        id = meeting["ID"]
+        self._meetings.pop(id, None)
+        ordinal = ordinal_or_none(meeting["Date"])
+        if ordinal is not None:
+            position = bisect_left(self._by_date, (ordinal, id))
+            if self._by_date[position:position + 1] == [(ordinal, id)]:
+                del self._by_date[position]
+        for index, key in self._postings(meeting):
+            ids = index.get(key)
+            if ids is None:
+                continue
+            ids.discard(id)
+            if not ids:
+                del index[key]
+
+    def with_participants(self, contact_ids: Iterable[int]) -> Set[int]:
+        """Return the IDs of meetings any of the contacts took part in."""
+        found: Set[int] = set()
+        for contact_id in contact_ids:
+            found |= self._participants.get(contact_id, set())
+        return found
+
+    def drop_participants(self, contact_ids: Iterable[int]) -> None:
+        """Take deleted contacts out of their meetings."""
+        contact_ids = set(contact_ids)
+        for id in self.with_participants(contact_ids):
+            meeting = self._meetings[id]
+            # a no-op if the handler changed the same record already
+            meeting["Participants"] = [
+                participant for participant in meeting["Participants"]
+                if participant not in contact_ids]
+        for contact_id in contact_ids:
+            self._participants.pop(contact_id, None)
+
+    def date_range(self, since: Optional[int] = None,
+                   until: Optional[int] = None) -> List[int]:
+        """Return the IDs of meetings dated within [since, until]."""
+        low = 0 if since is None else bisect_left(self._by_date, (since,))
+        high = len(self._by_date) if until is None else \
+            bisect_left(self._by_date, (until + 1,))
+        return [id for _, id in self._by_date[low:high]]
+
+    def find(self,
+             participants: Sequence[int] = (),
+             date: Optional[int] = None,
+             loc: str = "",
+             topics: Sequence[str] = (),
+             since: Optional[int] = None,
+             until: Optional[int] = None
+             ) -> List[Dict[str, Any]]:
+        """Return the meetings matching all filters, ordered by ID.
+
+        Dates are ordinals, date matches a single day.
+        """
+        postings = [self._participants.get(p, set()) for p in participants]
+        postings += [self._topics.get(t, set()) for t in topics]
+        if date is not None:
+            since = date if since is None else max(since, date)
+            until = date if until is None else min(until, date)
+        if since is not None or until is not None:
+            postings.append(set(self.date_range(since, until)))
+        if loc:
+            postings.append(self._locations.get(loc, set()))
+        if not postings:
+            ids: Iterable[int] = self._meetings
+        else:
+            postings.sort(key=len)
+            smallest, rest = postings[0], postings[1:]
+            ids = [id for id in smallest if all(id in ids for ids in rest)]
+        return [self._meetings[id] for id in sorted(ids)]
+
+
+class NameMatch(NamedTuple):
+    id: int
+    name: str
+    similarity: float
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the character trigrams of the words in a text.
+
+    Words are padded like pg_trgm does, so word starts weigh more and
+    one-letter typos still leave most trigrams intact.
+    """
+    grams = set()
+    for word in text.casefold().split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """Character trigram index over contact names.
+
+    A lookup only counts the postings of the query's trigrams, so it
+    touches the contacts sharing a trigram with the query instead of
+    computing an edit distance against every name.
+    """
+
+    def __init__(self, contacts: Iterable[Dict[str, Any]] = ()) -> None:
+        self._names: Dict[int, str] = {}
+        self._grams: Dict[int, Set[str]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        for contact in contacts:
+            self.add(contact)
+
+    def add(self, contact: Dict[str, Any]) -> None:
+        id = contact["ID"]
+        if id in self._names:
+            self.remove(id)
+        grams = trigrams(str(contact.get("Name") or ""))
+        self._names[id] = str(contact.get("Name") or "")
+        self._grams[id] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(id)
+
+    def remove(self, contact_id: int) -> None:
+        self._names.pop(contact_id, None)
+        for gram in self._grams.pop(contact_id, ()):
+            ids = self._postings[gram]
+            ids.discard(contact_id)
+            if not ids:
+                del self._postings[gram]
+
+    def find(self, name: str, limit: int = 5,
+             min_similarity: float = MIN_SIMILARITY) -> List[NameMatch]:
+        """Return the closest names, most similar first.
+
+        Similarity is the share of the query's trigrams found in a name,
+        so a single word still matches a full name. Ties go to the name
+        with fewer extra trigrams.
+        """
+        query = trigrams(name)
+        shared: Counter = Counter()
+        for gram in query:
+            shared.update(self._postings.get(gram, ()))
+        ranked = []
+        for id, count in shared.items():
+            similarity = count / len(query)
+            if similarity >= min_similarity:
+                extra = len(self._grams[id]) - count
+                ranked.append((-similarity, extra, id))
+        return [NameMatch(id, self._names[id], -similarity)
+                for similarity, _, id in heapq.nsmallest(limit, ranked)]
@@ -0,0 +1,94 @@
+"""This module provides the PCRMC append-only operation journal"""
+# pcrmc/journal.py
+
+import json
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Tuple
+from pcrmc.metrics import METRICS
+from pcrmc.records import to_json
+
+# how much of the journal end _cut_unfinished reads at a time
+_BLOCK = 1 << 16
+
+
+def _cut_unfinished(file: BinaryIO) -> None:
+    """Truncate a journal opened for appending to its last newline."""
+    size = file.seek(0, os.SEEK_END)
+    end = size
+    while end:
+        start = max(end - _BLOCK, 0)
+        file.seek(start)
+        newline = file.read(end - start).rfind(b"\n")
+        if newline >= 0:
+            end = start + newline + 1
+            break
+        end = start
+    if end != size:
+        file.truncate(end)
+
+
+class Journal:
+    """Append-only log of JSON operations, one operation per line.
+
+    A crash while appending can only leave a truncated last line behind.
+    read() ignores it and the next append() cuts it off before writing.
+    Lines that do not parse are skipped.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def append(self, ops: List[Dict[str, Any]]) -> int:
+        """Append operations in a single write, return the bytes written."""
+        with METRICS.timer("serialize"):
+            text = "".join(
+                json.dumps(op, separators=(",", ":"), default=to_json) + "\n"
+                for op in ops)
+        data = text.encode("utf-8")
+        with METRICS.timer("io"):
+            with self.path.open("a+b") as file:
+                _cut_unfinished(file)
+                file.write(data)
+        METRICS.written(len(data))
+        return len(data)
+
+    def read(self) -> List[Dict[str, Any]]:
+        """Return all complete operations in the journal."""
+        return self.read_from(0)[0]
+
+    def read_from(self, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Return the complete operations from byte offset on, and the
+        offset just past the last of them."""
+        try:
+            with METRICS.timer("io"):
+                with self.path.open("rb") as file:
+                    file.seek(offset)
+                    data = file.read()
+        except FileNotFoundError:
+            return [], 0
+        METRICS.read(len(data))
+        # everything after the last newline is an unfinished append
+        end = data.rfind(b"\n") + 1
+        with METRICS.timer("parse"):
+            ops = []
+            for line in data[:end].split(b"\n"):
+                try:
+                    op = json.loads(line) if line else None
+                except ValueError:
+                    # garbage from an older crashed append, skip it
+                    continue
+                if isinstance(op, dict):
+                    ops.append(op)
+        return ops, offset + end
+
+    def size(self) -> int:
+        """Return the size of the journal in bytes."""
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def clear(self) -> None:
+        """Remove all operations from the journal."""
+        self.path.write_text("")
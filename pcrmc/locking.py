@@ -0,0 +1,145 @@
+"""This module provides the PCRMC file locking and atomic file writes
+
+Processes writing a database hold an exclusive advisory lock on the
+<db>.lock file next to it, processes reading it a shared one. That is
+fcntl.flock on Unix and msvcrt.locking on Windows, where every lock is
+exclusive. Without either, locking is skipped.
+
+atomic_write replaces a file by writing a temporary file next to it,
+syncing it to disk and renaming it over the old one, so the file is
+always either the old or the new version, never a truncated one.
+"""
+# pcrmc/locking.py
+
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None  # type: ignore
+
+
+def lock_path(db_path: Path) -> Path:
+    """Return the lock file of the database at db_path."""
+    return db_path.with_name(db_path.name + ".lock")
+
+
+def _lock(file: IO[bytes], exclusive: bool) -> None:
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX if exclusive
+                    else fcntl.LOCK_SH)
+    elif msvcrt is not None:
+        file.seek(0)
+        while True:
+            try:
+                # retries for about 10 seconds before giving up
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                time.sleep(0.1)
+
+
+def _unlock(file: IO[bytes]) -> None:
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """A re-entrant advisory lock on a file, shared or exclusive.
+
+    Nested holds of the same FileLock are free. A shared hold cannot be
+    turned into an exclusive one, take the exclusive lock first.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.exclusive = False
+        self._depth = 0
+
+    @property
+    def held(self) -> bool:
+        return self._depth > 0
+
+    @contextmanager
+    def hold(self, exclusive: bool = True) -> Iterator[None]:
+        if self._depth:
+            if exclusive and not self.exclusive:
+                raise RuntimeError("cannot upgrade a shared lock")
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+        try:
+            # opened per hold, a forked process must not share the lock
+            file: Optional[IO[bytes]] = open(self.path, "ab")
+        except OSError:
+            # a read-only location, reading works without the lock and
+            # writing fails anyway
+            file = None
+        if file is not None:
+            try:
+                _lock(file, exclusive)
+            except BaseException:
+                file.close()
+                raise
+        self.exclusive, self._depth = exclusive, 1
+        try:
+            yield
+        finally:
+            self._depth = 0
+            if file is not None:
+                try:
+                    _unlock(file)
+                finally:
+                    file.close()
+
+
+def _sync_directory(directory: Path) -> None:
+    """Make a rename in directory durable, where that is possible."""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Windows cannot open directories
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def atomic_write(path: Path, data: Union[str, bytes]) -> None:
+    """Replace path with data, all at once even if the process dies."""
+    if isinstance(data, str):
+        data = data.encode("utf-8", "surrogatepass")
+    temp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        # created with the usual permissions, mkstemp would use 0600
+        descriptor = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                             0o666)
+        with open(descriptor, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            temp.unlink()
+        except OSError:
+            pass
+        raise
+    _sync_directory(path.parent)
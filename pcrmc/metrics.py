@@ -0,0 +1,98 @@
+"""This module provides the PCRMC profiling metrics"""
+# pcrmc/metrics.py
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+LAYERS = ("io", "parse", "serialize", "render")
+
+
+class Metrics:
+    """Time spent per layer and bytes moved during one invocation.
+
+    Disabled by default, so the timers only cost a flag check. Timers
+    may nest, every moment is charged to the innermost layer only. Parse
+    and write counts are collected from the database handlers created
+    while enabled.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.perf_counter()
+        self.seconds = dict.fromkeys(LAYERS, 0.0)
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._handlers: List[Any] = []
+        self._layer: Optional[str] = None
+        self._since = self.started
+
+    def enable(self) -> None:
+        self.reset()
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    @contextmanager
+    def timer(self, layer: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        outer = self._switch(layer)
+        try:
+            yield
+        finally:
+            self._switch(outer)
+
+    def _switch(self, layer: Optional[str]) -> Optional[str]:
+        """Charge the time since the last switch, return the old layer."""
+        now = time.perf_counter()
+        if self._layer is not None:
+            self.seconds[self._layer] += now - self._since
+        outer, self._layer, self._since = self._layer, layer, now
+        return outer
+
+    def read(self, size: int) -> None:
+        if self.enabled:
+            self.bytes_read += size
+
+    def written(self, size: int) -> None:
+        if self.enabled:
+            self.bytes_written += size
+
+    def watch(self, handler: Any) -> None:
+        """Count the parses and writes of a database handler."""
+        if self.enabled:
+            self._handlers.append(handler)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics so far, times in milliseconds."""
+        total = time.perf_counter() - self.started
+        snapshot: Dict[str, Any] = {"total_ms": round(total * 1000, 3)}
+        for layer, seconds in self.seconds.items():
+            snapshot[f"{layer}_ms"] = round(seconds * 1000, 3)
+        # whatever no timer covered is pcrmc's own logic
+        logic = total - sum(self.seconds.values())
+        snapshot["logic_ms"] = round(logic * 1000, 3)
+        snapshot["parses"] = sum(h.parse_count for h in self._handlers)
+        snapshot["writes"] = sum(h.write_count for h in self._handlers)
+        snapshot["bytes_read"] = self.bytes_read
+        snapshot["bytes_written"] = self.bytes_written
+        return snapshot
+
+
+METRICS = Metrics()
+
+
+def format_bytes(size: float) -> str:
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KiB", "MiB", "GiB"):
+        size /= 1024
+        if size < 1024:
+            break
+    return f"{size:.1f} {unit}"
@@ -0,0 +1,318 @@
+"""This module provides the PCRMC time-partitioned storage backend
+
+A partitioned database is a JSON database whose meetings are split into
+one file per year or month next to it:
+
+    contact.json                 header, manifest and contacts
+    contact.json.partitions/     2023.4.json, 2024.7.json, undated.4.json
+
+The manifest in the header of the main file lists every partition with
+its file, meeting count, first and last date and lowest and highest ID,
+so date-filtered reads and lookups by ID open only the partitions that
+can hold a match. Mutations go to the journal as usual and record the
+partitions they touch, and a compaction rewrites only those. Writes
+outside a transaction load the contacts and the manifest, not the
+meetings. Partition files are named after the generation that wrote
+them and the main file is written last, so a crash in between leaves
+the previous snapshot intact.
+"""
+# pcrmc/partitioned_database.py
+
+import json
+from pathlib import Path
+from typing import (AbstractSet, Any, Dict, Iterable, Iterator, List,
+                    Optional, Set)
+from pcrmc import DB_READ_ERROR, DB_WRITE_ERROR, JSON_ERROR, SUCCESS
+from pcrmc.database import (DEFAULT_JOURNAL_LIMIT, ID_COUNTERS,
+                            DatabaseHandler, DBResponse, _find, _next_id,
+                            _replay, journal_path)
+from pcrmc.locking import atomic_write
+from pcrmc.metrics import METRICS
+from pcrmc.records import RECORDS, Meeting, Record, to_json
+from pcrmc.search import search_path
+from pcrmc.stream import StreamReader
+
+# Partition of meetings without a YYYYMMDD date.
+UNDATED = "undated"
+
+
+def partitions_path(db_path: Path) -> Path:
+    """Return the directory holding the meeting partitions of db_path."""
+    return db_path.with_name(db_path.name + ".partitions")
+
+
+def remove_partitions(db_path: Path) -> None:
+    """Delete the meeting partitions of db_path, if there are any."""
+    directory = partitions_path(db_path)
+    if not directory.is_dir():
+        return
+    for path in directory.glob("*.json"):
+        path.unlink()
+    directory.rmdir()
+
+
+def partition_key(meeting: Dict[str, Any], partition_by: str) -> str:
+    """Return the partition of a meeting, like "2024" or "202403"."""
+    date = meeting.get("Date")
+    if type(date) is not str or len(date) != 8 or not date.isdigit():
+        return UNDATED
+    return date[:4] if partition_by == "year" else date[:6]
+
+
+def _overlaps(entry: Dict[str, Any], since: Optional[str],
+              until: Optional[str]) -> bool:
+    if entry["First"] is None:
+        # undated meetings never match a date filter
+        return since is None and until is None
+    return (since is None or entry["Last"] >= since) \
+        and (until is None or entry["First"] <= until)
+
+
+def _holds(entry: Dict[str, Any], ids: Optional[AbstractSet[int]]) -> bool:
+    if ids is None or "IDs" not in entry:
+        # manifests written before ID ranges were kept
+        return True
+    return entry["IDs"] is not None \
+        and any(entry["IDs"][0] <= id <= entry["IDs"][1] for id in ids)
+
+
+def init_partitioned_database(db_path: Path,
+                              partition_by: str = "year") -> int:
+    """Create an empty partitioned pcrmc database."""
+    try:
+        # the header in front, see DatabaseHandler._stream
+        empty = {"Generation": 0, "PartitionBy": partition_by,
+                 "Partitions": {}, "Contacts": []}
+        atomic_write(db_path, json.dumps(empty, indent=4))
+        for stale in (journal_path(db_path), search_path(db_path)):
+            if stale.exists():
+                stale.unlink()
+        return SUCCESS
+    except OSError:
+        return DB_WRITE_ERROR
+
+
+class PartitionedDatabaseHandler(DatabaseHandler):
+    """A DatabaseHandler keeping meetings in per-year or month files.
+
+    partition_by applies to databases converted into this format, an
+    existing one keeps the partitioning it was created with.
+    """
+
+    prunes_dates = True
+
+    def __init__(self, db_path: Path,
+                 journal_limit: int = DEFAULT_JOURNAL_LIMIT,
+                 partition_by: Optional[str] = None) -> None:
+        super().__init__(db_path, journal_limit)
+        self._partitions_path = partitions_path(db_path)
+        self._partition_by = partition_by
+        # set when the meetings were replaced without journal entries
+        self._rewrite_all = False
+        self.partition_reads = 0
+
+    def _read_partition(self, entry: Dict[str, Any]) -> List[Any]:
+        with METRICS.timer("io"):
+            text = (self._partitions_path / entry["File"]).read_bytes()
+        METRICS.read(len(text))
+        self.partition_reads += 1
+        with METRICS.timer("parse"):
+            return [Meeting.from_json(meeting)
+                    for meeting in json.loads(text)["Meetings"]]
+
+    def _read_snapshot(self, meetings: bool = True) -> Dict[str, Any]:
+        document = super()._read_snapshot()
+        partitions = document.get("Partitions", {})
+        if not meetings and partitions and not document["Meetings"] \
+                and ID_COUNTERS["Meetings"] in document:
+            # a write only needs the header, see _touched
+            del document["Meetings"]
+            return document
+        # meetings still in the main file, as in a new database, come first
+        stored = document.pop("Meetings")
+        for entry in partitions.values():
+            stored.extend(self._read_partition(entry))
+        # back in ID order, each partition is one sorted run already
+        stored.sort(key=lambda meeting: meeting.id
+                    if type(meeting.id) is int else -1)
+        document["Meetings"] = stored
+        return document
+
+    def _touched(self, op: Dict[str, Any], partition_by: str) -> Set[str]:
+        """Return the partitions a meeting operation changes."""
+        if op["op"] == "add":
+            return {partition_key(op["record"], partition_by)}
+        document = self._document
+        if document is not None and "Meetings" in document:
+            meetings = document["Meetings"]
+            position = _find(meetings, op["id"])
+            meeting = None if position is None else meetings[position]
+        else:
+            meeting = next(self._stream_meetings(ids={op["id"]}), None)
+        if meeting is None:
+            return set()
+        touched = {partition_key(meeting, partition_by)}
+        if op["op"] == "modify" and "Date" in op["fields"]:
+            touched.add(partition_key(op["fields"], partition_by))
+        return touched
+
+    def _get(self, table: str, id: int) -> DBResponse:
+        document = self._document
+        if table == "Meetings" and not self._transactions \
+                and (document is None or "Meetings" not in document):
+            # one meeting is in one partition, no need to load them all
+            return self._stream_get(table, id)
+        return super()._get(table, id)
+
+    def _commit(self, ops: List[Dict[str, Any]]) -> None:
+        document = self._load(meetings=self._transactions > 0)
+        partition_by = document.get("PartitionBy", "year")
+        for op in ops:
+            if op["table"] == "Meetings" and op["op"] != "reserve":
+                op["partitions"] = sorted(self._touched(op, partition_by))
+        super()._commit(ops)
+
+    def _write_partition(self, key: str, generation: int,
+                         meetings: List[Any]) -> Dict[str, Any]:
+        name = f"{key}.{generation}.json"
+        with METRICS.timer("serialize"):
+            text = json.dumps({"Meetings": meetings}, indent=4,
+                              default=to_json)
+        with METRICS.timer("io"):
+            self._partitions_path.mkdir(exist_ok=True)
+            atomic_write(self._partitions_path / name, text)
+        METRICS.written(len(text))
+        dates = [m["Date"] for m in meetings] if key != UNDATED else []
+        ids = [m["ID"] for m in meetings if type(m["ID"]) is int]
+        return {"File": name, "Count": len(meetings),
+                "First": min(dates, default=None),
+                "Last": max(dates, default=None),
+                "IDs": [min(ids), max(ids)] if ids else None}
+
+    def _write_snapshot(self, data: Dict[str, Any]) -> str:
+        """Write the changed partitions, then the main file."""
+        partition_by = self._partition_by or data.get("PartitionBy", "year")
+        manifest = data.get("Partitions", {})
+        if data.get("PartitionBy") != partition_by or self._rewrite_all:
+            manifest = {}
+        touched: Set[str] = set()
+        for op in self._journal.read() + self._pending:
+            touched.update(op.get("partitions", ()))
+        groups: Dict[str, List[Any]] = {}
+        for meeting in data.get("Meetings", []):
+            groups.setdefault(partition_key(meeting, partition_by),
+                              []).append(meeting)
+        partitions = {}
+        for key in sorted(groups):
+            entry = manifest.get(key)
+            if entry is None or key in touched:
+                entry = self._write_partition(key, data["Generation"],
+                                              groups[key])
+            partitions[key] = entry
+        # kept in the header, so writes can skip the partitions
+        _next_id(data, "Meetings")
+        data.pop("PartitionBy", None)
+        data.pop("Partitions", None)
+        data["PartitionBy"] = partition_by
+        data["Partitions"] = partitions
+        # tables last again, so streaming reads meet the manifest first
+        for table in RECORDS:
+            if table in data:
+                data[table] = data.pop(table)
+        main = {key: value for key, value in data.items()
+                if key != "Meetings"}
+        with METRICS.timer("serialize"):
+            new_data_str = json.dumps(main, indent=4, default=to_json)
+        with METRICS.timer("io"):
+            atomic_write(self._db_path, new_data_str)
+        METRICS.written(len(new_data_str))
+        self._rewrite_all = False
+        self._remove_stale(partitions.values())
+        return new_data_str
+
+    def _remove_stale(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """Delete partition files the manifest no longer refers to."""
+        current = {entry["File"] for entry in entries}
+        for path in self._partitions_path.glob("*.json"):
+            if path.name not in current:
+                try:
+                    path.unlink()
+                except OSError:
+                    # left for the next compaction
+                    pass
+
+    def _partition_records(self, readers: List[StreamReader]
+                           ) -> Iterator[Any]:
+        for reader in readers:
+            self.partition_reads += 1
+            if reader.seek("Meetings"):
+                yield from reader.records()
+            else:
+                reader.close()
+
+    def _stream_meetings(self, since: Optional[str] = None,
+                         until: Optional[str] = None,
+                         ids: Optional[AbstractSet[int]] = None
+                         ) -> Iterator[Record]:
+        """Stream the meetings of the partitions overlapping since and
+        until, or holding ids, with the journal applied.
+
+        Partitions holding meetings the journal changes are read as well,
+        a meeting may be moved into the date range.
+        """
+        document = self._document
+        if document is not None and "Meetings" in document \
+                and self._file_stamp() == self._stamp:
+            return super()._stream("Meetings", ids)
+        # a compaction may remove the partitions of the manifest read,
+        # the files are opened under the lock and read later
+        with self._lock.hold(exclusive=False):
+            self._note_stamp(self._file_stamp())
+            reader = StreamReader(self._db_path)
+            try:
+                # the manifest is in the header, in front of the contacts
+                reader.seek("Contacts")
+            finally:
+                reader.close()
+            header = reader.header
+            if "Partitions" not in header:
+                return super()._stream("Meetings", ids)
+            generation = header.get("Generation", 0)
+            ops = [op for op in self._journal.read()
+                   if op["table"] == "Meetings" and op["op"] != "reserve"
+                   and op["gen"] == generation]
+            changed = {key for op in ops if op["op"] != "add"
+                       and (ids is None or op["id"] in ids)
+                       for key in op.get("partitions", ())}
+            readers: List[StreamReader] = []
+            try:
+                for key, entry in header["Partitions"].items():
+                    if key in changed or (_overlaps(entry, since, until)
+                                          and _holds(entry, ids)):
+                        readers.append(StreamReader(
+                            self._partitions_path / entry["File"]))
+            except BaseException:
+                for opened in readers:
+                    opened.close()
+                raise
+        return _replay(self._partition_records(readers), "Meetings", ops,
+                       ids)
+
+    def _stream(self, table: str, ids: Optional[AbstractSet[int]] = None
+                ) -> Iterator[Record]:
+        if table == "Meetings":
+            return self._stream_meetings(ids=ids)
+        return super()._stream(table, ids)
+
+    def iter_meetings_between(self, since: Optional[str] = None,
+                              until: Optional[str] = None) -> DBResponse:
+        try:
+            return DBResponse(self._stream_meetings(since, until), SUCCESS)
+        except json.JSONDecodeError:
+            return DBResponse(iter(()), JSON_ERROR)
+        except OSError:
+            return DBResponse(iter(()), DB_READ_ERROR)
+
+    def write_meetings(self, meeting_list: List[Dict[str, Any]]) -> DBResponse:
+        self._rewrite_all = True
+        return super().write_meetings(meeting_list)
@@ -2,47 +2,223 @@
 # pcrmc/pcrmc.py
 
 from pathlib import Path
-from typing import Any, Dict, List, NamedTuple
-from pcrmc import config, SUCCESS
-from pcrmc.database import DatabaseHandler
+from typing import (TYPE_CHECKING, Any, ContextManager, Dict, Iterable,
+                    Iterator, List, Mapping, NamedTuple, Optional, Sequence,
+                    Tuple)
+import sqlite3
+from datetime import datetime
+from pcrmc import (DATE_ERROR, DB_READ_ERROR, DB_WRITE_ERROR, ID_ERROR,
+                   SUCCESS)
+from pcrmc.database import DEFAULT_JOURNAL_LIMIT, get_database_handler
+from pcrmc.graph import ContactGraph
+from pcrmc.index import (DATE_FORMAT, DueIndex, LastMeetingIndex,
+                         MeetingIndex, NameIndex, date_ordinal,
+                         ordinal_or_none)
+from pcrmc.search import (SearchIndex, contact_key, contact_tokens,
+                          meeting_key, meeting_tokens, search_path)
+from pcrmc.stats import MeetingColumns, compute_stats
+
+if TYPE_CHECKING:
+    from pcrmc.config import CadenceConfig
+
+
+class ContacterResponse(NamedTuple):
+    data: Any
+    error: int
 
 
-# TODO: needs to be tested
 def generateMeeting(participants: List[int],
                     date: str,
                     loc: str,
                     topics: List[str]
-                    ) -> Dict[str, Any]:
+                    ) -> ContacterResponse:
+    """Build a meeting, rejecting dates that are not YYYYMMDD.
+
+    An empty date means today.
+    """
+    date = date or datetime.today().strftime(DATE_FORMAT)
     meeting = {
         "ID": -1,
         "Participants": participants,
         "Date": date, "Loc": loc,
         "Topics": topics
         }
-    return meeting
+    try:
+        date_ordinal(date)
+    except ValueError:
+        return ContacterResponse(meeting, DATE_ERROR)
+    return ContacterResponse(meeting, SUCCESS)
 
 
-class ContacterResponse(NamedTuple):
-    data: Any
-    error: int
+def _date_filters(date: str, since: str, until: str
+                  ) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """Turn YYYYMMDD filter strings into ordinals, raise ValueError."""
+    def ordinal(text: str) -> Optional[int]:
+        return date_ordinal(text) if text else None
+    return ordinal(date), ordinal(since), ordinal(until)
+
+
+def filter_meetings(meetings: Iterable[Dict[str, Any]],
+                    participants: Sequence[int] = (),
+                    date: Optional[int] = None,
+                    loc: str = "",
+                    topics: Sequence[str] = (),
+                    since: Optional[int] = None,
+                    until: Optional[int] = None
+                    ) -> Iterator[Dict[str, Any]]:
+    """Yield the meetings matching all given filters.
+
+    Dates are ordinals, date matches a single day.
+    """
+    if date is not None:
+        since = date if since is None else max(since, date)
+        until = date if until is None else min(until, date)
+    check_dates = since is not None or until is not None
+    for meeting in meetings:
+        if participants and not all(
+                p in meeting["Participants"] for p in participants):
+            continue
+        if loc and meeting["Loc"] != loc:
+            continue
+        if topics and not all(t in meeting["Topics"] for t in topics):
+            continue
+        if check_dates:
+            ordinal = ordinal_or_none(meeting["Date"])
+            if ordinal is None \
+                    or (since is not None and ordinal < since) \
+                    or (until is not None and ordinal > until):
+                continue
+        yield meeting
+
+
+def filter_contacts(contacts: Iterable[Dict[str, Any]],
+                    where: Mapping[str, str]) -> Iterator[Dict[str, Any]]:
+    """Yield the contacts whose fields equal all values of where,
+    ignoring case."""
+    wanted = [(field, value.casefold()) for field, value in where.items()]
+    for contact in contacts:
+        if all(str(contact.get(field, "")).casefold() == value
+               for field, value in wanted):
+            yield contact
 
 
 class Contacter:
-    def __init__(self, db_path: Path) -> None:
-        self._db_handler = DatabaseHandler(db_path)
+    def __init__(self, db_path: Path, backend: str = "json",
+                 journal_limit: int = DEFAULT_JOURNAL_LIMIT) -> None:
+        self._db_handler = get_database_handler(
+            db_path, backend, journal_limit)
+        self._last_meetings: Optional[LastMeetingIndex] = None
+        self._meeting_index: Optional[MeetingIndex] = None
+        self._name_index: Optional[NameIndex] = None
+        self._due_index: Optional[DueIndex] = None
+        self._graph: Optional[ContactGraph] = None
+        self._columns: Optional[MeetingColumns] = None
+        self._cadence: Optional["CadenceConfig"] = None
+        self._outside_version: Optional[int] = None
+        self._search = SearchIndex(search_path(db_path))
+
+    def _drop_stale_indexes(self) -> None:
+        """Forget the in-memory indexes if another process changed the
+        database since they were built, they are rebuilt on next use."""
+        try:
+            version: Optional[int] = self._db_handler.outside_version()
+        except (OSError, sqlite3.Error):
+            version = None
+        if version is None or version != self._outside_version:
+            self._last_meetings = None
+            self._meeting_index = None
+            self._name_index = None
+            self._due_index = None
+            self._graph = None
+            self._columns = None
+        self._outside_version = version
+
+    def _update_search(self, removed: Iterable[str] = (),
+                       added: Iterable[Tuple[str, List[str]]] = ()) -> None:
+        """Keep an existing search index in step with a mutation."""
+        if not self._search.exists():
+            return
+        try:
+            self._search.update(removed, added)
+        except sqlite3.Error:
+            # a stale index is worse than none, the next search rebuilds it
+            self._search.path.unlink()
+
+    def _update_due(self, meeting: Dict[str, Any]) -> None:
+        if self._due_index is not None:
+            for contact_id in set(meeting["Participants"]):
+                self._due_index.update(contact_id)
+
+    def _set_interval(self, contact: Dict[str, Any]) -> None:
+        if self._due_index is not None and self._cadence is not None:
+            self._due_index.set_interval(
+                contact["ID"], self._cadence.interval_for(contact))
+
+    def transaction(self) -> ContextManager[Any]:
+        """Group mutations into one locked write, see
+        DatabaseHandler.transaction."""
+        return self._db_handler.transaction()
 
     def addMeeting(self, meeting: Dict[str, Any]) -> int:
         """Add new meeting"""
-        response = self._db_handler.read_meetings()
-        if response.error != SUCCESS:
-            return ContacterResponse(response.data, response.error)
-        meeting["ID"] = \
-            self._db_handler.get_new_meeting_id(config.CONFIG_FILE_PATH)
+        return self.add_meetings([meeting]).error
 
-        response.data.append(meeting)
+    def add_meetings(self,
+                     meetings: List[Dict[str, Any]]) -> ContacterResponse:
+        """Add several meetings with one ID reservation and one write."""
+        self._drop_stale_indexes()
+        write = self._db_handler.add_meetings(meetings)
+        if write.error != SUCCESS:
+            return ContacterResponse(write.data, write.error)
+        for meeting in meetings:
+            if self._last_meetings is not None:
+                self._last_meetings.add(meeting)
+            if self._meeting_index is not None:
+                self._meeting_index.add(meeting)
+            self._update_due(meeting)
+            if self._graph is not None:
+                self._graph.add(meeting)
+            if self._columns is not None:
+                self._columns.add(meeting)
+        self._update_search(
+            added=[(meeting_key(m), meeting_tokens(m)) for m in meetings])
+        return ContacterResponse(write.data, write.error)
+
+    def modify_meeting(self, id: int, field: str,
+                       value: Any) -> ContacterResponse:
+        if field == "Date" and ordinal_or_none(value) is None:
+            return ContacterResponse(value, DATE_ERROR)
+        if field == "ID":
+            return ContacterResponse(value, ID_ERROR)
+        if field == "Participants":
+            for participant in value:
+                if type(participant) is not int or participant < 0 or \
+                        self._db_handler.get_contact(participant).error:
+                    return ContacterResponse(value, ID_ERROR)
+        read = self._db_handler.get_meeting(id)
+        if read.error != SUCCESS:
+            return ContacterResponse(read.data, read.error)
 
-        write = self._db_handler.write_meetings(response.data)
-        return write.error
+        self._drop_stale_indexes()
+        old_meeting = dict(read.data)
+        write = self._db_handler.modify_meeting(id, {field: value})
+        if write.error != SUCCESS:
+            return ContacterResponse(write.data, write.error)
+        for index in (self._last_meetings, self._meeting_index):
+            if index is not None:
+                index.remove(old_meeting)
+                index.add(write.data)
+        self._update_due(old_meeting)
+        self._update_due(write.data)
+        if self._graph is not None:
+            self._graph.remove(old_meeting)
+            self._graph.add(write.data)
+        # the columns only grow, a changed meeting means a reload
+        self._columns = None
+        self._update_search(
+            [meeting_key(old_meeting)],
+            [(meeting_key(write.data), meeting_tokens(write.data))])
+        return ContacterResponse(write.data, write.error)
 
     def add(self,
             name: List[str],
@@ -56,38 +232,85 @@ class Contacter:
                 "Name": name_text,
                 "Country": country,
                 "Industry": industry}
-        read = self._db_handler.read_contacts()
-        if read.error != SUCCESS:
-            return ContacterResponse(contact, read.error)
-
-        contact["ID"] = \
-            self._db_handler.get_new_contact_id(config.CONFIG_FILE_PATH)
-        read.data.append(contact)
-        write = self._db_handler.write_contacts(read.data)
+        write = self.add_contacts([contact])
         return ContacterResponse(contact, write.error)
 
+    def add_contacts(self, contacts: List[Dict[str, Any]],
+                     keep_ids: bool = False) -> ContacterResponse:
+        """Add several contacts with one ID reservation and one write.
+
+        With keep_ids, contacts that have an ID keep it.
+        """
+        self._drop_stale_indexes()
+        write = self._db_handler.add_contacts(contacts, keep_ids)
+        if write.error == SUCCESS:
+            for contact in contacts:
+                if self._name_index is not None:
+                    self._name_index.add(contact)
+                self._set_interval(contact)
+            self._update_search(
+                added=[(contact_key(c), contact_tokens(c)) for c in contacts])
+        return ContacterResponse(write.data, write.error)
+
     def modify_contact(self, id: int, field: str,
                        value: str) -> ContacterResponse:
-        read = self._db_handler.read_contacts()
-        if read.error != 0:
-            return ContacterResponse(read.data, read.error)
+        write = self.modify_contacts({id: {field: value}})
+        return ContacterResponse(write.data[0] if write.data else None,
+                                 write.error)
 
-        for c in read.data:
-            if c["ID"] == id:
-                c[field] = value
-        write = self._db_handler.write_contacts(read.data)
+    def modify_contacts(self, changes: Dict[int, Dict[str, Any]]
+                        ) -> ContacterResponse:
+        """Change the fields of several contacts, by ID, in one write."""
+        self._drop_stale_indexes()
+        write = self._db_handler.modify_contacts(changes)
+        if write.error == SUCCESS:
+            for contact in write.data:
+                if self._name_index is not None:
+                    self._name_index.add(contact)
+                self._set_interval(contact)
+            self._update_search(
+                [contact_key(contact) for contact in write.data],
+                [(contact_key(c), contact_tokens(c)) for c in write.data])
         return ContacterResponse(write.data, write.error)
 
     def delete_contact(self, id: int) -> ContacterResponse:
-        read = self._db_handler.read_contacts()
-        if read.error != 0:
-            return ContacterResponse(read.data, read.error)
-
-        new_contacts = [x for x in read.data if not x["ID"] == id]
+        write = self.delete_contacts([id])
+        return ContacterResponse(write.data[0] if write.data else None,
+                                 write.error)
 
-        write = self._db_handler.write_contacts(new_contacts)
+    def delete_contacts(self, ids: Iterable[int]) -> ContacterResponse:
+        """Delete several contacts in one write and take them out of the
+        meetings they took part in."""
+        ids = set(ids)
+        self._drop_stale_indexes()
+        meeting_ids = None
+        if self._meeting_index is not None:
+            meeting_ids = self._meeting_index.with_participants(ids)
+        write = self._db_handler.delete_contacts(ids, meeting_ids)
+        if write.error != SUCCESS:
+            return ContacterResponse(write.data, write.error)
+        for id in ids:
+            if self._last_meetings is not None:
+                self._last_meetings.drop_contact(id)
+            if self._name_index is not None:
+                self._name_index.remove(id)
+            if self._due_index is not None:
+                self._due_index.drop_contact(id)
+            if self._graph is not None:
+                self._graph.drop_contact(id)
+        if self._meeting_index is not None:
+            self._meeting_index.drop_participants(ids)
+        # the columns hold the participants of every meeting
+        self._columns = None
+        self._update_search([contact_key(c) for c in write.data])
         return ContacterResponse(write.data, write.error)
 
+    def select_contacts(self, where: Mapping[str, str]) -> ContacterResponse:
+        """Return the contacts whose fields match all of where."""
+        contacts, error = self._db_handler.read_contacts()
+        return ContacterResponse(list(filter_contacts(contacts, where)),
+                                 error)
+
     def get_contacts(self) -> ContacterResponse:
         """Return the current contact list."""
         contacts, error = self._db_handler.read_contacts()
@@ -97,3 +320,201 @@ class Contacter:
         """Return the current meeting list."""
         meetings, error = self._db_handler.read_meetings()
         return ContacterResponse(meetings, error)
+
+    def get_contact(self, id: int) -> ContacterResponse:
+        """Return one contact, reading no further than needed."""
+        contact, error = self._db_handler.get_contact(id)
+        return ContacterResponse(contact, error)
+
+    def iter_contacts(self) -> ContacterResponse:
+        """Return an iterator over all contacts."""
+        contacts, error = self._db_handler.iter_contacts()
+        return ContacterResponse(contacts, error)
+
+    def iter_meetings(self,
+                      participants: Sequence[int] = (),
+                      date: str = "",
+                      loc: str = "",
+                      topics: Sequence[str] = (),
+                      since: str = "",
+                      until: str = ""
+                      ) -> ContacterResponse:
+        """Return an iterator over the meetings matching the filters."""
+        try:
+            date_filters = _date_filters(date, since, until)
+        except ValueError:
+            return ContacterResponse(iter(()), DATE_ERROR)
+        meetings, error = self._db_handler.iter_meetings()
+        day, first, last = date_filters
+        return ContacterResponse(
+            filter_meetings(meetings, participants, day, loc, topics,
+                            first, last),
+            error)
+
+    def find_meetings(self,
+                      participants: Sequence[int] = (),
+                      date: str = "",
+                      loc: str = "",
+                      topics: Sequence[str] = (),
+                      since: str = "",
+                      until: str = ""
+                      ) -> ContacterResponse:
+        """Return the meetings matching the filters, using the indexes.
+
+        Dates are YYYYMMDD strings, since and until are inclusive.
+        """
+        try:
+            day, first, last = _date_filters(date, since, until)
+        except ValueError:
+            return ContacterResponse([], DATE_ERROR)
+        self._drop_stale_indexes()
+        if self._meeting_index is None and self._db_handler.prunes_dates \
+                and (day or first or last):
+            # only read the partitions of the dates asked for
+            meetings, error = self._db_handler.iter_meetings_between(
+                date or since or None, date or until or None)
+            if error != SUCCESS:
+                return ContacterResponse([], error)
+            found = list(filter_meetings(meetings, participants, day, loc,
+                                         topics, first, last))
+            found.sort(key=lambda meeting: meeting["ID"])
+            return ContacterResponse(found, SUCCESS)
+        if self._meeting_index is None:
+            meetings, error = self._db_handler.read_meetings()
+            if error != SUCCESS:
+                return ContacterResponse([], error)
+            self._meeting_index = MeetingIndex(meetings)
+        return ContacterResponse(
+            self._meeting_index.find(participants, day, loc, topics,
+                                     first, last),
+            SUCCESS)
+
+    @property
+    def prunes_dates(self) -> bool:
+        """Whether date-filtered reads skip the meetings of other dates."""
+        return self._db_handler.prunes_dates
+
+    def get_last_meetings(self, since: str = "") -> ContacterResponse:
+        """Return the per-contact last meeting index.
+
+        With since, YYYYMMDD, a backend that can read meetings by date
+        may return an index of only the meetings since then, enough to
+        tell who was met recently. It is not kept.
+        """
+        self._drop_stale_indexes()
+        if self._last_meetings is None and since \
+                and self._db_handler.prunes_dates:
+            meetings, error = self._db_handler.iter_meetings_between(since)
+            if error != SUCCESS:
+                return ContacterResponse(None, error)
+            return ContacterResponse(LastMeetingIndex(
+                m for m in meetings if str(m.get("Date", "")) >= since),
+                SUCCESS)
+        if self._last_meetings is None:
+            meetings, error = self._db_handler.read_meetings()
+            if error != SUCCESS:
+                return ContacterResponse(None, error)
+            self._last_meetings = LastMeetingIndex(meetings)
+        return ContacterResponse(self._last_meetings, SUCCESS)
+
+    def overdue_contacts(self, cadence: "CadenceConfig", limit: int = 10,
+                         today: Optional[int] = None) -> ContacterResponse:
+        """Return the DueContacts most overdue by today's ordinal.
+
+        The due index is built once per cadence and then kept up to date
+        by the mutations, so repeated calls only touch limit entries.
+        """
+        if today is None:
+            today = datetime.today().toordinal()
+        self._drop_stale_indexes()
+        if self._due_index is None or cadence != self._cadence:
+            last_meetings = self.get_last_meetings()
+            if last_meetings.error != SUCCESS:
+                return ContacterResponse([], last_meetings.error)
+            contacts, error = self._db_handler.iter_contacts()
+            if error != SUCCESS:
+                return ContacterResponse([], error)
+            intervals = {c["ID"]: cadence.interval_for(c) for c in contacts}
+            self._due_index = DueIndex(last_meetings.data, intervals)
+            self._cadence = cadence
+        return ContacterResponse(
+            self._due_index.most_overdue(limit, today), SUCCESS)
+
+    def get_graph(self) -> ContacterResponse:
+        """Return the co-participation graph, built on first use."""
+        self._drop_stale_indexes()
+        if self._graph is None:
+            meetings, error = self._db_handler.iter_meetings()
+            if error != SUCCESS:
+                return ContacterResponse(None, error)
+            self._graph = ContactGraph(meetings)
+        return ContacterResponse(self._graph, SUCCESS)
+
+    def meeting_stats(self, months: int = 6,
+                      today: Optional[int] = None) -> ContacterResponse:
+        """Return the StatsReport of all meetings.
+
+        The meetings are loaded into columns once and then kept up to
+        date by add_meetings. Raises ImportError without NumPy.
+        """
+        if today is None:
+            today = datetime.today().toordinal()
+        self._drop_stale_indexes()
+        if self._columns is None:
+            meetings, error = self._db_handler.iter_meetings()
+            if error != SUCCESS:
+                return ContacterResponse(None, error)
+            self._columns = MeetingColumns(meetings)
+        return ContacterResponse(
+            compute_stats(self._columns, today, months), SUCCESS)
+
+    def find_contacts(self, name: str, limit: int = 5) -> ContacterResponse:
+        """Return the contacts whose names are closest to name."""
+        self._drop_stale_indexes()
+        if self._name_index is None:
+            contacts, error = self._db_handler.iter_contacts()
+            if error != SUCCESS:
+                return ContacterResponse([], error)
+            self._name_index = NameIndex(contacts)
+        return ContacterResponse(self._name_index.find(name, limit), SUCCESS)
+
+    def rebuild_search_index(self) -> ContacterResponse:
+        """Index all contacts and meetings for search from scratch."""
+        contacts, error = self._db_handler.iter_contacts()
+        if error != SUCCESS:
+            return ContacterResponse(None, error)
+        meetings, error = self._db_handler.iter_meetings()
+        if error != SUCCESS:
+            return ContacterResponse(None, error)
+        try:
+            self._search.rebuild(contacts, meetings)
+        except sqlite3.Error:
+            return ContacterResponse(None, DB_WRITE_ERROR)
+        return ContacterResponse(self._search.path, SUCCESS)
+
+    def search(self, query: str, limit: int = 20) -> ContacterResponse:
+        """Return (hit, record) pairs ranked by relevance."""
+        if not self._search.exists():
+            rebuild = self.rebuild_search_index()
+            if rebuild.error != SUCCESS:
+                return ContacterResponse([], rebuild.error)
+        try:
+            hits = self._search.search(query, limit)
+        except sqlite3.Error:
+            return ContacterResponse([], DB_READ_ERROR)
+        wanted = {kind: {hit.id for hit in hits if hit.kind == kind}
+                  for kind in ("contact", "meeting")}
+        records = {}
+        # only the hits are looked up, not the whole database read
+        for kind, get in (("contact", self._db_handler.get_contacts_by_id),
+                          ("meeting", self._db_handler.get_meetings_by_id)):
+            if not wanted[kind]:
+                continue
+            found, error = get(wanted[kind])
+            if error != SUCCESS:
+                return ContacterResponse([], error)
+            for record in found:
+                records[kind, record["ID"]] = record
+        results = [(hit, records[hit.kind, hit.id]) for hit in hits
+                   if (hit.kind, hit.id) in records]
+        return ContacterResponse(results, SUCCESS)
@@ -0,0 +1,199 @@
+"""This module provides the PCRMC compact contact and meeting records"""
+# pcrmc/records.py
+
+import sys
+from array import array
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+# Participant IDs as C ints instead of a list of int objects.
+PARTICIPANT_TYPECODE = "i"
+
+
+def _interned(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _participants(value: Any) -> Any:
+    try:
+        return array(PARTICIPANT_TYPECODE, value)
+    except (TypeError, OverflowError):
+        # not plain small integers, keep whatever the file holds
+        return list(value)
+
+
+def _topics(value: Any) -> Any:
+    if not isinstance(value, (list, tuple)):
+        return value
+    return tuple(map(_interned, value)) if value else ()
+
+
+def _extra(fields: Dict[str, Any],
+           known: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    return {k: v for k, v in fields.items() if k not in known} or None
+
+
+_new = object.__new__
+_intern = sys.intern
+
+
+class Record(MutableMapping):
+    """A record with fixed slots that still reads and writes like the
+    dict of the JSON schema, so callers keep using record["Name"].
+
+    FIELDS maps JSON keys to slots, in the order they are written.
+    Unknown keys go to a dict of extras that only exists if needed.
+    CONVERT turns incoming values into their compact form. A slot set
+    to None is a missing key.
+    """
+
+    __slots__ = ("extra",)
+    FIELDS: Dict[str, str] = {}
+    CONVERT: Dict[str, Any] = {}
+
+    def __init__(self, fields: Any = (), **kwargs: Any) -> None:
+        self.extra: Optional[Dict[str, Any]] = None
+        for slot in self.FIELDS.values():
+            setattr(self, slot, None)
+        self.update(fields, **kwargs)
+
+    @classmethod
+    def from_json(cls, fields: Dict[str, Any]) -> "Record":
+        """Build a record from a parsed JSON object."""
+        return fields if isinstance(fields, cls) else cls(fields)
+
+    def __getitem__(self, key: str) -> Any:
+        slot = self.FIELDS.get(key)
+        if slot is not None:
+            value = getattr(self, slot)
+            if value is not None:
+                return value
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        slot = self.FIELDS.get(key)
+        if slot is None:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            return
+        convert = self.CONVERT.get(key)
+        setattr(self, slot, value if convert is None else convert(value))
+
+    def __delitem__(self, key: str) -> None:
+        slot = self.FIELDS.get(key)
+        if slot is not None and getattr(self, slot) is not None:
+            setattr(self, slot, None)
+        elif self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key, slot in self.FIELDS.items():
+            if getattr(self, slot) is not None:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key: object) -> bool:
+        slot = self.FIELDS.get(key)  # type: ignore
+        if slot is not None:
+            return getattr(self, slot) is not None
+        return self.extra is not None and key in self.extra
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Record):
+            return self.to_json() == other.to_json()
+        if isinstance(other, dict):
+            return self.to_json() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_json()!r})"
+
+    def to_json(self) -> Dict[str, Any]:
+        """Return the record as a dict of the JSON schema."""
+        document = {}
+        for key in self:
+            value = self[key]
+            if isinstance(value, (array, tuple)):
+                value = list(value)
+            document[key] = value
+        return document
+
+
+class Contact(Record):
+    __slots__ = ("id", "name", "country", "industry")
+    FIELDS = {"Name": "name", "Country": "country", "Industry": "industry",
+              "ID": "id"}
+    CONVERT = {"Country": _interned, "Industry": _interned}
+
+    @classmethod
+    def from_json(cls, fields: Dict[str, Any]) -> "Contact":
+        # spelled out, this runs for every record of a loaded database
+        if type(fields) is Contact:
+            return fields
+        contact = _new(Contact)
+        get = fields.get
+        contact.id = get("ID")
+        contact.name = get("Name")
+        value = get("Country")
+        contact.country = _intern(value) if type(value) is str else value
+        value = get("Industry")
+        contact.industry = _intern(value) if type(value) is str else value
+        # more keys than known values set means there are extra keys
+        known = (contact.id is not None) + (contact.name is not None) \
+            + (contact.country is not None) + (contact.industry is not None)
+        contact.extra = _extra(fields, Contact.FIELDS) \
+            if len(fields) > known else None
+        return contact
+
+
+class Meeting(Record):
+    __slots__ = ("id", "participants", "date", "loc", "topics")
+    FIELDS = {"ID": "id", "Participants": "participants", "Date": "date",
+              "Loc": "loc", "Topics": "topics"}
+    CONVERT = {"Participants": _participants, "Date": _interned,
+               "Loc": _interned, "Topics": _topics}
+
+    @classmethod
+    def from_json(cls, fields: Dict[str, Any]) -> "Meeting":
+        if type(fields) is Meeting:
+            return fields
+        meeting = _new(Meeting)
+        get = fields.get
+        meeting.id = get("ID")
+        value = get("Participants")
+        meeting.participants = None if value is None \
+            else _participants(value)
+        value = get("Date")
+        meeting.date = _intern(value) if type(value) is str else value
+        value = get("Loc")
+        meeting.loc = _intern(value) if type(value) is str else value
+        value = get("Topics")
+        meeting.topics = () if value == [] else _topics(value)
+        known = (meeting.id is not None) \
+            + (meeting.participants is not None) \
+            + (meeting.date is not None) + (meeting.loc is not None) \
+            + (meeting.topics is not None)
+        meeting.extra = _extra(fields, Meeting.FIELDS) \
+            if len(fields) > known else None
+        return meeting
+
+
+RECORDS = {"Contacts": Contact, "Meetings": Meeting}
+
+
+def to_json(value: Any) -> Any:
+    """json.dumps default= hook for records and participant arrays."""
+    if isinstance(value, Record):
+        return value.to_json()
+    if isinstance(value, array):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
@@ -0,0 +1,230 @@
+"""This module provides the PCRMC full-text search index"""
+# pcrmc/search.py
+
+import heapq
+import math
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (token, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc, token);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Highest code point, every token starting with a prefix sorts below
+# prefix + PREFIX_END.
+PREFIX_END = "\U0010ffff"
+# A prefix match counts half as much as an exact token match.
+PREFIX_WEIGHT = 0.5
+# Up to this many candidates, later terms are looked up per document.
+CANDIDATE_LOOKUP_LIMIT = 2000
+IN_CHUNK = 500
+
+_WORD = re.compile(r"\w+")
+
+
+class SearchHit(NamedTuple):
+    kind: str
+    id: int
+    score: float
+
+
+def search_path(db_path: Path) -> Path:
+    """Return the path of the search index belonging to a database."""
+    return db_path.with_name(db_path.name + ".search")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.casefold())
+
+
+def contact_key(contact: Dict[str, Any]) -> str:
+    return f"contact:{contact['ID']}"
+
+
+def meeting_key(meeting: Dict[str, Any]) -> str:
+    return f"meeting:{meeting['ID']}"
+
+
+def contact_tokens(contact: Dict[str, Any]) -> List[str]:
+    fields = (contact.get("Name"), contact.get("Country"),
+              contact.get("Industry"))
+    return tokenize(" ".join(str(f) for f in fields if f))
+
+
+def meeting_tokens(meeting: Dict[str, Any]) -> List[str]:
+    fields = [meeting.get("Loc") or ""] + list(meeting.get("Topics") or [])
+    return tokenize(" ".join(str(f) for f in fields))
+
+
+class SearchIndex:
+    """Tokenized inverted index over contacts and meeting topics.
+
+    The postings live in a SQLite file next to the database, so a query
+    only reads the postings of its own terms and every mutation updates
+    the index in place instead of rebuilding it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(str(self.path))
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def rebuild(self, contacts: Iterable[Dict[str, Any]],
+                meetings: Iterable[Dict[str, Any]]) -> None:
+        """Index all contacts and meetings from scratch."""
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM postings")
+            connection.execute("DELETE FROM tokens")
+            connection.execute("DELETE FROM meta")
+            self._add(connection, (
+                (contact_key(c), contact_tokens(c)) for c in contacts))
+            self._add(connection, (
+                (meeting_key(m), meeting_tokens(m)) for m in meetings))
+
+    def update(self, removed: Iterable[str] = (),
+               added: Iterable[Tuple[str, List[str]]] = ()) -> None:
+        """Remove and (re)add documents in one transaction."""
+        connection = self._connect()
+        with connection:
+            self._remove(connection, removed)
+            self._add(connection, added)
+
+    def _documents(self, connection: sqlite3.Connection) -> int:
+        row = connection.execute(
+            "SELECT value FROM meta WHERE key = 'documents'").fetchone()
+        return row[0] if row else 0
+
+    def _set_documents(self, connection: sqlite3.Connection,
+                       count: int) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value)"
+            " VALUES ('documents', ?)", (count,))
+
+    def _add(self, connection: sqlite3.Connection,
+             documents: Iterable[Tuple[str, List[str]]]) -> None:
+        count = self._documents(connection)
+        for doc, tokens in documents:
+            counts = Counter(tokens)
+            connection.executemany(
+                "INSERT OR REPLACE INTO postings (token, doc, tf)"
+                " VALUES (?, ?, ?)",
+                [(token, doc, tf) for token, tf in counts.items()])
+            connection.executemany(
+                "INSERT INTO tokens (token, df) VALUES (?, 1)"
+                " ON CONFLICT (token) DO UPDATE SET df = df + 1",
+                [(token,) for token in counts])
+            count += 1
+        self._set_documents(connection, count)
+
+    def _remove(self, connection: sqlite3.Connection,
+                docs: Iterable[str]) -> None:
+        count = self._documents(connection)
+        for doc in docs:
+            tokens = [token for token, in connection.execute(
+                "SELECT token FROM postings WHERE doc = ?", (doc,))]
+            if not tokens:
+                continue
+            connection.execute("DELETE FROM postings WHERE doc = ?", (doc,))
+            connection.executemany(
+                "UPDATE tokens SET df = df - 1 WHERE token = ?",
+                [(token,) for token in tokens])
+            count -= 1
+        connection.execute("DELETE FROM tokens WHERE df <= 0")
+        self._set_documents(connection, count)
+
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        """Return the best documents matching every query term.
+
+        Each term matches tokens equal to it or starting with it. Scores
+        add up tf-idf over the terms, prefix matches weigh less.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.exists():
+            return []
+        connection = self._connect()
+        documents = self._documents(connection)
+
+        plans = []
+        for term in terms:
+            rows = connection.execute(
+                "SELECT token, df FROM tokens WHERE token >= ? AND token < ?",
+                (term, term + PREFIX_END)).fetchall()
+            if not rows:
+                return []
+            weights = {
+                token: math.log(1 + documents / df)
+                * (1.0 if token == term else PREFIX_WEIGHT)
+                for token, df in rows}
+            plans.append((sum(df for _, df in rows), term, weights))
+        # rarest term first, it bounds the candidate set
+        plans.sort()
+
+        scores: Optional[Dict[str, float]] = None
+        for _, term, weights in plans:
+            term_scores: Dict[str, float] = {}
+            for doc, token, tf in self._postings(connection, term, scores):
+                score = weights[token] * tf
+                if score > term_scores.get(doc, 0.0):
+                    term_scores[doc] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: score + term_scores[doc]
+                          for doc, score in scores.items()
+                          if doc in term_scores}
+            if not scores:
+                return []
+
+        best = heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        hits = []
+        for doc, score in best:
+            kind, id = doc.split(":")
+            hits.append(SearchHit(kind, int(id), score))
+        return hits
+
+    def _postings(self, connection: sqlite3.Connection, term: str,
+                  candidates: Optional[Dict[str, float]]
+                  ) -> Iterable[Tuple[str, str, int]]:
+        bounds = (term, term + PREFIX_END)
+        if candidates is None or len(candidates) > CANDIDATE_LOOKUP_LIMIT:
+            return connection.execute(
+                "SELECT doc, token, tf FROM postings"
+                " WHERE token >= ? AND token < ?", bounds)
+        rows: List[Tuple[str, str, int]] = []
+        docs = list(candidates)
+        for start in range(0, len(docs), IN_CHUNK):
+            chunk = docs[start:start + IN_CHUNK]
+            rows += connection.execute(
+                f"SELECT doc, token, tf FROM postings"
+                f" WHERE doc IN ({', '.join('?' * len(chunk))})"
+                f" AND token >= ? AND token < ?", (*chunk, *bounds))
+        return rows
@@ -0,0 +1,527 @@
+"""This module provides the PCRMC SQLite storage backend"""
+# pcrmc/sqlite_database.py
+
+import json
+import sqlite3
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import (Any, Callable, Collection, ContextManager, Dict,
+                    Iterable, Iterator, List, Optional, Tuple)
+from pcrmc import DB_READ_ERROR, DB_WRITE_ERROR, ID_ERROR, SUCCESS
+from pcrmc.database import DatabaseHandler, DBResponse
+from pcrmc.records import Contact, Meeting
+from pcrmc.search import search_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    country TEXT NOT NULL DEFAULT '',
+    industry TEXT NOT NULL DEFAULT '',
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_name ON contacts (name);
+CREATE INDEX IF NOT EXISTS contacts_country ON contacts (country);
+CREATE INDEX IF NOT EXISTS contacts_industry ON contacts (industry);
+
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL DEFAULT '',
+    loc TEXT NOT NULL DEFAULT '',
+    topics TEXT NOT NULL DEFAULT '[]',
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS meetings_date ON meetings (date);
+CREATE INDEX IF NOT EXISTS meetings_loc ON meetings (loc);
+
+CREATE TABLE IF NOT EXISTS meeting_participants (
+    meeting_id INTEGER NOT NULL REFERENCES meetings (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    contact_id INTEGER NOT NULL,
+    PRIMARY KEY (meeting_id, position)
+);
+CREATE INDEX IF NOT EXISTS meeting_participants_contact
+    ON meeting_participants (contact_id, meeting_id);
+
+CREATE TABLE IF NOT EXISTS id_counters (
+    name TEXT PRIMARY KEY,
+    next INTEGER NOT NULL
+);
+"""
+
+CONTACT_COLUMNS = ("Name", "Country", "Industry")
+MEETING_COLUMNS = ("Date", "Loc", "Topics")
+
+
+def init_sqlite_database(db_path: Path) -> int:
+    """Create an empty SQLite pcrmc database."""
+    try:
+        for stale in (db_path, search_path(db_path)):
+            if stale.exists():
+                stale.unlink()
+        connection = sqlite3.connect(str(db_path))
+        with connection:
+            connection.executescript(SCHEMA)
+        connection.close()
+        return SUCCESS
+    except (OSError, sqlite3.Error):
+        return DB_WRITE_ERROR
+
+
+def _extra(record: Dict[str, Any], columns: Tuple[str, ...]) -> Optional[str]:
+    """Serialize the fields that have no column of their own."""
+    extra = {k: v for k, v in record.items()
+             if k != "ID" and k != "Participants" and k not in columns}
+    return json.dumps(extra) if extra else None
+
+
+def _contact_row(contact: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        contact.get("ID"),
+        contact.get("Name", ""),
+        contact.get("Country", ""),
+        contact.get("Industry", ""),
+        _extra(contact, CONTACT_COLUMNS),
+    )
+
+
+def _meeting_row(meeting: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        meeting.get("ID"),
+        meeting.get("Date", ""),
+        meeting.get("Loc", ""),
+        json.dumps(meeting.get("Topics", [])),
+        _extra(meeting, MEETING_COLUMNS),
+    )
+
+
+def _row_contact(row: Tuple[Any, ...]) -> Contact:
+    id, name, country, industry, extra = row
+    contact = {"Name": name, "Country": country, "Industry": industry}
+    if extra:
+        contact.update(json.loads(extra))
+    contact["ID"] = id
+    return Contact.from_json(contact)
+
+
+def _row_meeting(row: Tuple[Any, ...],
+                 participants: List[int]) -> Meeting:
+    id, date, loc, topics, extra = row
+    meeting = {
+        "ID": id,
+        "Participants": participants,
+        "Date": date, "Loc": loc,
+        "Topics": json.loads(topics)
+        }
+    if extra:
+        meeting.update(json.loads(extra))
+    return Meeting.from_json(meeting)
+
+
+def _merge_meetings(
+        rows: Iterable[Tuple[Any, ...]],
+        participant_rows: Iterable[Tuple[int, int]]
+) -> Iterator[Dict[str, Any]]:
+    """Join two cursors ordered by meeting ID without buffering either."""
+    participant_rows = iter(participant_rows)
+    pending = next(participant_rows, None)
+    for row in rows:
+        participants = []
+        while pending is not None and pending[0] <= row[0]:
+            if pending[0] == row[0]:
+                participants.append(pending[1])
+            pending = next(participant_rows, None)
+        yield _row_meeting(row, participants)
+
+
+class SQLiteDatabaseHandler(DatabaseHandler):
+    """DatabaseHandler storing contacts and meetings in SQLite tables."""
+
+    def __init__(self, db_path: Path) -> None:
+        super().__init__(db_path)
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @contextmanager
+    def transaction(self) -> Iterator["DatabaseHandler"]:
+        """Group mutations into one SQLite transaction.
+
+        SQLite does the locking, the write lock is taken right away.
+        """
+        if self._transactions:
+            self._transactions += 1
+            try:
+                yield self
+            finally:
+                self._transactions -= 1
+            return
+        try:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as error:
+            raise OSError(f"cannot start a transaction: {error}") from error
+        self._transactions = 1
+        try:
+            yield self
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            self._transactions = 0
+        try:
+            connection.commit()
+        except sqlite3.Error as error:
+            connection.rollback()
+            raise OSError(f"cannot commit: {error}") from error
+
+    def _writing(self, connection: sqlite3.Connection
+                 ) -> ContextManager[Any]:
+        """Commit a mutation, unless it is part of a transaction."""
+        return nullcontext() if self._transactions else connection
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(str(self._db_path))
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            # databases created before a schema change get the new tables
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def outside_version(self) -> int:
+        # SQLite counts the commits of other connections itself
+        version, = self._connect().execute(
+            "PRAGMA data_version").fetchone()
+        return version
+
+    def _reserve_block(self, connection: sqlite3.Connection, table: str,
+                       count: int) -> int:
+        """Reserve IDs in the caller's transaction, return the first one."""
+        self._sync_counter(connection, table)
+        connection.execute(
+            "UPDATE id_counters SET next = next + ? WHERE name = ?",
+            (count, table))
+        next_id, = connection.execute(
+            "SELECT next FROM id_counters WHERE name = ?", (table,)).fetchone()
+        return next_id - count
+
+    def _sync_counter(self, connection: sqlite3.Connection,
+                      table: str) -> None:
+        """Move a table's ID counter past the highest stored ID."""
+        connection.execute(
+            f"INSERT OR IGNORE INTO id_counters (name, next)"
+            f" SELECT ?, COALESCE(MAX(id) + 1, 0) FROM {table}", (table,))
+        connection.execute(
+            f"UPDATE id_counters SET next = MAX(next,"
+            f" (SELECT COALESCE(MAX(id) + 1, 0) FROM {table}))"
+            f" WHERE name = ?", (table,))
+
+    def _reserve(self, table: str, count: int) -> DBResponse:
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                start = self._reserve_block(connection, table, count)
+            return DBResponse(range(start, start + count), SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(range(0), DB_WRITE_ERROR)
+
+    def _get_many(self, get: Callable[[int], DBResponse],
+                  ids: Collection[int]) -> DBResponse:
+        """Look records up one indexed query each, leaving out IDs that
+        do not exist."""
+        found = []
+        for id in set(ids):
+            record, error = get(id)
+            if error == SUCCESS:
+                found.append(record)
+            elif error != ID_ERROR:
+                return DBResponse([], error)
+        return DBResponse(found, SUCCESS)
+
+    def reserve_contact_ids(self, count: int) -> DBResponse:
+        return self._reserve("contacts", count)
+
+    def reserve_meeting_ids(self, count: int) -> DBResponse:
+        return self._reserve("meetings", count)
+
+    def read_contacts(self) -> DBResponse:
+        try:
+            rows = self._connect().execute(
+                "SELECT id, name, country, industry, extra"
+                " FROM contacts ORDER BY id")
+            return DBResponse([_row_contact(r) for r in rows], SUCCESS)
+        except sqlite3.Error:
+            return DBResponse([], DB_READ_ERROR)
+
+    def write_contacts(self, contact_list: List[Dict[str, Any]]) -> DBResponse:
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                connection.execute("DELETE FROM contacts")
+                connection.executemany(
+                    "INSERT INTO contacts (id, name, country, industry, extra)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [_contact_row(c) for c in contact_list])
+                self._sync_counter(connection, "contacts")
+            self.write_count += 1
+            return DBResponse(contact_list, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(contact_list, DB_WRITE_ERROR)
+
+    def get_contact(self, id: int) -> DBResponse:
+        try:
+            row = self._connect().execute(
+                "SELECT id, name, country, industry, extra"
+                " FROM contacts WHERE id = ?", (id,)).fetchone()
+        except sqlite3.Error:
+            return DBResponse(None, DB_READ_ERROR)
+        if row is None:
+            return DBResponse(None, ID_ERROR)
+        return DBResponse(_row_contact(row), SUCCESS)
+
+    def get_contacts_by_id(self, ids: Collection[int]) -> DBResponse:
+        return self._get_many(self.get_contact, ids)
+
+    def add_contact(self, contact: Dict[str, Any]) -> DBResponse:
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                connection.execute(
+                    "INSERT INTO contacts (id, name, country, industry, extra)"
+                    " VALUES (?, ?, ?, ?, ?)", _contact_row(contact))
+                self._sync_counter(connection, "contacts")
+            self.write_count += 1
+            return DBResponse(contact, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(contact, DB_WRITE_ERROR)
+
+    def add_contacts(self, contacts: List[Dict[str, Any]],
+                     keep_ids: bool = False) -> DBResponse:
+        insert = ("INSERT INTO contacts (id, name, country, industry, extra)"
+                  " VALUES (?, ?, ?, ?, ?)")
+        fresh = [c for c in contacts if not keep_ids or "ID" not in c]
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                if len(fresh) < len(contacts):
+                    # stored first, so the reserved block lies above them
+                    connection.executemany(insert, [
+                        _contact_row(c) for c in contacts if "ID" in c])
+                start = self._reserve_block(
+                    connection, "contacts", len(fresh))
+                for id, contact in enumerate(fresh, start):
+                    contact["ID"] = id
+                connection.executemany(
+                    insert, [_contact_row(c) for c in fresh])
+            self.write_count += 1
+            return DBResponse(contacts, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(contacts, DB_WRITE_ERROR)
+
+    def modify_contact(self, id: int, fields: Dict[str, Any]) -> DBResponse:
+        current = self.get_contact(id)
+        if current.error != SUCCESS:
+            return current
+        contact = current.data
+        contact.update(fields)
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                connection.execute(
+                    "UPDATE contacts SET id = ?, name = ?, country = ?,"
+                    " industry = ?, extra = ? WHERE id = ?",
+                    _contact_row(contact) + (id,))
+            self.write_count += 1
+            return DBResponse(contact, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(contact, DB_WRITE_ERROR)
+
+    def delete_contact(self, id: int) -> DBResponse:
+        current = self.get_contact(id)
+        if current.error != SUCCESS:
+            return current
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                connection.execute("DELETE FROM contacts WHERE id = ?", (id,))
+            self.write_count += 1
+            return DBResponse(current.data, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(current.data, DB_WRITE_ERROR)
+
+    def modify_contacts(self,
+                        changes: Dict[int, Dict[str, Any]]) -> DBResponse:
+        contacts = []
+        for id, fields in changes.items():
+            current = self.get_contact(id)
+            if current.error != SUCCESS:
+                return DBResponse([], current.error)
+            current.data.update(fields)
+            contacts.append(current.data)
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                connection.executemany(
+                    "UPDATE contacts SET id = ?, name = ?, country = ?,"
+                    " industry = ?, extra = ? WHERE id = ?",
+                    [_contact_row(contact) + (id,)
+                     for id, contact in zip(changes, contacts)])
+            self.write_count += 1
+            return DBResponse(contacts, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(contacts, DB_WRITE_ERROR)
+
+    def delete_contacts(self, ids: Collection[int],
+                        meeting_ids: Optional[Collection[int]] = None
+                        ) -> DBResponse:
+        # meeting_participants_contact is the participant index here
+        ids = set(ids)
+        contacts = []
+        for id in ids:
+            current = self.get_contact(id)
+            if current.error != SUCCESS:
+                return DBResponse([], current.error)
+            contacts.append(current.data)
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                connection.executemany(
+                    "DELETE FROM meeting_participants WHERE contact_id = ?",
+                    [(id,) for id in ids])
+                connection.executemany("DELETE FROM contacts WHERE id = ?",
+                                       [(id,) for id in ids])
+            self.write_count += 1
+            return DBResponse(contacts, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(contacts, DB_WRITE_ERROR)
+
+    def read_meetings(self) -> DBResponse:
+        meetings, error = self.iter_meetings()
+        try:
+            return DBResponse(list(meetings), error)
+        except sqlite3.Error:
+            return DBResponse([], DB_READ_ERROR)
+
+    def iter_contacts(self) -> DBResponse:
+        try:
+            rows = self._connect().execute(
+                "SELECT id, name, country, industry, extra"
+                " FROM contacts ORDER BY id")
+            return DBResponse(map(_row_contact, rows), SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(iter(()), DB_READ_ERROR)
+
+    def iter_meetings(self) -> DBResponse:
+        try:
+            connection = self._connect()
+            rows = connection.execute(
+                "SELECT id, date, loc, topics, extra"
+                " FROM meetings ORDER BY id")
+            participant_rows = connection.execute(
+                "SELECT meeting_id, contact_id FROM meeting_participants"
+                " ORDER BY meeting_id, position")
+            return DBResponse(_merge_meetings(rows, participant_rows),
+                              SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(iter(()), DB_READ_ERROR)
+
+    def write_meetings(self, meeting_list: List[Dict[str, Any]]) -> DBResponse:
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                connection.execute("DELETE FROM meeting_participants")
+                connection.execute("DELETE FROM meetings")
+                for meeting in meeting_list:
+                    self._insert_meeting(connection, meeting)
+                self._sync_counter(connection, "meetings")
+            self.write_count += 1
+            return DBResponse(meeting_list, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(meeting_list, DB_WRITE_ERROR)
+
+    def get_meeting(self, id: int) -> DBResponse:
+        try:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT id, date, loc, topics, extra"
+                " FROM meetings WHERE id = ?", (id,)).fetchone()
+            if row is None:
+                return DBResponse(None, ID_ERROR)
+            participants = [contact_id for contact_id, in connection.execute(
+                "SELECT contact_id FROM meeting_participants"
+                " WHERE meeting_id = ? ORDER BY position", (id,))]
+            return DBResponse(_row_meeting(row, participants), SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(None, DB_READ_ERROR)
+
+    def get_meetings_by_id(self, ids: Collection[int]) -> DBResponse:
+        return self._get_many(self.get_meeting, ids)
+
+    def add_meeting(self, meeting: Dict[str, Any]) -> DBResponse:
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                self._insert_meeting(connection, meeting)
+                self._sync_counter(connection, "meetings")
+            self.write_count += 1
+            return DBResponse(meeting, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(meeting, DB_WRITE_ERROR)
+
+    def add_meetings(self, meetings: List[Dict[str, Any]]) -> DBResponse:
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                start = self._reserve_block(
+                    connection, "meetings", len(meetings))
+                for id, meeting in enumerate(meetings, start):
+                    meeting["ID"] = id
+                    self._insert_meeting(connection, meeting)
+            self.write_count += 1
+            return DBResponse(meetings, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(meetings, DB_WRITE_ERROR)
+
+    def modify_meeting(self, id: int, fields: Dict[str, Any]) -> DBResponse:
+        current = self.get_meeting(id)
+        if current.error != SUCCESS:
+            return current
+        meeting = current.data
+        meeting.update(fields)
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                self._remove_meeting(connection, id)
+                self._insert_meeting(connection, meeting)
+            self.write_count += 1
+            return DBResponse(meeting, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(meeting, DB_WRITE_ERROR)
+
+    def delete_meeting(self, id: int) -> DBResponse:
+        current = self.get_meeting(id)
+        if current.error != SUCCESS:
+            return current
+        try:
+            connection = self._connect()
+            with self._writing(connection):
+                self._remove_meeting(connection, id)
+            self.write_count += 1
+            return DBResponse(current.data, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(current.data, DB_WRITE_ERROR)
+
+    def _remove_meeting(self, connection: sqlite3.Connection,
+                        id: int) -> None:
+        connection.execute(
+            "DELETE FROM meeting_participants WHERE meeting_id = ?", (id,))
+        connection.execute("DELETE FROM meetings WHERE id = ?", (id,))
+
+    def _insert_meeting(self, connection: sqlite3.Connection,
+                        meeting: Dict[str, Any]) -> None:
+        cursor = connection.execute(
+            "INSERT INTO meetings (id, date, loc, topics, extra)"
+            " VALUES (?, ?, ?, ?, ?)", _meeting_row(meeting))
+        connection.executemany(
+            "INSERT INTO meeting_participants"
+            " (meeting_id, position, contact_id) VALUES (?, ?, ?)",
+            [(cursor.lastrowid, position, contact_id) for position, contact_id
+             in enumerate(meeting.get("Participants", []))])
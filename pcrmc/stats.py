@@ -0,0 +1,330 @@
+"""This module provides the PCRMC vectorized meeting statistics
+
+Only this module needs NumPy, and it is imported when statistics are
+computed, so the rest of pcrmc works without it.
+"""
+# pcrmc/stats.py
+
+from array import array
+from datetime import date
+from typing import (Any, Dict, Iterable, List, Mapping, NamedTuple, Optional,
+                    Tuple)
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+TOP = 5
+# Largest contacts x values table counted in one bincount.
+DENSE_LIMIT = 1 << 24
+
+
+def require_numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError(
+            "pcrmc stats needs NumPy, install it with: pip install numpy"
+        ) from error
+    return numpy
+
+
+def _code(codes: Dict[str, int], names: List[str], name: str) -> int:
+    code = codes.get(name)
+    if code is None:
+        code = codes[name] = len(names)
+        names.append(name)
+    return code
+
+
+class MeetingColumns:
+    """Meeting dates, locations, participants and topics as columns.
+
+    Meetings are appended to compact arrays, which are turned into NumPy
+    arrays in one go the next time the columns are read. Locations and
+    topics are stored as codes into the locations and topics lists.
+    """
+
+    def __init__(self, meetings: Iterable[Mapping[str, Any]] = ()) -> None:
+        self.locations: List[str] = []
+        self.topics: List[str] = []
+        self._location_codes: Dict[str, int] = {}
+        self._topic_codes: Dict[str, int] = {}
+        # YYYYMMDD as a number, 0 if the date is malformed
+        self._dates = array("i")
+        self._locs = array("i")
+        self._participants = array("i")
+        self._participant_counts = array("i")
+        self._topics = array("i")
+        self._topic_counts = array("i")
+        self._arrays: Dict[str, Any] = {}
+        for meeting in meetings:
+            self.add(meeting)
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def add(self, meeting: Mapping[str, Any]) -> None:
+        text = meeting.get("Date")
+        valid = type(text) is str and len(text) == 8 and text.isdigit()
+        self._dates.append(int(text) if valid else 0)
+        self._locs.append(_code(self._location_codes, self.locations,
+                                str(meeting.get("Loc") or "")))
+        participants = meeting.get("Participants") or ()
+        if len(set(participants)) < len(participants):
+            participants = list(dict.fromkeys(participants))
+        try:
+            self._participants.extend(participants)
+        except (TypeError, OverflowError):
+            participants = [p for p in participants
+                            if type(p) is int and 0 <= p < 1 << 31]
+            self._participants.extend(participants)
+        self._participant_counts.append(len(participants))
+        topics = meeting.get("Topics") or ()
+        for topic in topics:
+            self._topics.append(
+                _code(self._topic_codes, self.topics, str(topic)))
+        self._topic_counts.append(len(topics))
+        self._arrays = {}
+
+    def arrays(self) -> Dict[str, Any]:
+        """Return the columns as NumPy arrays.
+
+        Per meeting: day, days since 1970, valid, whether the date is a
+        real one, month, months since 1970, loc, the location code, and
+        where its rows start in the participant and topic columns.
+        participant_meeting holds the meeting of every participant row.
+        """
+        if self._arrays:
+            return self._arrays
+        numpy = require_numpy()
+        day, valid = _epoch_days(numpy, numpy.array(self._dates,
+                                                    dtype=numpy.int64))
+        participant_counts = numpy.array(self._participant_counts,
+                                         dtype=numpy.int64)
+        topic_counts = numpy.array(self._topic_counts, dtype=numpy.int64)
+        self._arrays = {
+            "day": day,
+            "valid": valid,
+            "month": day.astype("datetime64[D]").astype("datetime64[M]")
+            .astype(numpy.int64),
+            "loc": numpy.array(self._locs, dtype=numpy.int64),
+            "participant": numpy.array(self._participants,
+                                       dtype=numpy.int64),
+            "participant_meeting": numpy.repeat(
+                numpy.arange(len(day), dtype=numpy.int64),
+                participant_counts),
+            "topic": numpy.array(self._topics, dtype=numpy.int64),
+            "topic_start": numpy.cumsum(topic_counts) - topic_counts,
+            "topic_count": topic_counts,
+        }
+        return self._arrays
+
+
+def _epoch_days(numpy: Any, dates: Any) -> Tuple[Any, Any]:
+    """Turn YYYYMMDD numbers into days since 1970 and a validity mask."""
+    year, month, day = dates // 10000, dates // 100 % 100, dates % 100
+    valid = (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+    months = numpy.where(valid, (year - 1970) * 12 + month - 1, 0)
+    first = months.astype("datetime64[M]").astype("datetime64[D]") \
+        .astype(numpy.int64)
+    following = (months + 1).astype("datetime64[M]") \
+        .astype("datetime64[D]").astype(numpy.int64)
+    days = first + day - 1
+    # the 31st of a 30 day month would roll over into the next one
+    valid &= days < following
+    return numpy.where(valid, days, 0), valid
+
+
+class StatsReport(NamedTuple):
+    """Per-contact columns, one entry per contact met, plus a summary.
+
+    Gaps are in days and NaN for contacts met only once. recent and
+    previous count the meetings in the last months and the months
+    before. top_location and top_topic are codes, -1 for none.
+    """
+    ids: Any
+    meetings: Any
+    mean_gap: Any
+    median_gap: Any
+    last_day: Any
+    recent: Any
+    previous: Any
+    top_location: Any
+    top_topic: Any
+    locations: List[str]
+    topics: List[str]
+    summary: Dict[str, Any]
+
+    def ranking(self, sort: str = "meetings",
+                limit: Optional[int] = None) -> List[int]:
+        """Return the positions of the contacts ordered by sort.
+
+        meetings and trend list the largest first, gap the shortest mean
+        gap first, contacts met only once last. Ties go by ID.
+        """
+        numpy = require_numpy()
+        if sort == "gap":
+            key = numpy.where(numpy.isnan(self.mean_gap), numpy.inf,
+                              self.mean_gap)
+        elif sort == "trend":
+            key = self.previous - self.recent
+        else:
+            key = -self.meetings
+        return numpy.lexsort((self.ids, key))[:limit].tolist()
+
+    def contact(self, position: int) -> Dict[str, Any]:
+        """Return the stats of the contact at position as plain values."""
+        def gap(value: float) -> Any:
+            return None if value != value else round(float(value), 1)
+
+        location = int(self.top_location[position])
+        topic = int(self.top_topic[position])
+        return {
+            "ID": int(self.ids[position]),
+            "Meetings": int(self.meetings[position]),
+            "MeanGap": gap(self.mean_gap[position]),
+            "MedianGap": gap(self.median_gap[position]),
+            "LastMeeting": _yyyymmdd(int(self.last_day[position])),
+            "Recent": int(self.recent[position]),
+            "Trend": int(self.recent[position] - self.previous[position]),
+            "TopLocation": self.locations[location] if location >= 0 else "",
+            "TopTopic": self.topics[topic] if topic >= 0 else "",
+        }
+
+
+def _yyyymmdd(epoch_day: int) -> str:
+    return date.fromordinal(epoch_day + EPOCH_ORDINAL).strftime("%Y%m%d")
+
+
+def _group_top(numpy: Any, group: Any, value: Any, groups: int,
+               values: int) -> Any:
+    """Return the most frequent value per group, -1 for empty groups.
+
+    Ties go to the smaller code, the value seen first.
+    """
+    top = numpy.full(groups, -1, dtype=numpy.int64)
+    if not len(group) or not values:
+        return top
+    if groups * values <= DENSE_LIMIT:
+        counts = numpy.bincount(group * values + value,
+                                minlength=groups * values)
+        counts = counts.reshape(groups, values)
+        return numpy.where(counts.any(axis=1), counts.argmax(axis=1), -1)
+    keys, counts = numpy.unique(group * values + value, return_counts=True)
+    key_group, key_value = keys // values, keys % values
+    starts = numpy.flatnonzero(
+        numpy.r_[True, key_group[1:] != key_group[:-1]])
+    best = numpy.maximum.reduceat(counts, starts)
+    hits = numpy.flatnonzero(
+        counts == numpy.repeat(best, numpy.diff(numpy.r_[starts,
+                                                         len(keys)])))
+    hit_group = key_group[hits]
+    first = hits[numpy.r_[True, hit_group[1:] != hit_group[:-1]]]
+    top[key_group[first]] = key_value[first]
+    return top
+
+
+def _top_names(numpy: Any, codes: Any, names: List[str]
+               ) -> List[Tuple[str, int]]:
+    counts = numpy.bincount(codes, minlength=len(names))
+    order = numpy.lexsort((numpy.arange(len(counts)), -counts))[:TOP]
+    return [(names[code], int(counts[code])) for code in order
+            if counts[code]]
+
+
+def compute_stats(columns: MeetingColumns, today: int,
+                  months: int = 6) -> StatsReport:
+    """Compute all statistics with vectorized group-by operations.
+
+    today is a date ordinal, the trend compares the last months calendar
+    months, this one included, with as many months before. Sorting is
+    done on single int64 keys, which is several times faster than
+    lexsort on a million meetings.
+    """
+    numpy = require_numpy()
+    arrays = columns.arrays()
+    day, valid, month = arrays["day"], arrays["valid"], arrays["month"]
+
+    # participation rows of meetings with a date
+    keep = valid[arrays["participant_meeting"]]
+    meeting = arrays["participant_meeting"][keep]
+    contact = arrays["participant"][keep]
+    # contact IDs are small counters, so a bincount finds them all
+    counts = numpy.bincount(contact)
+    ids = numpy.flatnonzero(counts)
+    counts = counts[ids]
+    contacts = len(ids)
+    code = numpy.zeros(ids[-1] + 1 if contacts else 0, dtype=numpy.int64)
+    code[ids] = numpy.arange(contacts)
+    group = code[contact]
+
+    # rows by contact, then date: gaps are the differences within a group
+    first_day = int(day[valid].min()) if contacts else 0
+    span = int(day[valid].max()) - first_day + 1 if contacts else 1
+    keys = numpy.sort(group * span + day[meeting] - first_day)
+    sorted_group, sorted_day = keys // span, keys % span
+    same = sorted_group[1:] == sorted_group[:-1]
+    gaps = numpy.diff(sorted_day)[same]
+    gap_group = sorted_group[1:][same]
+    gap_counts = numpy.bincount(gap_group, minlength=contacts)
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        mean_gap = numpy.bincount(gap_group, weights=gaps,
+                                  minlength=contacts) / gap_counts
+    sorted_gaps = numpy.sort(gap_group * span + gaps) % span
+    starts = numpy.cumsum(gap_counts) - gap_counts
+    median_gap = numpy.full(contacts, numpy.nan)
+    met_twice = gap_counts > 0
+    low = (starts + (gap_counts - 1) // 2)[met_twice]
+    high = (starts + gap_counts // 2)[met_twice]
+    median_gap[met_twice] = (sorted_gaps[low] + sorted_gaps[high]) / 2
+    last_day = sorted_day[numpy.cumsum(counts) - 1] + first_day
+
+    current = (date.fromordinal(today).year - 1970) * 12 \
+        + date.fromordinal(today).month - 1
+    age = current - month[meeting]
+    recent = numpy.bincount(group[(age >= 0) & (age < months)],
+                            minlength=contacts)
+    previous = numpy.bincount(
+        group[(age >= months) & (age < 2 * months)], minlength=contacts)
+
+    top_location = _group_top(numpy, group, arrays["loc"][meeting],
+                              contacts, len(columns.locations))
+    # pair every participation row with the topics of its meeting
+    topic_counts = arrays["topic_count"][meeting]
+    offsets = numpy.arange(topic_counts.sum()) \
+        - numpy.repeat(numpy.cumsum(topic_counts) - topic_counts,
+                       topic_counts)
+    topic_rows = numpy.repeat(arrays["topic_start"][meeting],
+                              topic_counts) + offsets
+    top_topic = _group_top(numpy, numpy.repeat(group, topic_counts),
+                           arrays["topic"][topic_rows], contacts,
+                           len(columns.topics))
+
+    valid_meetings = numpy.flatnonzero(valid)
+    meeting_age = current - month[valid_meetings]
+    in_window = (meeting_age >= 0) & (meeting_age < months)
+    monthly = numpy.bincount(meeting_age[in_window], minlength=months)
+    topic_valid = numpy.repeat(valid, arrays["topic_count"])
+    summary = {
+        "meetings": int(len(valid_meetings)),
+        "contacts": int(contacts),
+        "first": _yyyymmdd(int(day[valid_meetings].min()))
+        if len(valid_meetings) else None,
+        "last": _yyyymmdd(int(day[valid_meetings].max()))
+        if len(valid_meetings) else None,
+        # over every gap of every contact, not an average of averages
+        "mean_gap": round(float(gaps.mean()), 1) if len(gaps) else None,
+        "median_gap": float(numpy.median(gaps)) if len(gaps) else None,
+        "locations": _top_names(numpy, arrays["loc"][valid_meetings],
+                                columns.locations),
+        "topics": _top_names(numpy, arrays["topic"][topic_valid],
+                             columns.topics),
+        # oldest month first, as YYYYMM
+        "months": [(_yyyymm(current - age), int(monthly[age]))
+                   for age in range(months - 1, -1, -1)],
+    }
+    return StatsReport(ids, counts, mean_gap, median_gap, last_day, recent,
+                       previous, top_location, top_topic, columns.locations,
+                       columns.topics, summary)
+
+
+def _yyyymm(month: int) -> str:
+    return f"{1970 + month // 12}{month % 12 + 1:02}"
@@ -0,0 +1,147 @@
+"""This module provides the PCRMC incremental JSON database reader"""
+# pcrmc/stream.py
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, IO, Iterator, Optional
+from pcrmc.metrics import METRICS
+
+CHUNK_SIZE = 64 * 1024
+
+_SPACE = re.compile(r"[ \t\n\r]*")
+_SEPARATOR = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+class StreamReader:
+    """Reads one top-level array of a JSON database element by element.
+
+    Only a chunk of the file and the current element are in memory.
+    Top-level values in front of the array end up in header, arrays in
+    front of it are decoded one element at a time and dropped.
+    """
+
+    def __init__(self, path: Path, chunk_size: int = CHUNK_SIZE) -> None:
+        self.header: Dict[str, Any] = {}
+        self._file: Optional[IO[str]] = path.open(encoding="utf-8")
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+        self._started = False
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _fill(self) -> None:
+        """Drop the consumed part of the buffer and read another chunk."""
+        assert self._file is not None
+        with METRICS.timer("io"):
+            chunk = self._file.read(self._chunk_size)
+        METRICS.read(len(chunk))
+        self._eof = not chunk
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character, "" at the end."""
+        while True:
+            self._position = _SPACE.match(
+                self._buffer, self._position).end()
+            if self._position < len(self._buffer) or self._eof:
+                return self._buffer[self._position:self._position + 1]
+            self._fill()
+
+    def _expect(self, character: str) -> None:
+        if self._peek() != character:
+            raise json.JSONDecodeError(
+                f"Expecting {character!r}", self._buffer, self._position)
+        self._position += 1
+
+    def _value(self) -> Any:
+        if METRICS.enabled:
+            with METRICS.timer("parse"):
+                return self._decode()
+        return self._decode()
+
+    def _decode(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                self._fill()
+                continue
+            # a number cut by the chunk end still decodes, read on
+            if end == len(self._buffer) and not self._eof:
+                self._fill()
+                continue
+            self._position = end
+            return value
+
+    def _elements(self) -> Iterator[Any]:
+        """Yield the elements of the array at the current position."""
+        self._expect("[")
+        if self._peek() == "]":
+            self._position += 1
+            return
+        # the hot loop of every streaming read, hence the local names
+        decode, separator = _decoder.raw_decode, _SEPARATOR.match
+        timed = METRICS.enabled
+        buffer, position = self._buffer, self._position
+        while True:
+            try:
+                if timed:
+                    with METRICS.timer("parse"):
+                        value, end = decode(buffer, position)
+                else:
+                    value, end = decode(buffer, position)
+                # a complete element is followed by "," or "]"
+                match = separator(buffer, end)
+            except json.JSONDecodeError:
+                match = None
+            if match is None:
+                if self._eof:
+                    raise json.JSONDecodeError(
+                        "Unterminated array", buffer, position)
+                self._position = position
+                self._fill()
+                buffer = self._buffer
+                position = _SPACE.match(buffer, 0).end()
+                continue
+            yield value
+            position = match.end()
+            if match.group(1) == "]":
+                self._position = position
+                return
+
+    def seek(self, key: str) -> bool:
+        """Move to the array stored under key, return False if missing."""
+        if not self._started:
+            self._expect("{")
+            self._started = True
+        while self._peek() not in ("}", ""):
+            if self._peek() == ",":
+                self._position += 1
+            name = self._value()
+            self._expect(":")
+            if name == key:
+                return True
+            if self._peek() == "[":
+                for _ in self._elements():
+                    pass
+            else:
+                self.header[name] = self._value()
+        return False
+
+    def records(self) -> Iterator[Any]:
+        """Yield the elements of the array seek() moved to."""
+        try:
+            yield from self._elements()
+        finally:
+            self.close()
@@ -0,0 +1,103 @@
+"""This module provides the PCRMC table rendering of the list commands"""
+# pcrmc/table.py
+
+import heapq
+import json
+from array import array
+from itertools import islice
+from typing import (Any, Callable, Iterable, List, Optional, Sequence,
+                    TypeVar)
+import typer
+from pcrmc.records import to_json
+
+FORMATS = ("table", "plain", "json", "tsv")
+T = TypeVar("T")
+
+
+def cell(value: Any, list_separator: Optional[str] = None) -> str:
+    """Return a field as text, lists as [1, 2] or joined by list_separator."""
+    if isinstance(value, (list, tuple, array)):
+        if list_separator is None:
+            return str(list(value))
+        return list_separator.join(str(item) for item in value)
+    return "" if value is None else str(value)
+
+
+def page(records: Iterable[T], key: Optional[Callable[[T], Any]] = None,
+         reverse: bool = False, offset: int = 0,
+         limit: Optional[int] = None) -> List[T]:
+    """Return one page of records, sorted by key if one is given.
+
+    Without a key the records keep their order, reversed with reverse.
+    With a limit, sorting only keeps offset + limit records around.
+    """
+    end = None if limit is None else offset + limit
+    if key is None:
+        if reverse:
+            records = reversed(list(records))
+        return list(islice(records, offset, end))
+    if end is None:
+        return sorted(records, key=key, reverse=reverse)[offset:]
+    smallest = heapq.nlargest if reverse else heapq.nsmallest
+    return smallest(end, records, key=key)[offset:]
+
+
+def column_widths(titles: Sequence[str],
+                  rows: Iterable[Sequence[str]]) -> List[int]:
+    """Return the width of every column, in one pass over the rows."""
+    widths = [len(title) for title in titles]
+    for row in rows:
+        for column, cell in enumerate(row):
+            if len(cell) > widths[column]:
+                widths[column] = len(cell)
+    return widths
+
+
+def render_table(title: str, titles: Sequence[str],
+                 rows: Sequence[Sequence[str]],
+                 colors: Optional[Sequence[Optional[str]]] = None,
+                 styled: bool = True, decorated: bool = True) -> str:
+    """Render rows as aligned columns into a single string.
+
+    decorated adds the title and rules, styled the ANSI colors. Rows
+    without a color are blue.
+    """
+    widths = column_widths(titles, rows)
+
+    def line(cells: Sequence[str]) -> str:
+        return " | ".join(
+            cell.ljust(width) for cell, width in zip(cells, widths)).rstrip()
+
+    def style(text: str, color: Optional[str] = typer.colors.BLUE,
+              bold: bool = False) -> str:
+        return typer.style(text, fg=color, bold=bold) if styled else text
+
+    header = line(titles)
+    lines = []
+    if decorated:
+        lines += [style(f"\n{title}:\n", bold=True),
+                  style(header, bold=True), style("-" * len(header))]
+    else:
+        lines.append(header)
+    for position, row in enumerate(rows):
+        color = colors[position] if colors else None
+        lines.append(style(line(row), color or typer.colors.BLUE))
+    if decorated:
+        lines.append(style("-" * len(header) + "\n"))
+    return "\n".join(lines) + "\n"
+
+
+def render_tsv(titles: Sequence[str], rows: Iterable[Sequence[str]]) -> str:
+    """Render rows as tab separated values with a header line."""
+    lines = ["\t".join(titles)]
+    for row in rows:
+        # cells must not break the line or column structure
+        lines.append("\t".join(
+            " ".join(cell.split()) if "\t" in cell or "\n" in cell else cell
+            for cell in row))
+    return "\n".join(lines) + "\n"
+
+
+def render_json(records: Iterable[Any]) -> str:
+    """Render records as one JSON array."""
+    return json.dumps(list(records), indent=4, default=to_json) + "\n"
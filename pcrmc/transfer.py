@@ -0,0 +1,217 @@
+"""This module provides the PCRMC bulk import and export functionality"""
+# pcrmc/transfer.py
+
+import csv
+import json
+import sys
+import time
+from array import array
+from functools import partial
+from pathlib import Path
+from typing import (Any, Callable, Dict, IO, Iterable, Iterator, List,
+                    NamedTuple, Optional, Set, Tuple)
+from pcrmc import SUCCESS
+from pcrmc.pcrmc import Contacter, ContacterResponse, generateMeeting
+from pcrmc.records import to_json
+
+FORMATS = ("csv", "jsonl")
+KINDS = ("contacts", "meetings")
+LIST_SEPARATOR = ";"
+CSV_FIELDS = {
+    "contacts": ("ID", "Name", "Country", "Industry"),
+    "meetings": ("ID", "Participants", "Date", "Loc", "Topics"),
+}
+
+
+class ImportReport(NamedTuple):
+    imported: int
+    rejected: int
+    seconds: float
+    error: int
+
+
+class Rejected(NamedTuple):
+    line: int
+    reason: str
+
+
+def guess_format(file_name: str) -> str:
+    """Return the input format implied by a file name, jsonl by default."""
+    return "csv" if file_name.lower().endswith(".csv") else "jsonl"
+
+
+def open_input(file_name: str) -> IO[str]:
+    if file_name == "-":
+        return sys.stdin
+    return Path(file_name).open(newline="", encoding="utf-8")
+
+
+def read_rows(file: IO[str],
+              format: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """Yield (line number, row) pairs one at a time, None for bad lines."""
+    if format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _as_list(value: Any) -> List[Any]:
+    if isinstance(value, list):
+        return value
+    if not value:
+        return []
+    return [v.strip() for v in str(value).split(LIST_SEPARATOR) if v.strip()]
+
+
+def _contact_id(value: Any) -> int:
+    """Return a contact ID from a row, raise ValueError if it is none."""
+    if type(value) is int and value >= 0:
+        return value
+    if isinstance(value, str) and value.strip().isdecimal():
+        return int(value)
+    raise ValueError(f"{value!r} is no contact ID")
+
+
+def contact_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the contact of a row, keeping an exported ID so meetings
+    exported with it still refer to the right people."""
+    contact: Dict[str, Any] = {}
+    if row.get("ID") not in ("", None):
+        contact["ID"] = _contact_id(row["ID"])
+    contact.update({
+        "Name": str(row.get("Name") or "").strip(),
+        "Country": row.get("Country") or "",
+        "Industry": row.get("Industry") or ""
+        })
+    for key, value in row.items():
+        if not key or key in contact or key == "ID" or value in ("", None):
+            continue
+        contact[key] = value
+    return contact
+
+
+def meeting_from_row(row: Dict[str, Any]) -> ContacterResponse:
+    participants = [_contact_id(participant)
+                    for participant in _as_list(row.get("Participants"))]
+    return generateMeeting(
+        participants,
+        str(row.get("Date") or ""),
+        row.get("Loc") or "",
+        _as_list(row.get("Topics"))
+    )
+
+
+def _convert(kind: str, row: Optional[Dict[str, Any]],
+             contact_ids: Set[int]) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Turn a raw row into a record, or explain why it is rejected."""
+    if row is None:
+        return None, "unreadable line"
+    if kind == "contacts":
+        try:
+            contact = contact_from_row(row)
+        except (TypeError, ValueError) as error:
+            return None, f"invalid ID, {error}"
+        if not contact["Name"]:
+            return None, "missing Name"
+        if "ID" in contact:
+            if contact["ID"] in contact_ids:
+                return None, f"ID {contact['ID']} is taken"
+            contact_ids.add(contact["ID"])
+        return contact, ""
+    try:
+        meeting, error = meeting_from_row(row)
+    except (TypeError, ValueError) as error:
+        return None, f"participants must be contact IDs, {error}"
+    if error != SUCCESS:
+        return None, f"invalid Date {meeting['Date']!r}"
+    if not meeting["Participants"]:
+        return None, "missing Participants"
+    unknown = [p for p in meeting["Participants"] if p not in contact_ids]
+    if unknown:
+        return None, f"unknown participants {unknown}"
+    return meeting, ""
+
+
+def import_records(
+        contacter: Contacter,
+        rows: Iterable[Tuple[int, Optional[Dict[str, Any]]]],
+        kind: str,
+        batch_size: int = 1000,
+        on_batch: Callable[[int, float], None] = lambda done, seconds: None,
+        on_reject: Callable[[Rejected], None] = lambda rejected: None,
+) -> ImportReport:
+    """Validate rows and add them in batches, one write per batch.
+
+    Contacts keep the IDs of an export, rows whose ID is taken are
+    rejected, so meetings imported afterwards meet the right people.
+    """
+    started = time.perf_counter()
+    contacts, error = contacter.get_contacts()
+    if error != SUCCESS:
+        return ImportReport(0, 0, 0.0, error)
+    contact_ids: Set[int] = {c["ID"] for c in contacts}
+    add_batch = (partial(contacter.add_contacts, keep_ids=True)
+                 if kind == "contacts" else contacter.add_meetings)
+
+    imported = rejected = 0
+    batch: List[Dict[str, Any]] = []
+
+    def flush() -> int:
+        nonlocal imported, batch
+        error = add_batch(batch).error
+        if error == SUCCESS:
+            if kind == "contacts":
+                contact_ids.update(contact["ID"] for contact in batch)
+            imported += len(batch)
+            batch = []
+            on_batch(imported, time.perf_counter() - started)
+        return error
+
+    for line_number, row in rows:
+        record, reason = _convert(kind, row, contact_ids)
+        if record is None:
+            rejected += 1
+            on_reject(Rejected(line_number, reason))
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            error = flush()
+            if error != SUCCESS:
+                return ImportReport(imported, rejected,
+                                    time.perf_counter() - started, error)
+    error = flush() if batch else SUCCESS
+    return ImportReport(imported, rejected,
+                        time.perf_counter() - started, error)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (list, tuple, array)):
+        return LIST_SEPARATOR.join(str(v) for v in value)
+    return value
+
+
+def write_records(records: Iterable[Dict[str, Any]], file: IO[str],
+                  format: str, kind: str) -> int:
+    """Write records one at a time as CSV or JSONL, return the count."""
+    count = 0
+    if format == "csv":
+        writer = csv.DictWriter(file, CSV_FIELDS[kind], extrasaction="ignore",
+                                lineterminator="\n")
+        writer.writeheader()
+        for record in records:
+            writer.writerow({k: _csv_value(v) for k, v in record.items()})
+            count += 1
+        return count
+    for record in records:
+        file.write(json.dumps(record, default=to_json) + "\n")
+        count += 1
+    return count
@@ -0,0 +1,39 @@
+# tests/test_benchmarks.py
+
+from benchmarks import bench, formats
+from benchmarks.generate import generate_contacts, generate_meetings
+
+
+def test_generator_is_seeded():
+    assert list(generate_meetings(50, 10, seed=3)) \
+        == list(generate_meetings(50, 10, seed=3))
+    assert list(generate_contacts(50, seed=3)) \
+        != list(generate_contacts(50, seed=4))
+    for meeting in generate_meetings(200, 10):
+        assert meeting["Participants"]
+        assert all(0 <= p < 10 for p in meeting["Participants"])
+
+
+def test_parse_and_write_counts_match_baseline():
+    results = bench.run_suite("tiny", repeat=1)
+    assert set(results) == {case.name for case in bench.CASES}
+    baseline = bench.load_baseline()["json/tiny"]
+    # timings vary between machines, the counters must not
+    assert bench.compare(results, baseline, tolerance=float("inf")) == []
+
+
+def test_compare_reports_regressions():
+    baseline = {"case": {"seconds": 0.1, "peak_kib": 100, "parses": 1,
+                         "writes": 1}}
+    fine = bench.Measurement(0.12, 120, 1, 1)
+    assert bench.compare({"case": fine}, baseline) == []
+    slow = bench.Measurement(0.3, 100, 2, 1)
+    assert len(bench.compare({"case": slow}, baseline)) == 2
+
+
+def test_binary_snapshots_are_smaller():
+    results = formats.run_formats("tiny", repeat=1)
+    assert set(results) == {"json", "binary zlib", "binary lzma",
+                            "binary none"}
+    assert all(result.size < results["json"].size
+               for name, result in results.items() if name != "json")
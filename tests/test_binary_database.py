@@ -0,0 +1,79 @@
+# tests/test_binary_database.py
+
+import json
+import pytest
+from pcrmc import JSON_ERROR, SUCCESS, database, pcrmc
+from pcrmc.binary_database import decode_document, encode_document
+from pcrmc.database import _compact
+from pcrmc.records import to_json
+
+DOCUMENT = {
+    "Generation": 3,
+    "NextCID": 7,
+    "NextMID": 4,
+    "Contacts": [
+        {"ID": 0, "Name": "Daniel Walder", "Country": "Austria",
+         "Industry": "Software Engineering"},
+        {"ID": 1, "Name": "Zoë \ud800 \"Q\"", "Email": "zoe@example.com"},
+        {"Name": "No ID", "Country": 42},
+        {"ID": 6, "Name": "Huge", "Notes": [1, {"a": None}]},
+    ],
+    "Meetings": [
+        {"ID": 0, "Participants": [0, 1], "Date": "20220701", "Loc": "Wien",
+         "Topics": ["hiking", "work"]},
+        {"ID": 1, "Participants": [], "Date": "20220702", "Topics": []},
+        {"ID": 2, "Participants": ["x", 1], "Loc": "Graz",
+         "Topics": "not a list"},
+        {"ID": 2 ** 70, "Topics": ["hiking", "work"], "Rating": 5},
+    ],
+}
+
+
+def _normalized(document):
+    return json.loads(json.dumps(document, default=to_json))
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "lzma"])
+def test_round_trip(compression):
+    document = _normalized(DOCUMENT)
+    _compact(document)
+    decoded, found = decode_document(encode_document(document, compression))
+    assert found == compression
+    assert _normalized(decoded) == _normalized(DOCUMENT)
+    assert list(decoded) == list(DOCUMENT)
+
+
+def test_damaged_snapshot_is_a_json_error(tmp_path):
+    path = tmp_path / "contact.pcrmc"
+    assert database.init_database(path, "binary") == SUCCESS
+    path.write_bytes(path.read_bytes()[:-4])
+    handler = database.get_database_handler(path, "binary")
+    assert handler.read_contacts().error == JSON_ERROR
+    path.write_text(json.dumps(DOCUMENT))
+    assert handler.read_contacts().error == JSON_ERROR
+
+
+def test_convert_in_place(tmp_path):
+    path = tmp_path / "contact.json"
+    path.write_text(json.dumps(DOCUMENT, indent=4))
+    contacter = pcrmc.Contacter(path)
+    contacter.modify_contact(0, "Industry", "Hiking")
+    source = database.get_database_handler(path, "json")
+    assert database.convert_database(source, "binary", "lzma") == SUCCESS
+    assert database.journal_path(path).read_text() == ""
+
+    binary = pcrmc.Contacter(path, "binary")
+    assert binary.get_contact(0).data["Industry"] == "Hiking"
+    meeting = pcrmc.generateMeeting([0], "20220801", "Linz", []).data
+    assert binary.addMeeting(meeting) == SUCCESS
+    assert meeting["ID"] == 4
+    handler = binary._db_handler
+    handler.write_meetings(handler.read_meetings().data)
+    assert handler.compression == "lzma"
+
+    assert database.convert_database(
+        database.get_database_handler(path, "binary"), "json") == SUCCESS
+    contacts = json.loads(path.read_text())["Contacts"]
+    assert contacts[1]["Email"] == "zoe@example.com"
+    reopened = database.get_database_handler(path, "json")
+    assert reopened.get_meeting(4).data["Loc"] == "Linz"
@@ -0,0 +1,59 @@
+# tests/test_daemon.py
+
+import asyncio
+import json
+import threading
+import time
+import pytest
+from pcrmc import SUCCESS, cli, config, daemon, database, pcrmc
+
+pytestmark = pytest.mark.skipif(not daemon.supported(),
+                                reason="needs Unix domain sockets")
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path / "config")
+    monkeypatch.delenv(daemon.DIRECT_ENV, raising=False)
+    db_path = tmp_path / "contact.json"
+    assert config.init_app(str(db_path)) == SUCCESS
+    assert database.init_database(db_path) == SUCCESS
+    path = tmp_path / "pcrmc.sock"
+    server = daemon.Daemon()
+    monkeypatch.setattr(cli, "contacter_factory", server.contacter)
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+    thread = threading.Thread(target=loop.run_until_complete,
+                              args=(daemon.serve_async(path, server, stop),))
+    thread.start()
+    for _ in range(100):
+        if daemon.is_running(path):
+            break
+        time.sleep(0.01)
+    yield path, server, db_path
+    loop.call_soon_threadsafe(stop.set)
+    thread.join()
+    loop.close()
+
+
+def test_commands_share_one_contacter(served, capsys):
+    path, server, db_path = served
+    assert daemon.forward(["add-contact", "Eva", "Gruber"], path) == 0
+    assert daemon.forward(["list-contacts", "-f", "json"], path) == 0
+    output = capsys.readouterr().out
+    assert "Eva Gruber" in output.splitlines()[0]
+    contacts = json.loads(output[output.index("["):])
+    assert [c["Name"] for c in contacts] == ["Eva Gruber"]
+    assert server._contacter._db_handler.parse_count == 1
+
+    # a write behind the daemon's back is picked up
+    pcrmc.Contacter(db_path).add(["Roman", "Brock"], "Austria", "Law")
+    assert daemon.forward(["list-contacts", "-f", "tsv"], path) == 0
+    assert "Roman Brock" in capsys.readouterr().out
+    assert daemon.forward(["detail-contact", "Nobody"], path) == 1
+
+
+def test_falls_back_without_daemon(served, tmp_path):
+    path, _, _ = served
+    assert daemon.forward(["init"], path) is None
+    assert daemon.forward(["list-contacts"], tmp_path / "none.sock") is None
@@ -0,0 +1,216 @@
+# tests/test_database.py
+
+import configparser
+import json
+import os
+import pytest
+from pcrmc import ID_ERROR, SUCCESS, config, database, pcrmc
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    db = {
+        "Contacts": [
+            {"ID": 0, "Name": "Daniel Walder", "Country": "Austria",
+             "Industry": "Software Engineering"},
+        ],
+        "Meetings": []
+    }
+    db_file = tmp_path / "contact.json"
+    db_file.write_text(json.dumps(db, indent=4))
+    return db_file
+
+
+def test_add_meeting_parses_once(db_file):
+    contacter = pcrmc.Contacter(db_file)
+    contacter.get_contacts()
+    meeting = pcrmc.generateMeeting([0], "20220701", "Wien", []).data
+    assert contacter.addMeeting(meeting) == SUCCESS
+    contacter.get_meetings()
+    assert contacter._db_handler.parse_count == 1
+    assert contacter._db_handler.write_count == 1
+
+
+def test_cache_notices_external_edit(db_file):
+    handler = database.DatabaseHandler(db_file)
+    assert len(handler.read_contacts().data) == 1
+    data = json.loads(db_file.read_text())
+    data["Contacts"].append({"ID": 1, "Name": "Roman Brock",
+                             "Country": "Austria", "Industry": "Medicine"})
+    db_file.write_text(json.dumps(data))
+    stat = db_file.stat()
+    os.utime(db_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert len(handler.read_contacts().data) == 2
+    assert handler.parse_count == 2
+
+
+def test_migrate_to_sqlite(db_file, tmp_path):
+    source = database.DatabaseHandler(db_file)
+    sqlite_file = tmp_path / "contact.sqlite"
+    assert database.migrate_database(source, sqlite_file, "sqlite") == SUCCESS
+
+    contacter = pcrmc.Contacter(sqlite_file, "sqlite")
+    assert contacter.get_contacts().data == source.read_contacts().data
+    contacter.modify_contact(0, "Email", "daniel@example.com")
+    meeting = pcrmc.generateMeeting([0], "20220701", "Wien", ["hiking"]).data
+    assert contacter.addMeeting(meeting) == SUCCESS
+
+    reopened = pcrmc.Contacter(sqlite_file, "sqlite")
+    assert reopened.get_meetings().data == [meeting]
+    assert reopened.get_contacts().data[0]["Email"] == "daniel@example.com"
+
+
+def test_mutations_go_to_journal(db_file):
+    snapshot = db_file.read_text()
+    contacter = pcrmc.Contacter(db_file)
+    contact, error = contacter.add(["Roman", "Brock"], "Austria", "Medicine")
+    assert error == SUCCESS
+    contacter.modify_contact(0, "Industry", "Hiking")
+    contacter.delete_contact(contact["ID"])
+    assert db_file.read_text() == snapshot
+    assert len(database.journal_path(db_file).read_text().splitlines()) == 4
+
+    reopened = pcrmc.Contacter(db_file)
+    contacts = reopened.get_contacts().data
+    assert [c["Industry"] for c in contacts] == ["Hiking"]
+
+
+def test_journal_compaction(db_file):
+    contacter = pcrmc.Contacter(db_file, journal_limit=200)
+    for i in range(5):
+        contacter.modify_contact(0, "Industry", f"Industry {i}")
+    assert database.journal_path(db_file).stat().st_size <= 200
+    data = json.loads(db_file.read_text())
+    assert data["Generation"] >= 1
+    reopened = database.DatabaseHandler(db_file)
+    assert reopened.read_contacts().data[0]["Industry"] == "Industry 4"
+
+
+def test_stale_journal_is_not_replayed(db_file):
+    handler = database.DatabaseHandler(db_file)
+    handler.add_contact({"ID": 1, "Name": "Roman Brock"})
+    journal = database.journal_path(db_file).read_text()
+    handler.write_contacts(handler.read_contacts().data)
+    # simulate a crash between writing the snapshot and clearing the journal
+    database.journal_path(db_file).write_text(journal)
+    reopened = database.DatabaseHandler(db_file)
+    assert len(reopened.read_contacts().data) == 2
+
+
+def test_torn_journal_line_is_repaired(db_file):
+    contacter = pcrmc.Contacter(db_file)
+    contacter.modify_contact(0, "Industry", "Hiking")
+    # simulate a crash in the middle of an append
+    with database.journal_path(db_file).open("a") as journal:
+        journal.write('{"op":"add","table":"Contacts","rec')
+    contacter = pcrmc.Contacter(db_file)
+    contact, error = contacter.add(["Roman", "Brock"], "Austria", "Medicine")
+    assert error == SUCCESS
+
+    contacts, error = pcrmc.Contacter(db_file).get_contacts()
+    assert error == SUCCESS
+    assert [c["Industry"] for c in contacts] == ["Hiking", "Medicine"]
+    # an older journal with garbage in the middle still loads
+    with database.journal_path(db_file).open("r+") as journal:
+        lines = journal.readlines()
+        journal.seek(0)
+        journal.writelines(lines[:1] + ["garbage\n"] + lines[1:])
+    contacts, error = pcrmc.Contacter(db_file).get_contacts()
+    assert (len(contacts), error) == (2, SUCCESS)
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "binary"])
+def test_reserve_id_blocks(db_file, tmp_path, backend):
+    path = tmp_path / f"reserve.{backend}"
+    source = database.DatabaseHandler(db_file)
+    assert database.migrate_database(source, path, backend) == SUCCESS
+    handler = database.get_database_handler(path, backend)
+
+    assert handler.reserve_contact_ids(3) == (range(1, 4), SUCCESS)
+    contacts = [{"Name": "Roman Brock"}, {"Name": "Anna Berger"}]
+    assert handler.add_contacts(contacts).error == SUCCESS
+    assert [c["ID"] for c in contacts] == [4, 5]
+    handler.delete_contact(5)
+
+    reopened = database.get_database_handler(path, backend)
+    assert reopened.reserve_contact_ids(1).data == range(6, 7)
+    assert reopened.reserve_meeting_ids(2).data == range(0, 2)
+
+
+def test_migrate_keeps_id_counters(db_file, tmp_path):
+    source = database.DatabaseHandler(db_file)
+    source.add_contacts([{"Name": "Roman Brock"}])
+    source.delete_contact(1)
+    sqlite_file = tmp_path / "contact.sqlite"
+    assert database.migrate_database(source, sqlite_file, "sqlite") == SUCCESS
+    target = database.get_database_handler(sqlite_file, "sqlite")
+    assert target.reserve_contact_ids(1).data == range(2, 3)
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "partitioned"])
+def test_bulk_modify_and_cascading_delete(db_file, tmp_path, backend):
+    path = tmp_path / f"bulk.{backend}"
+    source = database.DatabaseHandler(db_file)
+    assert database.migrate_database(source, path, backend) == SUCCESS
+    contacter = pcrmc.Contacter(path, backend)
+    contacter.add_contacts([{"Name": "Roman Brock", "Country": "austria"},
+                            {"Name": "Anna Berger", "Country": "Italy"}])
+    for participants in ([0, 1], [1, 2], [2]):
+        meeting = pcrmc.generateMeeting(participants, "20220701", "Wien",
+                                        []).data
+        assert contacter.addMeeting(meeting) == SUCCESS
+    handler = contacter._db_handler
+    writes = handler.write_count
+
+    austrians = contacter.select_contacts({"Country": "AUSTRIA"}).data
+    assert [c["ID"] for c in austrians] == [0, 1]
+    assert contacter.modify_contacts(
+        {c["ID"]: {"Industry": "Skiing", "Club": "SV"} for c in austrians}
+    ).error == SUCCESS
+    assert handler.write_count == writes + 1
+    assert contacter.get_contact(1).data["Club"] == "SV"
+
+    assert contacter.delete_contacts([1, 2]).error == SUCCESS
+    assert handler.write_count == writes + 2
+    assert [list(m["Participants"]) for m in contacter.get_meetings().data] \
+        == [[0], [], []]
+    assert contacter.delete_contacts([0, 5]).error == ID_ERROR
+    assert [c["ID"] for c in contacter.get_contacts().data] == [0]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_config_id_counters_are_migrated(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path / "config")
+    db_path = tmp_path / f"contact.{backend}"
+    assert config.init_app(str(db_path), backend) == SUCCESS
+    assert database.init_database(db_path, backend) == SUCCESS
+    handler = database.get_database_handler(db_path, backend)
+    handler.add_contacts([{"Name": "Daniel Walder"}, {"Name": "Eva Gruber"}])
+    # written by a version that counted in the config file, contact 2
+    # was deleted and meeting IDs were never moved past 0
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config.config_file_path())
+    config_parser["General"].update({"NextCID": "3", "NextMID": "0"})
+    with config.config_file_path().open("w") as file:
+        config_parser.write(file)
+    db_config = database.get_database_config(config.config_file_path())
+    assert config.migrate_id_counters(db_config) == SUCCESS
+    assert "nextcid" not in config.config_file_path().read_text()
+    handler = database.get_database_handler(db_path, backend)
+    assert handler.reserve_contact_ids(1).data == range(3, 4)
+    assert handler.reserve_meeting_ids(1).data == range(0, 1)
+    assert config.migrate_id_counters(db_config) == SUCCESS
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_get_by_id_leaves_out_missing_ids(db_file, tmp_path, backend):
+    path = tmp_path / f"by_id.{backend}"
+    source = database.DatabaseHandler(db_file)
+    assert database.migrate_database(source, path, backend) == SUCCESS
+    handler = database.get_database_handler(path, backend)
+    handler.add_contacts([{"Name": "Roman Brock"}, {"Name": "Anna Berger"}])
+    contacts, error = handler.get_contacts_by_id([2, 0, 7])
+    assert error == SUCCESS
+    assert sorted(c["Name"] for c in contacts) \
+        == ["Anna Berger", "Daniel Walder"]
+    assert handler.get_meetings_by_id([0]) == ([], SUCCESS)
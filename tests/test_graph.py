@@ -0,0 +1,66 @@
+# tests/test_graph.py
+
+import io
+import json
+import pytest
+from pcrmc import SUCCESS, pcrmc
+from pcrmc.graph import ContactGraph, Tie
+
+MEETINGS = [
+    {"ID": 0, "Participants": [0, 1, 2]},
+    {"ID": 1, "Participants": [0, 1]},
+    {"ID": 2, "Participants": [2, 3]},
+    {"ID": 3, "Participants": [4, 5]},
+    {"ID": 4, "Participants": [4, 5, 6]},
+    {"ID": 5, "Participants": [3, 7]},
+]
+
+
+def test_ties_and_paths():
+    graph = ContactGraph(MEETINGS)
+    assert graph.strongest_ties(0) == [Tie(1, 2), Tie(2, 1)]
+    assert graph.introduction_path(1, 7) == [1, 2, 3, 7]
+    assert graph.introduction_path(7, 1) == [7, 3, 2, 1]
+    assert graph.introduction_path(0, 4) is None
+
+    graph.remove(MEETINGS[1])
+    assert graph.strongest_ties(0) == [Tie(1, 1), Tie(2, 1)]
+    graph.drop_contact(3)
+    assert graph.introduction_path(1, 7) is None
+
+
+def test_clusters_follow_changes():
+    graph = ContactGraph(MEETINGS)
+    assert graph.clusters() == [[0, 1, 2, 3, 7], [4, 5, 6]]
+    graph.add({"ID": 6, "Participants": [3, 4]})
+    graph.add({"ID": 7, "Participants": [3, 4]})
+    assert sum(len(c) for c in graph.clusters()) == 8
+
+
+def test_exports_escape_names():
+    graph = ContactGraph(MEETINGS[:1])
+    names = {0: 'Eva "Evi" Gruber', 1: "Roman <Brock>"}
+    dot = io.StringIO()
+    graph.write(dot, "dot", names)
+    assert '0 [label="Eva \\"Evi\\" Gruber"];' in dot.getvalue()
+    assert "0 -- 1 [weight=1];" in dot.getvalue()
+    graphml = io.StringIO()
+    graph.write(graphml, "graphml", names)
+    assert "Roman &lt;Brock&gt;" in graphml.getvalue()
+
+
+def test_scipy_adjacency():
+    pytest.importorskip("scipy")
+    ids, matrix = ContactGraph(MEETINGS).to_scipy()
+    assert matrix[ids.index(0), ids.index(1)] == 2
+
+
+def test_contacter_graph_follows_meetings(tmp_path):
+    db_file = tmp_path / "contact.json"
+    db_file.write_text(json.dumps({"Contacts": [], "Meetings": MEETINGS}))
+    contacter = pcrmc.Contacter(db_file)
+    graph = contacter.get_graph().data
+    meeting = pcrmc.generateMeeting([0, 7], "20220701", "Wien", []).data
+    assert contacter.addMeeting(meeting) == SUCCESS
+    assert contacter.get_graph().data is graph
+    assert graph.introduction_path(1, 7) == [1, 0, 7]
@@ -0,0 +1,238 @@
+# tests/test_index.py
+
+import json
+import pytest
+from pcrmc import DATE_ERROR, ID_ERROR, SUCCESS, pcrmc
+from pcrmc.database import init_database
+from pcrmc.config import CadenceConfig, get_cadence_config
+from pcrmc.index import (DueIndex, LastMeetingIndex, MeetingIndex,
+                         MeetingStats, NameIndex, date_ordinal)
+
+
+@pytest.fixture
+def contacter(tmp_path):
+    db = {
+        "Contacts": [
+            {"ID": 0, "Name": "Daniel Walder", "Country": "Austria",
+             "Industry": "Software Engineering"},
+            {"ID": 1, "Name": "Roman Brock", "Country": "Austria",
+             "Industry": "Medicine"},
+        ],
+        "Meetings": [
+            {"ID": 0, "Participants": [0, 1], "Date": "20220701",
+             "Loc": "Wien", "Topics": ["hiking"]},
+            {"ID": 1, "Participants": [0], "Date": "20220801",
+             "Loc": "Graz", "Topics": []},
+        ]
+    }
+    db_file = tmp_path / "contact.json"
+    db_file.write_text(json.dumps(db, indent=4))
+    return pcrmc.Contacter(db_file)
+
+
+def test_last_meeting_index_remove():
+    first = {"Participants": [0, 1], "Date": "20220701"}
+    second = {"Participants": [0], "Date": "20220801"}
+    index = LastMeetingIndex([first, second])
+    assert index.get(0) == MeetingStats(date_ordinal("20220801"), 2)
+    index.remove(second)
+    assert index.get(0) == MeetingStats(date_ordinal("20220701"), 1)
+    index.remove(first)
+    assert index.get(0) is None
+
+
+def test_get_last_meetings(contacter):
+    index, error = contacter.get_last_meetings()
+    assert error == SUCCESS
+    assert index.get(0) == MeetingStats(date_ordinal("20220801"), 2)
+    assert index.get(1) == MeetingStats(date_ordinal("20220701"), 1)
+
+
+def test_last_meetings_follow_mutations(contacter):
+    index, _ = contacter.get_last_meetings()
+    meeting = pcrmc.generateMeeting([1], "20220901", "Linz", []).data
+    assert contacter.addMeeting(meeting) == SUCCESS
+    assert index.get(1) == MeetingStats(date_ordinal("20220901"), 2)
+
+    contacter.modify_meeting(1, "Date", "20220601")
+    assert index.get(0) == MeetingStats(date_ordinal("20220701"), 2)
+
+    contacter.delete_contact(0)
+    assert index.get(0) is None
+
+
+def test_meeting_index_intersects_filters():
+    meetings = [
+        {"ID": 0, "Participants": [0, 1], "Date": "20220701",
+         "Loc": "Wien", "Topics": ["hiking"]},
+        {"ID": 1, "Participants": [0], "Date": "20220801",
+         "Loc": "Wien", "Topics": ["hiking", "ski"]},
+        {"ID": 2, "Participants": [1], "Date": "20220801",
+         "Loc": "Graz", "Topics": []},
+    ]
+    index = MeetingIndex(meetings)
+    assert index.find() == meetings
+    assert index.find(participants=[0], loc="Wien") == meetings[:2]
+    assert index.find(participants=[0, 1]) == meetings[:1]
+    assert index.find(topics=["ski"], date=date_ordinal("20220801")) \
+        == meetings[1:2]
+    assert index.find(participants=[7]) == []
+    index.remove(meetings[0])
+    assert index.find(participants=[1]) == meetings[2:]
+
+
+def test_find_meetings_follows_mutations(contacter):
+    meetings, error = contacter.find_meetings(loc="Wien")
+    assert error == SUCCESS
+    assert [m["ID"] for m in meetings] == [0]
+
+    contacter.addMeeting(
+        pcrmc.generateMeeting([1], "20220901", "Wien", []).data)
+    contacter.modify_meeting(0, "Loc", "Linz")
+    assert [m["ID"] for m in contacter.find_meetings(loc="Wien").data] == [2]
+    assert [m["ID"] for m in contacter.find_meetings(loc="Linz").data] == [0]
+    assert [m["ID"] for m in contacter.find_meetings(participants=[1]).data] \
+        == [0, 2]
+
+
+def test_date_range_queries(contacter):
+    assert contacter.addMeeting(
+        pcrmc.generateMeeting([1], "20220915", "Linz", []).data) == SUCCESS
+    meetings, error = contacter.find_meetings(since="20220715")
+    assert error == SUCCESS
+    assert [m["ID"] for m in meetings] == [1, 2]
+    meetings = contacter.find_meetings(since="20220701", until="20220801").data
+    assert [m["ID"] for m in meetings] == [0, 1]
+    meetings = contacter.find_meetings(participants=[1], until="20220801").data
+    assert [m["ID"] for m in meetings] == [0]
+    streamed = contacter.iter_meetings(since="20220715").data
+    assert [m["ID"] for m in streamed] == [1, 2]
+    assert contacter.find_meetings(since="2022-07-01").error == DATE_ERROR
+
+
+def test_invalid_dates_are_rejected(contacter):
+    assert pcrmc.generateMeeting([0], "20221301", "Wien", []).error \
+        == DATE_ERROR
+    meeting, error = pcrmc.generateMeeting([0], "", "Wien", [])
+    assert error == SUCCESS and meeting["Date"]
+    assert contacter.modify_meeting(0, "Date", "tomorrow").error == DATE_ERROR
+
+
+@pytest.mark.parametrize("field, value", [
+    ("ID", 7), ("Participants", [0, 2]), ("Participants", [-1]),
+    ("Participants", ["1"])])
+def test_modify_meeting_rejects_bad_ids(contacter, field, value):
+    assert contacter.modify_meeting(0, field, value).error == ID_ERROR
+    meeting = contacter.get_meetings().data[0]
+    assert (meeting["ID"], list(meeting["Participants"])) == (0, [0, 1])
+    assert contacter.modify_meeting(0, "Participants", [1]).error == SUCCESS
+
+
+def test_name_index_tolerates_typos():
+    index = NameIndex([{"ID": 0, "Name": "Daniel Walder"},
+                       {"ID": 1, "Name": "Roman Brock"}])
+    assert [m.id for m in index.find("Daniel Waldr")] == [0]
+    assert [m.id for m in index.find("brok")] == [1]
+    assert index.find("Xaver") == []
+    index.add({"ID": 1, "Name": "Roman Walder"})
+    assert sorted(m.id for m in index.find("walder")) == [0, 1]
+    index.remove(0)
+    assert [m.id for m in index.find("Waldr")] == [1]
+
+
+def test_find_contacts_follows_mutations(contacter):
+    matches, error = contacter.find_contacts("Romn Brock")
+    assert error == SUCCESS and matches[0].id == 1
+    contacter.add(["Eva", "Gruber"], "Germany", "Law")
+    assert contacter.find_contacts("Eva Grubr").data[0].id == 2
+    contacter.modify_contact(1, "Name", "Roman Huber")
+    assert contacter.find_contacts("Roman Brock").data[0].name \
+        == "Roman Huber"
+    contacter.delete_contact(0)
+    assert contacter.find_contacts("Daniel Walder").data == []
+
+
+def test_due_index_pops_only_overdue():
+    last_meetings = LastMeetingIndex([
+        {"ID": 0, "Participants": [0, 1], "Date": "20220701"},
+        {"ID": 1, "Participants": [2], "Date": "20220601"},
+    ])
+    due = DueIndex(last_meetings, {0: 10, 1: 60, 2: 10, 3: 10})
+    today = date_ordinal("20220801")
+    assert [d.id for d in due.most_overdue(5, today)] == [2, 0]
+    assert [d.id for d in due.most_overdue(1, today)] == [2]
+
+    meeting = {"ID": 2, "Participants": [2], "Date": "20220731"}
+    last_meetings.add(meeting)
+    due.update(2)
+    due.set_interval(1, 20)
+    overdue = due.most_overdue(5, today)
+    assert [(d.id, today - d.due_ordinal) for d in overdue] \
+        == [(0, 21), (1, 11)]
+    last_meetings.remove(meeting)
+    due.update(2)
+    due.drop_contact(0)
+    assert [d.id for d in due.most_overdue(5, today)] == [2, 1]
+
+
+def test_overdue_contacts_follow_meetings(contacter, tmp_path):
+    config_file = tmp_path / "config.ini"
+    config_file.write_text("[Cadence]\ninterval = 30\n"
+                           "[Cadence Industries]\nMedicine = 90\n")
+    cadence = get_cadence_config(config_file)
+    assert cadence.interval_for({"Industry": "medicine"}) == 90
+    today = date_ordinal("20220915")
+    overdue = contacter.overdue_contacts(cadence, today=today).data
+    assert [d.id for d in overdue] == [0]
+
+    meeting = pcrmc.generateMeeting([0], "20220905", "Wien", []).data
+    assert contacter.addMeeting(meeting) == SUCCESS
+    assert contacter.overdue_contacts(cadence, today=today).data == []
+    strict = CadenceConfig(interval=5)
+    assert [d.id for d in contacter.overdue_contacts(
+        strict, today=today).data] == [1, 0]
+
+
+def test_delete_contacts_updates_the_meeting_index(contacter):
+    assert [m["ID"] for m in contacter.find_meetings([1]).data] == [0]
+    assert contacter.delete_contacts([1]).error == SUCCESS
+    assert contacter.find_meetings([1]).data == []
+    assert [list(m["Participants"]) for m in
+            contacter.find_meetings([0]).data] == [[0], [0]]
+    reopened = pcrmc.Contacter(contacter._db_handler._db_path)
+    assert list(reopened.get_meetings().data[0]["Participants"]) == [0]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "partitioned"])
+def test_outside_writes_drop_the_indexes(tmp_path, backend):
+    db_path = tmp_path / f"contact.{backend}"
+    assert init_database(db_path, backend) == SUCCESS
+    contacter = pcrmc.Contacter(db_path, backend)
+    contacter.add_contacts([{"Name": "Daniel Walder"},
+                            {"Name": "Roman Brock"}])
+    contacter.addMeeting(
+        pcrmc.generateMeeting([0], "20220701", "Wien", []).data)
+    assert contacter.find_meetings([1]).data == []
+
+    # another process adds a meeting with contact 1
+    other = pcrmc.Contacter(db_path, backend)
+    other.addMeeting(pcrmc.generateMeeting([0, 1], "20220801", "Graz",
+                                           []).data)
+    assert [m["ID"] for m in contacter.find_meetings([1]).data] == [1]
+    assert contacter.delete_contacts([1]).error == SUCCESS
+    reopened = pcrmc.Contacter(db_path, backend)
+    assert [list(m["Participants"]) for m in
+            reopened.get_meetings().data] == [[0], [0]]
+
+
+def test_delete_contacts_rescans_after_an_outside_write(contacter):
+    contacter.find_meetings()
+    db_path = contacter._db_handler._db_path
+    pcrmc.Contacter(db_path).addMeeting(
+        pcrmc.generateMeeting([1], "20220901", "Linz", []).data)
+    # the meeting index does not know meeting 2 yet
+    meeting_ids = contacter._meeting_index.with_participants({1})
+    assert contacter._db_handler.delete_contacts(
+        {1}, meeting_ids).error == SUCCESS
+    meetings = pcrmc.Contacter(db_path).get_meetings().data
+    assert [list(m["Participants"]) for m in meetings] == [[0], [0], []]
@@ -0,0 +1,82 @@
+# tests/test_locking.py
+
+import json
+import multiprocessing
+import os
+import pytest
+from pcrmc import SUCCESS, database, pcrmc
+from pcrmc.locking import atomic_write
+
+WORKERS = 4
+ROUNDS = 25
+
+
+def test_atomic_write_keeps_the_old_file(tmp_path, monkeypatch):
+    path = tmp_path / "contact.json"
+    atomic_write(path, "old")
+
+    def crash(source, target):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", crash)
+    with pytest.raises(OSError):
+        atomic_write(path, "new")
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["contact.json"]
+
+
+def test_transaction_writes_once(tmp_path):
+    path = tmp_path / "contact.json"
+    assert database.init_database(path) == SUCCESS
+    handler = database.get_database_handler(path)
+    with handler.transaction():
+        handler.add_contacts([{"Name": "Daniel Walder"}])
+        handler.modify_contact(0, {"Country": "Austria"})
+        handler.add_meetings([{"Participants": [0], "Date": "20220701"}])
+        assert handler.write_count == 0
+        assert handler.get_contact(0).data["Country"] == "Austria"
+    assert handler.write_count == 1
+    assert len(database.journal_path(path).read_text().splitlines()) == 5
+
+    with pytest.raises(KeyError):
+        with handler.transaction():
+            handler.delete_contact(0)
+            raise KeyError
+    reopened = database.get_database_handler(path)
+    assert reopened.get_contact(0).data["Country"] == "Austria"
+    assert handler.get_contact(0).data["Name"] == "Daniel Walder"
+
+
+def _work(path, backend):
+    contacter = pcrmc.Contacter(path, backend, journal_limit=2048)
+    for round in range(ROUNDS):
+        meeting = pcrmc.generateMeeting([0], "20220701", "Wien",
+                                        [str(os.getpid())]).data
+        assert contacter.addMeeting(meeting) == SUCCESS
+        # a read-modify-write, which loses updates without the lock
+        with contacter.transaction():
+            count = int(contacter.get_contact(0).data["Industry"])
+            contacter.modify_contact(0, "Industry", str(count + 1))
+
+
+@pytest.mark.parametrize("backend", ["json", "binary", "partitioned",
+                                     "sqlite"])
+def test_concurrent_writers(tmp_path, backend):
+    path = tmp_path / "contact.db"
+    assert database.init_database(path, backend) == SUCCESS
+    handler = database.get_database_handler(path, backend)
+    handler.add_contacts([{"Name": "Counter", "Industry": "0"}])
+    workers = [multiprocessing.Process(target=_work, args=(path, backend))
+               for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0] * WORKERS
+
+    reopened = database.get_database_handler(path, backend)
+    meetings = reopened.read_meetings().data
+    assert sorted(m["ID"] for m in meetings) == list(range(WORKERS * ROUNDS))
+    assert reopened.get_contact(0).data["Industry"] == str(WORKERS * ROUNDS)
+    if backend == "json":
+        # compacted at least once, and atomically
+        assert json.loads(path.read_text())["Generation"] > 0
@@ -0,0 +1,45 @@
+# tests/test_metrics.py
+
+import json
+import time
+from typer.testing import CliRunner
+from pcrmc import SUCCESS, cli, config, database
+from pcrmc.metrics import Metrics
+
+runner = CliRunner()
+
+
+def test_nested_timers_charge_the_innermost_layer():
+    metrics = Metrics()
+    metrics.enable()
+    with metrics.timer("render"):
+        with metrics.timer("io"):
+            time.sleep(0.02)
+    assert metrics.seconds["io"] >= 0.02
+    assert metrics.seconds["render"] < 0.01
+    metrics.disable()
+    with metrics.timer("io"):
+        time.sleep(0.01)
+    assert metrics.seconds["io"] < 0.03
+
+
+def test_metrics_line(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path / "config")
+    db_path = tmp_path / "contact.json"
+    assert config.init_app(str(db_path)) == SUCCESS
+    assert database.init_database(db_path) == SUCCESS
+    metrics_file = tmp_path / "metrics.jsonl"
+
+    for args in (["add-contact", "Eva", "Gruber"], ["list-contacts"]):
+        result = runner.invoke(
+            cli.app, ["--metrics", str(metrics_file), *args])
+        assert result.exit_code == 0
+    add, listing = [json.loads(line)
+                    for line in metrics_file.read_text().splitlines()]
+    assert add["command"] == "add-contact"
+    assert (add["parses"], add["writes"]) == (1, 1)
+    assert add["bytes_written"] > 0
+    journal = database.journal_path(db_path)
+    assert listing["bytes_read"] \
+        == db_path.stat().st_size + journal.stat().st_size
+    assert listing["render_ms"] > 0
@@ -0,0 +1,153 @@
+# tests/test_partitioned_database.py
+
+import json
+from pcrmc import SUCCESS, database, pcrmc
+from pcrmc.partitioned_database import partitions_path
+
+MEETINGS = [
+    {"ID": 0, "Participants": [0, 1], "Date": "20210301", "Loc": "Wien",
+     "Topics": ["work"]},
+    {"ID": 1, "Participants": [0], "Date": "20220111", "Loc": "Graz",
+     "Topics": []},
+    {"ID": 2, "Participants": [1], "Date": "20220920", "Loc": "Graz",
+     "Topics": []},
+    {"ID": 3, "Participants": [1], "Date": "2022", "Loc": "Linz",
+     "Topics": []},
+]
+DOCUMENT = {
+    "Contacts": [{"ID": 0, "Name": "Daniel Walder"},
+                 {"ID": 1, "Name": "Zoe Berger"}],
+    "Meetings": MEETINGS,
+}
+
+
+def _partitioned(tmp_path, partition_by="year", journal_limit=1 << 20):
+    path = tmp_path / "contact.json"
+    path.write_text(json.dumps(DOCUMENT))
+    assert database.convert_database(
+        database.get_database_handler(path), "partitioned",
+        partition_by=partition_by) == SUCCESS
+    return path, database.get_database_handler(path, "partitioned",
+                                               journal_limit)
+
+
+def test_manifest(tmp_path):
+    path, _ = _partitioned(tmp_path)
+    main = json.loads(path.read_text())
+    assert "Meetings" not in main and main["PartitionBy"] == "year"
+    manifest = main["Partitions"]
+    assert list(manifest) == ["2021", "2022", "undated"]
+    assert manifest["2022"]["Count"] == 2
+    assert (manifest["2022"]["First"], manifest["2022"]["Last"]) == \
+        ("20220111", "20220920")
+    assert manifest["undated"]["First"] is None
+    files = sorted(p.name for p in partitions_path(path).iterdir())
+    assert files == sorted(entry["File"] for entry in manifest.values())
+
+
+def test_round_trip_keeps_id_order(tmp_path):
+    path, handler = _partitioned(tmp_path, "month")
+    assert [m["ID"] for m in handler.read_meetings().data] == [0, 1, 2, 3]
+    assert database.convert_database(handler, "json") == SUCCESS
+    assert json.loads(path.read_text())["Meetings"] == MEETINGS
+    assert not partitions_path(path).exists()
+
+
+def test_compaction_rewrites_touched_partitions(tmp_path):
+    path, handler = _partitioned(tmp_path, journal_limit=0)
+    before = json.loads(path.read_text())["Partitions"]
+    meeting = {"ID": 4, "Participants": [0], "Date": "20220101",
+               "Loc": "Wien", "Topics": []}
+    assert handler.add_meeting(meeting).error == SUCCESS
+    after = json.loads(path.read_text())["Partitions"]
+    assert after["2021"] == before["2021"]
+    assert after["undated"] == before["undated"]
+    assert after["2022"]["File"] != before["2022"]["File"]
+    assert after["2022"]["Count"] == 3
+    # moving a meeting to another year rewrites both
+    assert handler.modify_meeting(
+        0, {"Date": "20230505"}).error == SUCCESS
+    moved = json.loads(path.read_text())["Partitions"]
+    assert "2021" not in moved and moved["2023"]["Count"] == 1
+    assert moved["2022"] == after["2022"]
+    assert len(list(partitions_path(path).iterdir())) == len(moved)
+
+
+def test_date_filters_open_overlapping_partitions(tmp_path):
+    path, handler = _partitioned(tmp_path)
+    meeting = {"ID": 4, "Participants": [0], "Date": "20220601",
+               "Loc": "Wien", "Topics": []}
+    assert handler.add_meeting(meeting).error == SUCCESS
+
+    contacter = pcrmc.Contacter(path, "partitioned")
+    reader = contacter._db_handler
+    found = contacter.find_meetings(since="20220201").data
+    assert [m["ID"] for m in found] == [2, 4]
+    assert reader.partition_reads == 1
+    assert contacter._meeting_index is None
+    found = contacter.find_meetings(date="20210301", loc="Wien").data
+    assert [m["ID"] for m in found] == [0]
+    assert reader.partition_reads == 2
+
+    last_meetings = contacter.get_last_meetings("20220101").data
+    assert last_meetings.get(0).count == 2
+    assert last_meetings.get(1).count == 1
+    assert reader.partition_reads == 3
+
+
+def test_date_filters_see_journaled_moves(tmp_path):
+    path, handler = _partitioned(tmp_path)
+    assert handler.modify_meeting(0, {"Date": "20260601"}).error == SUCCESS
+    contacter = pcrmc.Contacter(path, "partitioned")
+    found = contacter.find_meetings(since="20260501").data
+    assert [m["ID"] for m in found] == [0]
+    last_meetings = contacter.get_last_meetings("20260501").data
+    assert last_meetings.get(0).count == 1
+    assert contacter._db_handler.partition_reads == 2
+
+
+def test_writes_skip_the_partitions(tmp_path):
+    path, handler = _partitioned(tmp_path)
+    handler = database.get_database_handler(path, "partitioned")
+    assert handler.add_contact({"ID": 2, "Name": "Roman Brock"}).error \
+        == SUCCESS
+    meeting = {"Participants": [2], "Date": "20240101", "Loc": "Wien",
+               "Topics": []}
+    assert [m["ID"] for m in handler.add_meetings([meeting]).data] == [4]
+    assert handler.partition_reads == 0
+    # the ID ranges in the manifest point to the one partition
+    assert handler.modify_meeting(2, {"Loc": "Linz"}).error == SUCCESS
+    assert handler.delete_meeting(1).error == SUCCESS
+    assert handler.partition_reads == 4
+    assert handler.parse_count == 1
+
+    reopened = database.get_database_handler(path, "partitioned")
+    meetings = reopened.read_meetings().data
+    assert [(m["ID"], m["Loc"]) for m in meetings] == \
+        [(0, "Wien"), (2, "Linz"), (3, "Linz"), (4, "Wien")]
+
+
+def test_stale_journal_is_not_replayed(tmp_path):
+    path, handler = _partitioned(tmp_path)
+    meeting = {"ID": 4, "Participants": [0], "Date": "20220601",
+               "Loc": "Wien", "Topics": []}
+    assert handler.add_meeting(meeting).error == SUCCESS
+    journal = database.journal_path(path).read_text()
+    handler.write_contacts(handler.read_contacts().data)
+    # as if the compaction crashed before clearing the journal
+    database.journal_path(path).write_text(journal)
+    reopened = database.get_database_handler(path, "partitioned")
+    meetings, error = reopened.iter_meetings_between("20220101")
+    assert error == SUCCESS
+    assert sorted(m["ID"] for m in meetings) == [1, 2, 4]
+    assert len(reopened.read_meetings().data) == 5
+
+
+def test_convert_back_and_forth(tmp_path):
+    path, handler = _partitioned(tmp_path, "month")
+    assert database.convert_database(handler, "json") == SUCCESS
+    assert "Partitions" not in json.loads(path.read_text())
+    assert database.convert_database(
+        database.get_database_handler(path), "partitioned") == SUCCESS
+    reopened = database.get_database_handler(path, "partitioned")
+    assert len(reopened.read_meetings().data) == 4
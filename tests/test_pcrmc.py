@@ -9,6 +9,7 @@ from pcrmc import (
         __app_name__,
         __version__,
         cli,
+        database,
         pcrmc,
         config
 )
@@ -45,7 +46,7 @@ test_data1 = {
             "Name": "Daniel Walder",
             "Country": "Austria",
             "Industry": "Software Engineering",
-
+            "ID": 0
         }
 }
 test_data2 = {
@@ -57,7 +58,7 @@ test_data2 = {
             "Name": "Roman Brock",
             "Country": "Austria",
             "Industry": "Medicine",
-
+            "ID": 0
         }
 }
 
@@ -79,10 +80,35 @@ test_data2 = {
             ),
         ],
 )
-@patch('pcrmc.config.CONFIG_FILE_PATH', mock_config_file)
 def test_add(mock_json_file, name, country, industry, expected):
     contacter = pcrmc.Contacter(mock_json_file)
     ret, error = contacter.add(name, country, industry) 
     assert (ret, error) == expected
     read = contacter._db_handler.read_contacts()
     assert len(read.data) == 2
+
+
+def test_modify_meeting_rejects_bad_participants(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path / "config")
+    db_path = tmp_path / "contact.json"
+    assert config.init_app(str(db_path)) == SUCCESS
+    assert database.init_database(db_path) == SUCCESS
+    contacter = pcrmc.Contacter(db_path)
+    contacter.add(["Daniel", "Walder"], "Austria", "Law")
+    contacter.addMeeting(
+        pcrmc.generateMeeting([0], "20220701", "Wien", []).data)
+
+    result = runner.invoke(cli.app, ["modify-meeting", "0", "-f",
+                                     "Participants", "-v", "0,x"])
+    assert result.exit_code == 1
+    assert "is not a list of contact IDs" in result.stdout
+    assert list(pcrmc.Contacter(db_path).get_meetings().data[0]
+                ["Participants"]) == [0]
+    result = runner.invoke(cli.app, ["modify-meeting", "0", "-f", "ID",
+                                     "-v", "7"])
+    assert result.exit_code == 1
+    assert "IDs cannot be changed" in result.stdout
+    result = runner.invoke(cli.app, ["modify-meeting", "0", "-f",
+                                     "Participants", "-v", "0,7"])
+    assert result.exit_code == 1
+    assert pcrmc.Contacter(db_path).get_meetings().data[0]["ID"] == 0
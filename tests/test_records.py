@@ -0,0 +1,57 @@
+# tests/test_records.py
+
+import json
+from array import array
+from pcrmc import SUCCESS
+from pcrmc.database import DatabaseHandler
+from pcrmc.records import Contact, Meeting, to_json
+
+
+def test_meeting_reads_like_its_json():
+    fields = {"ID": 3, "Participants": [0, 1], "Date": "20220701",
+              "Loc": "Wien", "Topics": ["hiking"], "Note": "bring boots"}
+    meeting = Meeting.from_json(dict(fields))
+    assert isinstance(meeting["Participants"], array)
+    assert meeting["Topics"] == ("hiking",)
+    assert meeting.get("Note") == "bring boots"
+    assert list(meeting) == list(fields)
+    assert meeting.to_json() == fields
+    assert meeting == fields
+    assert json.loads(json.dumps(meeting, default=to_json)) == fields
+
+    meeting.update({"Participants": [2], "Loc": "Graz"})
+    assert list(meeting["Participants"]) == [2]
+    assert "Topics" in meeting and "Missing" not in meeting
+
+
+def test_repeated_strings_are_shared():
+    first = Contact.from_json({"Name": "A", "Country": "Aus" + "tria"})
+    second = Contact.from_json({"Name": "B", "Country": "".join("Austria")})
+    assert first["Country"] is second["Country"]
+    assert first.get("Industry") is None and "ID" not in first
+
+
+def test_extra_keys_of_sparse_records():
+    contact = Contact.from_json({"ID": 1, "Email": "eva@example.com"})
+    assert contact["Email"] == "eva@example.com"
+    meeting = Meeting.from_json({"ID": 1, "Rating": 5})
+    assert meeting.to_json() == {"ID": 1, "Rating": 5}
+
+
+def test_database_file_keeps_its_format(tmp_path):
+    document = {
+        "Contacts": [{"Name": "Daniel Walder", "Country": "Austria",
+                      "Industry": "Medicine", "ID": 0, "Email": "d@w.at"}],
+        "Meetings": [{"ID": 0, "Participants": [0], "Date": "20220701",
+                      "Loc": "Wien", "Topics": []}],
+    }
+    db_file = tmp_path / "contact.json"
+    db_file.write_text(json.dumps(document))
+    handler = DatabaseHandler(db_file)
+    contacts, error = handler.read_contacts()
+    assert error == SUCCESS and isinstance(contacts[0], Contact)
+    assert handler.write_meetings(handler.read_meetings().data).error \
+        == SUCCESS
+    written = json.loads(db_file.read_text())
+    assert written["Contacts"] == document["Contacts"]
+    assert written["Meetings"] == document["Meetings"]
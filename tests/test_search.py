@@ -0,0 +1,54 @@
+# tests/test_search.py
+
+import json
+import pytest
+from pcrmc import SUCCESS, pcrmc
+from pcrmc.search import search_path
+
+
+@pytest.fixture
+def contacter(tmp_path):
+    db = {
+        "Contacts": [
+            {"ID": 0, "Name": "Daniel Walder", "Country": "Austria",
+             "Industry": "Software Engineering"},
+            {"ID": 1, "Name": "Roman Brock", "Country": "Austria",
+             "Industry": "Medicine"},
+        ],
+        "Meetings": [
+            {"ID": 0, "Participants": [0, 1], "Date": "20220701",
+             "Loc": "Wien", "Topics": ["hiking", "software"]},
+        ]
+    }
+    db_file = tmp_path / "contact.json"
+    db_file.write_text(json.dumps(db, indent=4))
+    return pcrmc.Contacter(db_file)
+
+
+def _hits(contacter, query):
+    results, error = contacter.search(query)
+    assert error == SUCCESS
+    return [(hit.kind, hit.id) for hit, _ in results]
+
+
+def test_search_builds_index_and_matches_prefixes(contacter, tmp_path):
+    assert _hits(contacter, "austria") == [("contact", 0), ("contact", 1)]
+    assert search_path(tmp_path / "contact.json").exists()
+    assert _hits(contacter, "med aus") == [("contact", 1)]
+    assert _hits(contacter, "soft wien") == [("meeting", 0)]
+    assert _hits(contacter, "nobody") == []
+
+
+def test_search_follows_mutations(contacter, tmp_path):
+    _hits(contacter, "austria")
+    contacter.add(["Eva", "Gruber"], "Germany", "Law")
+    contacter.modify_contact(1, "Country", "Italy")
+    contacter.addMeeting(
+        pcrmc.generateMeeting([2], "20220801", "Berlin", ["contracts"]).data)
+    assert _hits(contacter, "austria") == [("contact", 0)]
+    assert _hits(contacter, "contr") == [("meeting", 1)]
+
+    contacter.delete_contact(2)
+    reopened = pcrmc.Contacter(tmp_path / "contact.json")
+    assert _hits(reopened, "germany") == []
+    assert _hits(reopened, "italy") == [("contact", 1)]
@@ -0,0 +1,43 @@
+# tests/test_startup.py
+
+import subprocess
+import sys
+from typing import Dict, List
+
+# Import time budgets in microseconds, generous enough for slow machines
+# and for running without cached bytecode.
+VERSION_BUDGET = 50_000
+HELP_BUDGET = 300_000
+
+
+def _import_times(*args: str) -> Dict[str, int]:
+    """Run pcrmc under -X importtime, return cumulative times by module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "pcrmc", *args],
+        capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def _pcrmc_time(times: Dict[str, int], top_level: List[str]) -> int:
+    return sum(times.get(name, 0) for name in top_level)
+
+
+def test_version_skips_typer_and_database():
+    times = _import_times("--version")
+    for module in ("typer", "pcrmc.cli", "pcrmc.database", "sqlite3"):
+        assert module not in times
+    assert _pcrmc_time(times, ["pcrmc", "pcrmc.__main__"]) < VERSION_BUDGET
+
+
+def test_help_skips_database():
+    times = _import_times("--help")
+    for module in ("pcrmc.database", "pcrmc.pcrmc", "pcrmc.config",
+                   "sqlite3", "json", "rich"):
+        assert module not in times
+    assert _pcrmc_time(times, ["pcrmc", "pcrmc.cli"]) < HELP_BUDGET
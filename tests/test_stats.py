@@ -0,0 +1,69 @@
+# tests/test_stats.py
+
+import json
+from datetime import date
+import pytest
+from pcrmc import SUCCESS, pcrmc
+
+pytest.importorskip("numpy")
+from pcrmc.stats import MeetingColumns, compute_stats  # noqa: E402
+
+TODAY = date(2022, 9, 15).toordinal()
+MEETINGS = [
+    {"ID": 0, "Participants": [0, 1], "Date": "20220101", "Loc": "Wien",
+     "Topics": ["work"]},
+    {"ID": 1, "Participants": [0], "Date": "20220111", "Loc": "Graz",
+     "Topics": ["ski"]},
+    {"ID": 2, "Participants": [0, 0, 2], "Date": "20220131",
+     "Loc": "Graz", "Topics": ["ski", "work"]},
+    {"ID": 3, "Participants": [0, 1], "Date": "20220901", "Loc": "Wien",
+     "Topics": []},
+    {"ID": 4, "Participants": [2], "Date": "20220231", "Loc": "Linz",
+     "Topics": ["bad date"]},
+]
+
+
+def test_per_contact_stats():
+    report = compute_stats(MeetingColumns(MEETINGS), TODAY, months=6)
+    assert report.ids.tolist() == [0, 1, 2]
+    first = report.contact(0)
+    assert first["Meetings"] == 4
+    # gaps 10, 20 and 213 days
+    assert first["MeanGap"] == 81.0 and first["MedianGap"] == 20.0
+    assert first["LastMeeting"] == "20220901"
+    assert (first["Recent"], first["Trend"]) == (1, -2)
+    # ties go to the location and topic seen first
+    assert first["TopLocation"] == "Wien" and first["TopTopic"] == "work"
+    # the 31st of February does not count
+    assert report.contact(2)["Meetings"] == 1
+    assert report.contact(2)["MeanGap"] is None
+    assert report.ranking("gap") == [0, 1, 2]
+    assert report.ranking("trend") == [1, 2, 0]
+
+
+def test_summary():
+    summary = compute_stats(MeetingColumns(MEETINGS), TODAY, 2).summary
+    assert summary["meetings"] == 4 and summary["contacts"] == 3
+    assert (summary["first"], summary["last"]) == ("20220101", "20220901")
+    # gaps 10, 20 and 213 days for contact 0, 243 for contact 1
+    assert (summary["mean_gap"], summary["median_gap"]) == (121.5, 116.5)
+    assert summary["locations"] == [("Wien", 2), ("Graz", 2)]
+    assert summary["topics"][0] == ("work", 2)
+    assert summary["months"] == [("202208", 0), ("202209", 1)]
+
+
+def test_no_meetings():
+    report = compute_stats(MeetingColumns(), TODAY)
+    assert report.summary["meetings"] == 0 and report.ranking() == []
+
+
+def test_contacter_columns_follow_meetings(tmp_path):
+    db_file = tmp_path / "contact.json"
+    db_file.write_text(json.dumps({"Contacts": [], "Meetings": MEETINGS}))
+    contacter = pcrmc.Contacter(db_file)
+    assert contacter.meeting_stats(6, TODAY).data.summary["meetings"] == 4
+    meeting = pcrmc.generateMeeting([1], "20220910", "Wien", []).data
+    assert contacter.addMeeting(meeting) == SUCCESS
+    report, error = contacter.meeting_stats(6, TODAY)
+    assert error == SUCCESS
+    assert report.contact(1)["Meetings"] == 3
@@ -0,0 +1,75 @@
+# tests/test_stream.py
+
+import json
+import pytest
+from pcrmc import ID_ERROR, SUCCESS, database
+from pcrmc.stream import StreamReader
+from benchmarks.generate import generate_contacts, generate_meetings
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    db_file = tmp_path / "contact.json"
+    assert database.init_database(db_file) == SUCCESS
+    handler = database.DatabaseHandler(db_file)
+    handler.write_contacts(list(generate_contacts(50)))
+    handler.write_meetings(list(generate_meetings(200, 50)))
+    return db_file
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_reader_matches_json_loads(db_file, chunk_size):
+    document = json.loads(db_file.read_text())
+    for table in ("Meetings", "Contacts"):
+        reader = StreamReader(db_file, chunk_size)
+        assert reader.seek(table)
+        assert list(reader.records()) == document[table]
+        assert reader.header["Generation"] == document["Generation"]
+    reader = StreamReader(db_file, chunk_size)
+    assert not reader.seek("Notes")
+    reader.close()
+
+
+def test_stream_applies_journal(db_file):
+    writer = database.DatabaseHandler(db_file)
+    writer.modify_contact(3, {"Country": "Italy"})
+    writer.delete_contact(4)
+    writer.add_contacts([{"Name": "Eva Gruber", "Country": "Austria",
+                          "Industry": "Law"}])
+    writer.modify_contact(50, {"Industry": "Music"})
+
+    reader = database.DatabaseHandler(db_file)
+    streamed = list(reader.iter_contacts().data)
+    assert reader.parse_count == 0
+    assert streamed == database.DatabaseHandler(db_file).read_contacts().data
+    assert streamed[-1]["Industry"] == "Music"
+
+
+def test_get_stops_early_and_skips_other_tables(db_file):
+    handler = database.DatabaseHandler(db_file)
+    contact = handler.get_contact(0)
+    assert contact.error == SUCCESS and contact.data["ID"] == 0
+    assert handler.get_contact(999).error == ID_ERROR
+    assert handler.get_meeting(199).data["ID"] == 199
+    assert handler.parse_count == 0
+
+
+def test_get_by_id_reads_only_the_hits(db_file):
+    database.DatabaseHandler(db_file).modify_meeting(7, {"Loc": "Linz"})
+    handler = database.DatabaseHandler(db_file)
+    meetings, error = handler.get_meetings_by_id([7, 3, 999])
+    assert error == SUCCESS
+    assert sorted((m["ID"], m["Loc"] == "Linz") for m in meetings) \
+        == [(3, False), (7, True)]
+    assert handler.get_contacts_by_id([]).data == []
+    assert handler.parse_count == 0
+
+
+def test_stream_falls_back_for_old_layout(tmp_path):
+    db_file = tmp_path / "contact.json"
+    db_file.write_text(json.dumps({"Contacts": [], "Meetings": [],
+                                   "Generation": 2}))
+    handler = database.DatabaseHandler(db_file)
+    handler._journal.append([{"op": "add", "table": "Contacts", "gen": 1,
+                              "record": {"ID": 0, "Name": "Stale"}}])
+    assert list(handler.iter_contacts().data) == []
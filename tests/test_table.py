@@ -0,0 +1,88 @@
+# tests/test_table.py
+
+import json
+from typer.testing import CliRunner
+from pcrmc import SUCCESS, cli, config, database, pcrmc, table
+
+runner = CliRunner()
+
+
+def test_page_sorts_only_what_it_shows():
+    numbers = [5, 3, 9, 1, 7]
+    assert table.page(numbers, offset=1, limit=2) == [3, 9]
+    assert table.page(numbers, key=int, offset=1, limit=2) == [3, 5]
+    assert table.page(numbers, key=int, reverse=True, limit=2) == [9, 7]
+    assert table.page(iter(numbers), key=int, offset=3) == [7, 9]
+    assert table.page(iter(numbers), reverse=True, limit=2) == [7, 1]
+
+
+def test_render_table_aligns_columns():
+    text = table.render_table("Contacts", ("ID", "Name"),
+                              [["0", "Daniel Walder"], ["12", "Eva"]],
+                              styled=False, decorated=False)
+    assert text == ("ID | Name\n"
+                    "0  | Daniel Walder\n"
+                    "12 | Eva\n")
+    assert "\x1b[" not in table.render_table(
+        "Contacts", ("ID",), [["0"]], styled=False)
+
+
+def test_list_contacts_pages_and_formats(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path / "config")
+    db_path = tmp_path / "contact.json"
+    assert config.init_app(str(db_path)) == SUCCESS
+    assert database.init_database(db_path) == SUCCESS
+    contacter = pcrmc.Contacter(db_path)
+    for name in ("Roman Brock", "Anna Berger", "Eva Gruber"):
+        contacter.add([name], "Austria", "Law")
+
+    result = runner.invoke(cli.app, ["list-contacts", "--sort", "name",
+                                     "--limit", "2", "--format", "tsv"])
+    assert result.exit_code == 0
+    assert result.stdout.splitlines() == [
+        "ID\tName\tCountry\tIndustry",
+        "1\tAnna Berger\tAustria\tLaw",
+        "2\tEva Gruber\tAustria\tLaw",
+    ]
+    result = runner.invoke(cli.app, ["list-contacts", "--offset", "2",
+                                     "--format", "json"])
+    assert [c["Name"] for c in json.loads(result.stdout)] == ["Eva Gruber"]
+    result = runner.invoke(cli.app, ["list-meetings", "--format", "json"])
+    assert json.loads(result.stdout) == []
+    contacter.addMeeting(
+        pcrmc.generateMeeting([0], "20220701", "Wien", []).data)
+    contacter.addMeeting(
+        pcrmc.generateMeeting([1], "20220702", "Graz", []).data)
+
+    # the default sort is by ID, reversed too
+    result = runner.invoke(cli.app, ["list-contacts", "--reverse",
+                                     "--format", "tsv"])
+    assert [line.split("\t")[0] for line in result.stdout.splitlines()] \
+        == ["ID", "2", "1", "0"]
+    result = runner.invoke(cli.app, ["list-meetings", "-r", "--format",
+                                     "json"])
+    assert [m["ID"] for m in json.loads(result.stdout)] == [1, 0]
+
+
+def test_list_meetings_rejects_bad_dates(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path / "config")
+    db_path = tmp_path / "contact.json"
+    assert config.init_app(str(db_path)) == SUCCESS
+    assert database.init_database(db_path) == SUCCESS
+    contacter = pcrmc.Contacter(db_path)
+    contacter.add(["Roman", "Brock"], "Austria", "Law")
+    for day in ("20220701", "20220801"):
+        contacter.addMeeting(
+            pcrmc.generateMeeting([0], day, "Wien", []).data)
+
+    result = runner.invoke(cli.app, ["list-meetings", "--since", "garbage"])
+    assert result.exit_code == 1
+    result = runner.invoke(cli.app, ["list-meetings", "--since", "garbage",
+                                     "--last-days", "30"])
+    assert result.exit_code == 1
+    assert "Invalid --since date" in result.output
+    # the later of the two bounds wins
+    result = runner.invoke(cli.app, ["list-meetings", "--since", "20220715",
+                                     "--last-days", "100000", "--format",
+                                     "json"])
+    assert [m["Date"] for m in json.loads(result.stdout)] == ["20220801"]
@@ -0,0 +1,131 @@
+# tests/test_transfer.py
+
+import io
+import json
+import pytest
+from pcrmc import SUCCESS, pcrmc, transfer
+
+
+@pytest.fixture
+def contacter(tmp_path):
+    db_file = tmp_path / "contact.json"
+    db_file.write_text(json.dumps({"Contacts": [], "Meetings": []}))
+    return pcrmc.Contacter(db_file)
+
+
+def test_import_contacts_csv(contacter):
+    rows = io.StringIO(
+        "Name,Country,Industry,Email\n"
+        "Daniel Walder,Austria,Software Engineering,daniel@example.com\n"
+        ",Austria,,\n"
+        "Roman Brock,Austria,Medicine,\n"
+    )
+    batches = []
+    report = transfer.import_records(
+        contacter, transfer.read_rows(rows, "csv"), "contacts",
+        batch_size=1, on_batch=lambda done, seconds: batches.append(done))
+    assert report[:2] == (2, 1)
+    assert report.error == SUCCESS
+    assert batches == [1, 2]
+    contacts = contacter.get_contacts().data
+    assert [c["ID"] for c in contacts] == [0, 1]
+    assert contacts[0]["Email"] == "daniel@example.com"
+    assert "Email" not in contacts[1]
+
+
+def test_import_meetings_validates_participants(contacter):
+    contacter.add_contacts([{"Name": "Daniel Walder"}, {"Name": "Roman"}])
+    rows = io.StringIO(
+        '{"Participants": [0, 1], "Date": "20220701", "Topics": ["a"]}\n'
+        '{"Participants": [0, 7], "Date": "20220702"}\n'
+        'not json\n'
+        '{"Participants": "1", "Date": "20220703", "Loc": "Wien"}\n'
+    )
+    rejected = []
+    report = transfer.import_records(
+        contacter, transfer.read_rows(rows, "jsonl"), "meetings",
+        on_reject=rejected.append)
+    assert report[:2] == (2, 2)
+    assert [r.line for r in rejected] == [2, 3]
+    meetings = contacter.get_meetings().data
+    assert [list(m["Participants"]) for m in meetings] == [[0, 1], [1]]
+
+
+@pytest.mark.parametrize("participants", ["[null]", "[[1]]", "[1.7]",
+                                          "[-1]", "[true]", '"0;x"'])
+def test_import_meetings_rejects_bad_participants(contacter, participants):
+    contacter.add_contacts([{"Name": "Daniel Walder"}, {"Name": "Roman"}])
+    rows = io.StringIO(
+        f'{{"Participants": {participants}, "Date": "20220701"}}\n'
+        '{"Participants": [1], "Date": "20220702"}\n'
+    )
+    rejected = []
+    report = transfer.import_records(
+        contacter, transfer.read_rows(rows, "jsonl"), "meetings",
+        on_reject=rejected.append)
+    assert report[:2] == (1, 1)
+    assert [r.line for r in rejected] == [1]
+    assert rejected[0].reason.startswith("participants must be contact IDs")
+
+
+def test_export_import_keeps_contact_ids(contacter, tmp_path):
+    contacter.add_contacts([{"Name": "Daniel Walder"}, {"Name": "Roman"},
+                            {"Name": "Eva Gruber"}])
+    contacter.delete_contact(1)
+    contacter.addMeeting(
+        pcrmc.generateMeeting([2], "20220701", "Wien", []).data)
+    exported = {}
+    for kind in transfer.KINDS:
+        output = io.StringIO()
+        records, _ = (contacter.iter_contacts() if kind == "contacts"
+                      else contacter.iter_meetings())
+        transfer.write_records(records, output, "csv", kind)
+        exported[kind] = output.getvalue()
+
+    db_file = tmp_path / "copy.json"
+    db_file.write_text(json.dumps({"Contacts": [], "Meetings": []}))
+    copy = pcrmc.Contacter(db_file)
+    for kind in transfer.KINDS:
+        report = transfer.import_records(
+            copy, transfer.read_rows(io.StringIO(exported[kind]), "csv"),
+            kind)
+        assert report.rejected == 0
+    names = {c["ID"]: c["Name"] for c in copy.get_contacts().data}
+    assert names == {0: "Daniel Walder", 2: "Eva Gruber"}
+    meeting, = copy.get_meetings().data
+    assert [names[p] for p in meeting["Participants"]] == ["Eva Gruber"]
+
+    # taken IDs are skipped, contacts without one are numbered after
+    rows = io.StringIO("ID,Name\n2,Eva Again\n,Zoe Berger\n5,Anna\n")
+    rejected = []
+    report = transfer.import_records(
+        copy, transfer.read_rows(rows, "csv"), "contacts",
+        on_reject=rejected.append)
+    assert report[:2] == (2, 1)
+    assert rejected == [transfer.Rejected(2, "ID 2 is taken")]
+    names = {c["ID"]: c["Name"] for c in copy.get_contacts().data}
+    assert names[5] == "Anna" and names[6] == "Zoe Berger"
+
+
+def test_export_filtered_meetings_round_trip(contacter, tmp_path):
+    contacter.add_contacts([{"Name": "Daniel Walder"}, {"Name": "Roman"}])
+    contacter.add_meetings([
+        pcrmc.generateMeeting([0, 1], "20220701", "Wien",
+                              ["hiking", "ski"]).data,
+        pcrmc.generateMeeting([1], "20220702", "Graz", ["ski"]).data,
+    ])
+    meetings, error = contacter.iter_meetings(topics=["ski"], loc="Wien")
+    assert error == SUCCESS
+    output = io.StringIO()
+    assert transfer.write_records(meetings, output, "csv", "meetings") == 1
+    assert output.getvalue().splitlines() == [
+        "ID,Participants,Date,Loc,Topics",
+        "0,0;1,20220701,Wien,hiking;ski",
+    ]
+
+    output.seek(0)
+    report = transfer.import_records(
+        contacter, transfer.read_rows(output, "csv"), "meetings")
+    assert report.imported == 1
+    assert list(contacter.get_meetings().data[-1]["Topics"]) \
+        == ["hiking", "ski"]